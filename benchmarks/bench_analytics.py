@@ -0,0 +1,122 @@
+# benchmarks/bench_analytics.py
+# ----------------------------------------
+# Columnar snapshot (lib/analytics.py) against the same aggregations in
+# SQL and as model loops (Pet.get_all + find_by_pet per pet). Seeds a
+# scratch database, times the snapshot build and reload, then each report
+# with NumPy (if installed), with the pure-Python fallback, and as
+# GROUP BY queries, checking that all give the same answer.
+# Run from the repo root:  python benchmarks/bench_analytics.py [rows]
+# ----------------------------------------
+
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Use a scratch database so the real one is left untouched.
+os.environ["PETCARE_DB"] = os.path.join(tempfile.mkdtemp(prefix="petcare-bench-"), "bench.db")
+
+from lib import analytics  # noqa: E402
+from lib.database import create_tables, get_connection  # noqa: E402
+from lib.models.pet import Pet  # noqa: E402
+from lib.models.medical_record import MedicalRecord  # noqa: E402
+from lib.synthetic import generate_records, owners_for_rows  # noqa: E402
+from lib.transfer import import_records  # noqa: E402
+
+REPEAT = 5
+
+SQL = {
+    "visits_per_vet_month": (
+        "SELECT vet_name, strftime('%Y-%m', date), COUNT(*) FROM "
+        "(SELECT vet_name, date FROM appointments UNION ALL SELECT vet_name, date FROM archive.appointments) "
+        "GROUP BY 1, 2"
+    ),
+    "age_distribution": "SELECT species, COUNT(age), AVG(age), MIN(age), MAX(age) FROM pets GROUP BY species",
+    "treatment_frequency": (
+        "SELECT p.species, m.treatment, COUNT(*) FROM "
+        "(SELECT pet_id, treatment FROM medical_records UNION ALL SELECT pet_id, treatment FROM archive.medical_records) m "
+        "LEFT JOIN pets p ON p.id = m.pet_id GROUP BY 1, 2"
+    ),
+}
+
+def sql_result(name):
+    rows = get_connection().execute(SQL[name]).fetchall()
+    if name == "age_distribution":
+        return {(row[0],): analytics.Stats(*row[1:]) for row in rows}
+    return Counter({tuple(row[:-1]): row[-1] for row in rows})
+
+def snapshot_result(snapshot, name):
+    if name == "treatment_frequency":
+        return snapshot.treatment_frequency(("pet.species", "treatment"))
+    return getattr(snapshot, name)()
+
+def model_loop_treatments():
+    """The pre-snapshot way: every pet, then its records."""
+    counts = Counter()
+    for pet in Pet.get_all():
+        for record in MedicalRecord.find_by_pet(pet.id, include_archive=True):
+            counts[(pet.species, record.treatment)] += 1
+    return counts
+
+def best(function):
+    times = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        result = function()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+def same(a, b):
+    if a.keys() != b.keys():
+        return False
+    for key in a:
+        x, y = a[key], b[key]
+        if isinstance(x, tuple) and x.mean is not None:
+            if x[:1] + x[2:] != y[:1] + y[2:] or abs(x.mean - y.mean) > 1e-9:
+                return False
+        elif x != y:
+            return False
+    return True
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 300_000
+    create_tables()
+    import_records(generate_records(owners_for_rows(rows)), defer_indexing=True)
+    path = analytics.snapshot_path()
+
+    start = time.perf_counter()
+    analytics.build_snapshot(path)
+    print(f"{rows:,} rows; snapshot built in {time.perf_counter() - start:.2f}s, "
+          f"{os.path.getsize(path) / 1e6:.1f} MB")
+    reload_secs, snapshot = best(lambda: analytics.Snapshot(path))
+    print(f"reload {reload_secs * 1000:.3f} ms")
+
+    numpy_module = analytics.numpy
+    backends = [("numpy", numpy_module)] if numpy_module is not None else []
+    backends.append(("python", None))
+    print(f"{'report':<22}{'sql':>10}" + "".join(f"{label:>10}" for label, _ in backends) + "  match")
+    for name in SQL:
+        sql_secs, expected = best(lambda: sql_result(name))
+        line = f"{name:<22}{sql_secs * 1000:>8.1f}ms"
+        matches = True
+        for _, module in backends:
+            analytics.numpy = module
+            with analytics.Snapshot(path) as fresh:
+                secs, result = best(lambda: snapshot_result(fresh, name))
+            line += f"{secs * 1000:>8.1f}ms"
+            matches = matches and same(expected, result)
+        print(f"{line}  {'yes' if matches else 'NO'}")
+    analytics.numpy = numpy_module
+
+    start = time.perf_counter()
+    looped = model_loop_treatments()
+    print(f"treatment_frequency as model loops: {(time.perf_counter() - start) * 1000:.0f}ms "
+          f"(match {'yes' if looped == sql_result('treatment_frequency') else 'NO'})")
+    snapshot.close()
+
+if __name__ == "__main__":
+    main()
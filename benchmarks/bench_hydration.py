@@ -0,0 +1,90 @@
+# benchmarks/bench_hydration.py
+# ----------------------------------------
+# Memory and throughput of full-table scans of `pets`:
+#   - legacy:   plain __dict__ class built with keyword arguments from
+#               fetchall() tuples (how get_all() worked before __slots__)
+#   - get_all:  __slots__ objects hydrated by the cursor's row_factory
+#   - iter_all: keyset-paginated streaming of __slots__ objects
+#   - rowset:   lazy RowSet (tuples only) plus one column() read
+# Run from the repo root:  python benchmarks/bench_hydration.py [rows]
+# ----------------------------------------
+
+import gc
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Use a scratch database so the real one is left untouched.
+os.environ["PETCARE_DB"] = os.path.join(tempfile.mkdtemp(prefix="petcare-bench-"), "bench.db")
+
+from lib.database import create_tables, get_connection, transaction  # noqa: E402
+from lib.models.owner import Owner  # noqa: E402
+from lib.models.pet import Pet  # noqa: E402
+
+class LegacyPet:
+    def __init__(self, name, age, species, breed, owner_id, id=None):
+        self.id = id
+        self.name = name
+        self.age = age
+        self.species = species
+        self.breed = breed
+        self.owner_id = owner_id
+
+def legacy_get_all():
+    rows = get_connection().execute("SELECT * FROM pets").fetchall()
+    return [LegacyPet(id=row[0], name=row[1], age=row[2], species=row[3], breed=row[4], owner_id=row[5]) for row in rows]
+
+def iter_all_count():
+    return sum(1 for _ in Pet.iter_all())
+
+def rowset_species():
+    rows = Pet.all_rows()
+    rows.column("species")
+    return rows
+
+SCANS = [
+    ("legacy get_all()", legacy_get_all),
+    ("slots get_all()", Pet.get_all),
+    ("iter_all() streaming", iter_all_count),
+    ("all_rows() RowSet", rowset_species),
+]
+
+def seed(rows):
+    create_tables()
+    owner = Owner("Bench Owner", "0700000000").save()
+    species = ("Dog", "Cat", "Parrot")
+    with transaction() as conn:
+        conn.executemany(
+            "INSERT INTO pets (name, age, species, breed, owner_id) VALUES (?, ?, ?, ?, ?)",
+            ((f"Pet {i}", i % 15, species[i % 3], "Mixed", owner.id) for i in range(rows)),
+        )
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    seed(rows)
+    print(f"{'scan':<24} {'seconds':>8} {'rows/sec':>12} {'peak MiB':>9}")
+    for label, fn in SCANS:
+        gc.collect()
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        del result
+        gc.collect()
+
+        # Second run under tracemalloc for the allocation peak (slower, so
+        # it is not timed).
+        tracemalloc.start()
+        result = fn()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        del result
+
+        print(f"{label:<24} {elapsed:8.2f} {rows / elapsed:>12,.0f} {peak / 2**20:9.1f}")
+
+if __name__ == "__main__":
+    main()
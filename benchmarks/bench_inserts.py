@@ -0,0 +1,63 @@
+# benchmarks/bench_inserts.py
+# ----------------------------------------
+# Compares insert throughput (rows/sec) for:
+#   - save() per row (one commit per row)
+#   - save() per row inside one transaction()
+#   - Appointment.save_many() (executemany, one commit)
+# Run from the repo root:  python benchmarks/bench_inserts.py [rows]
+# ----------------------------------------
+
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Use a scratch database so the real one is left untouched.
+os.environ["PETCARE_DB"] = os.path.join(tempfile.mkdtemp(prefix="petcare-bench-"), "bench.db")
+
+from lib.database import create_tables, transaction  # noqa: E402
+from lib.models.owner import Owner  # noqa: E402
+from lib.models.pet import Pet  # noqa: E402
+from lib.models.appointment import Appointment  # noqa: E402
+
+def make_appointments(pet_id, count):
+    return [Appointment(pet_id, "2025-10-20", "Checkup", "Dr. Muli", f"visit {i}") for i in range(count)]
+
+def timed(label, count, fn):
+    with transaction() as conn:
+        conn.execute("DELETE FROM appointments")
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<32} {count:>9,} rows  {elapsed:8.3f}s  {count / elapsed:>12,.0f} rows/sec")
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    create_tables()
+    owner = Owner("Bench Owner", "0700000000").save()
+    pet = Pet("Bench", 3, "Dog", "Beagle", owner.id).save()
+
+    # Per-row commits are much slower; keep that run short.
+    single_rows = min(rows, 2000)
+
+    def single():
+        for appt in make_appointments(pet.id, single_rows):
+            appt.save()
+
+    def grouped():
+        with transaction():
+            for appt in make_appointments(pet.id, rows):
+                appt.save()
+
+    def bulk():
+        Appointment.save_many(make_appointments(pet.id, rows))
+
+    timed("save() per row", single_rows, single)
+    timed("save() in transaction()", rows, grouped)
+    timed("save_many()", rows, bulk)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+# benchmarks/bench_service.py
+# ----------------------------------------
+# Load generator for the JSON-lines service (lib/service.py).
+# Seeds a scratch database, starts `main.py serve` on it in a separate
+# process, then runs N concurrent clients for a fixed time, each sending
+# one request at a time from a read-heavy mix. Reports requests/sec,
+# latency percentiles and the server's coalescing / write-batch counters.
+# Run from the repo root:
+#   python benchmarks/bench_service.py [--clients 200] [--duration 10]
+# Pass --port to load an already running server instead.
+# ----------------------------------------
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+def seed(path, owners):
+    """Load synthetic data into a fresh database at `path`."""
+    os.environ["PETCARE_DB"] = path
+    from lib.database import create_tables
+    from lib.synthetic import generate_records
+    from lib.transfer import import_records
+    create_tables()
+    import_records(generate_records(owners), defer_indexing=True)
+
+def start_server(path, workers):
+    """Start `main.py serve` on a free port; returns (process, port)."""
+    command = [sys.executable, os.path.join(ROOT, "main.py"), "serve", "--port", "0"]
+    if workers:
+        command += ["--workers", str(workers)]
+    process = subprocess.Popen(
+        command, env={**os.environ, "PETCARE_DB": path}, stdout=subprocess.PIPE, text=True
+    )
+    line = process.stdout.readline()  # "Listening on host:port"
+    return process, int(line.rsplit(":", 1)[1])
+
+def make_request(rng, owners, write_ratio):
+    """One request from the mix; reads favour a small set of busy owners."""
+    # Front desks mostly look at the same few owners, so requests repeat.
+    owner_id = int(rng.paretovariate(1.2)) % owners + 1
+    pet_id = owner_id * 2
+    if rng.random() < write_ratio:
+        if rng.random() < 0.5:
+            return "add_record", {"pet_id": pet_id, "record_date": "2026-01-15", "treatment": "Deworming"}
+        return "add_owner", {"name": f"Load Owner {rng.randrange(10**6)}", "contact": "0700"}
+    return rng.choice((
+        ("get_owner", {"id": owner_id}),
+        ("list_pets", {"owner_id": owner_id}),
+        ("upcoming_appointments", {"pet_id": pet_id, "as_of": "2024-01-01"}),
+        ("owner_summary", {"ids": [owner_id]}),
+        ("search", {"text": rng.choice(("bel", "max", "lun", "roc", "coco"))}),
+    ))
+
+async def client(port, deadline, rng, owners, write_ratio, latencies, errors):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port, limit=1 << 22)
+    request_id = 0
+    while time.perf_counter() < deadline:
+        op, params = make_request(rng, owners, write_ratio)
+        request_id += 1
+        start = time.perf_counter()
+        writer.write(json.dumps({"id": request_id, "op": op, "params": params}).encode() + b"\n")
+        response = json.loads(await reader.readline())
+        latencies.append(time.perf_counter() - start)
+        if "error" in response:
+            errors.append(response["error"])
+    writer.close()
+
+async def call(port, op, params=None):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(json.dumps({"id": 0, "op": op, "params": params or {}}).encode() + b"\n")
+    response = json.loads(await reader.readline())
+    writer.close()
+    return response["result"]
+
+async def run(port, clients, duration, owners, write_ratio, seed_value):
+    latencies, errors = [], []
+    deadline = time.perf_counter() + duration
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        client(port, deadline, random.Random(seed_value + n), owners, write_ratio, latencies, errors)
+        for n in range(clients)
+    ))
+    elapsed = time.perf_counter() - started
+    return latencies, errors, elapsed, await call(port, "stats")
+
+def percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the PetCare service")
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds")
+    parser.add_argument("--owners", type=int, default=2000, help="synthetic owners to seed")
+    parser.add_argument("--write-ratio", type=float, default=0.1)
+    parser.add_argument("--workers", type=int, help="server read threads")
+    parser.add_argument("--port", type=int, help="load this running server instead of starting one")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    process = None
+    port = args.port
+    if port is None:
+        path = os.path.join(tempfile.mkdtemp(prefix="petcare-bench-"), "bench.db")
+        seed(path, args.owners)
+        process, port = start_server(path, args.workers)
+    try:
+        latencies, errors, elapsed, stats = asyncio.run(
+            run(port, args.clients, args.duration, args.owners, args.write_ratio, args.seed)
+        )
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+    ordered = sorted(latencies)
+    print(f"{args.clients} clients, {elapsed:.1f}s, {len(ordered):,} requests, {len(errors):,} errors")
+    print(f"throughput  {len(ordered) / elapsed:>10,.0f} req/s")
+    for label, fraction in (("p50", 0.50), ("p95", 0.95), ("p99", 0.99)):
+        print(f"latency {label} {percentile(ordered, fraction) * 1000:>10.2f} ms")
+    print(f"latency max {ordered[-1] * 1000:>10.2f} ms")
+    reads = stats.get("queries", 0) + stats.get("coalesced", 0)
+    if reads:
+        print(f"reads       {reads:,}, {stats.get('coalesced', 0):,} coalesced "
+              f"({stats.get('coalesced', 0) / reads:.0%})")
+    if stats.get("batches"):
+        print(f"writes      {stats['batched_writes']:,} in {stats['batches']:,} commits "
+              f"(avg {stats['batched_writes'] / stats['batches']:.1f} per commit)")
+    for message in sorted(set(errors))[:5]:
+        print(f"  error: {message}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,310 @@
+# benchmarks/suite.py
+# ----------------------------------------
+# Reproducible benchmark suite for the lib.models classes at scale.
+# For each size it seeds a deterministic database (lib/synthetic.py),
+# times every public model operation plus a mixed front-desk workload,
+# and records throughput, p50/p99 latency and peak RSS as JSON.
+#
+#   python benchmarks/suite.py --sizes 10k,1m --data-dir /tmp/petcare-bench
+#   python benchmarks/suite.py --sizes 10k --compare benchmarks/results/old.json
+#
+# Each size runs in its own subprocess so peak RSS is per size; it is a
+# process-wide high-water mark, so it is not reported per operation. Seeded
+# databases are cached in --data-dir and copied before every run, so
+# write operations never leak into the next run.
+# ----------------------------------------
+
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+SIZES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000, "10m": 10_000_000}
+SEED = 42
+
+# Throughput drop (percent) that --compare reports as a regression.
+REGRESSION_THRESHOLD = 20.0
+
+# ---------- seeding ----------
+
+def seed_database(path, rows):
+    """Build (or reuse) the deterministic database for `rows` rows."""
+    done = path + ".done"
+    if os.path.exists(done):
+        return
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    os.environ["PETCARE_DB"] = path
+    from lib.database import create_tables, get_pool
+    from lib.synthetic import generate_records, owners_for_rows
+    from lib.transfer import import_records
+
+    create_tables()
+    start = time.perf_counter()
+    report = import_records(generate_records(owners_for_rows(rows), seed=SEED), chunk_size=20000, defer_indexing=True)
+    conn = get_pool().connection()
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    get_pool().close()
+    print(f"  seeded {path}: {report} in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+    open(done, "w").close()
+
+# ---------- measurement ----------
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+def peak_rss_mib():
+    # ru_maxrss is KiB on Linux, bytes on macOS.
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (2**20 if sys.platform == "darwin" else 2**10)
+
+def measure(fn, iterations):
+    """Call fn() `iterations` times; return the stats dict for one operation."""
+    latencies = []
+    clock = time.perf_counter
+    for _ in range(iterations):
+        start = clock()
+        fn()
+        latencies.append(clock() - start)
+    latencies.sort()
+    total = sum(latencies)
+    return {
+        "iterations": iterations,
+        "ops_per_sec": iterations / total if total else None,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+    }
+
+# ---------- operations ----------
+
+def build_operations(rng, scale):
+    """(name, callable, iterations) for every timed operation."""
+    from lib.database import get_connection
+    from lib.models.base import identity_map
+    from lib.models.owner import Owner
+    from lib.models.pet import Pet
+    from lib.models.appointment import Appointment
+    from lib.models.medical_record import MedicalRecord
+
+    conn = get_connection()
+    max_owner = conn.execute("SELECT max(id) FROM owners").fetchone()[0]
+    max_pet = conn.execute("SELECT max(id) FROM pets").fetchone()[0]
+    owner_rows = conn.execute("SELECT count(*) FROM owners").fetchone()[0]
+    pet_rows = conn.execute("SELECT count(*) FROM pets").fetchone()[0]
+
+    def n(count):
+        return max(1, int(count * scale))
+
+    def random_owner():
+        return rng.randint(1, max_owner)
+
+    def random_pet():
+        return rng.randint(1, max_pet)
+
+    def find_by_id_cold():
+        identity_map.clear()
+        Owner.find_by_id(random_owner())
+
+    hot_ids = [random_pet() for _ in range(100)]
+
+    def find_by_id_hot():
+        Pet.find_by_id(rng.choice(hot_ids))
+
+    def save_owner():
+        Owner("Bench Owner", "0700000000").save()
+
+    def save_pet():
+        Pet("Bench", 3, "Dog", "Beagle", random_owner()).save()
+
+    def save_appointment():
+        Appointment(random_pet(), "2026-01-15", "Checkup", "Dr. Muli", "bench", "10:00").save()
+
+    def save_record():
+        MedicalRecord(random_pet(), "2026-01-15", "Deworming", "bench").save()
+
+    def update_owner():
+        owner = Owner.find_by_id(random_owner())
+        if owner is not None:
+            owner.update(contact=f"07{rng.randrange(10**8):08d}")
+
+    # Deletes need rows without children (foreign keys are enforced).
+    disposable_owners = []
+    disposable_pets = []
+
+    def delete_owner():
+        disposable_owners.pop().delete()
+
+    def delete_pet():
+        disposable_pets.pop().delete()
+
+    def prepare_deletes(count):
+        disposable_owners.extend(Owner.save_many(Owner("Temp", "0700") for _ in range(count)))
+        holder = Owner("Temp holder", "0700").save()
+        disposable_pets.extend(Pet.save_many(Pet("Temp", 1, "Cat", "Mixed", holder.id) for _ in range(count)))
+
+    # Front-desk mix: mostly lookups, some bookings and notes.
+    mix = [
+        (30, lambda: Owner.find_by_id(random_owner())),
+        (20, lambda: Pet.find_by_owner(random_owner())),
+        (20, lambda: Appointment.find_by_pet(random_pet())),
+        (10, lambda: MedicalRecord.find_by_pet(random_pet())),
+        (10, save_appointment),
+        (5, save_record),
+        (5, lambda: Pet.search_by_name(rng.choice(("Bel", "Mil", "Roc", "Sim", "Lun")), limit=10)),
+    ]
+    weights = [w for w, _ in mix]
+    actions = [a for _, a in mix]
+
+    def front_desk():
+        rng.choices(actions, weights)[0]()
+
+    full_scans = max(1, min(20, 2_000_000 // max(owner_rows + pet_rows, 1)))
+    delete_count = n(500)
+    return [
+        ("save.owner", save_owner, n(2000)),
+        ("save.pet", save_pet, n(2000)),
+        ("save.appointment", save_appointment, n(2000)),
+        ("save.medical_record", save_record, n(2000)),
+        ("get_all.owner", Owner.get_all, full_scans),
+        ("get_all.pet", Pet.get_all, full_scans),
+        ("find_by_owner.pet", lambda: Pet.find_by_owner(random_owner()), n(5000)),
+        ("find_by_pet.appointment", lambda: Appointment.find_by_pet(random_pet()), n(5000)),
+        ("find_by_pet.medical_record", lambda: MedicalRecord.find_by_pet(random_pet()), n(5000)),
+        ("find_by_id.cold", find_by_id_cold, n(5000)),
+        ("find_by_id.hot", find_by_id_hot, n(20000)),
+        ("update.owner", update_owner, n(2000)),
+        ("prepare_deletes", lambda: prepare_deletes(delete_count), 1),
+        ("delete.owner", delete_owner, delete_count),
+        ("delete.pet", delete_pet, delete_count),
+        ("mixed.front_desk", front_desk, n(20000)),
+    ]
+
+def run_size(label, data_dir, scale):
+    """Worker: seed/copy the database for `label` and time every operation."""
+    rows = SIZES[label]
+    seeded = os.path.join(data_dir, f"petcare-{label}-seed{SEED}.db")
+    seed_database(seeded, rows)
+
+    work_dir = tempfile.mkdtemp(prefix="petcare-bench-run-")
+    work = os.path.join(work_dir, "bench.db")
+    shutil.copyfile(seeded, work)
+    os.environ["PETCARE_DB"] = work
+    try:
+        from lib.database import create_tables
+        create_tables()
+        rng = random.Random(SEED)
+        results = {}
+        for name, fn, iterations in build_operations(rng, scale):
+            if name == "prepare_deletes":
+                fn()
+                continue
+            results[name] = measure(fn, iterations)
+            print(f"  {label:>5} {name:<28} {results[name]['ops_per_sec']:>12,.0f} ops/s  "
+                  f"p50 {results[name]['p50_ms']:8.3f} ms  p99 {results[name]['p99_ms']:8.3f} ms",
+                  file=sys.stderr)
+        return {"rows": rows, "operations": results, "peak_rss_mib": peak_rss_mib()}
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+# ---------- reporting ----------
+
+def environment():
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+        "seed": SEED,
+    }
+
+def compare(current, baseline_path, threshold):
+    """Print throughput changes against a previous run; return regression count."""
+    with open(baseline_path) as handle:
+        baseline = json.load(handle)
+    regressions = 0
+    print(f"\nCompared with {baseline_path} ({baseline['environment'].get('git_commit')}):")
+    for label, size in current["sizes"].items():
+        old_size = baseline["sizes"].get(label)
+        if not old_size:
+            continue
+        for name, stats in size["operations"].items():
+            old = old_size["operations"].get(name)
+            if not old or not old.get("ops_per_sec") or not stats.get("ops_per_sec"):
+                continue
+            change = (stats["ops_per_sec"] / old["ops_per_sec"] - 1) * 100
+            flag = ""
+            if change < -threshold:
+                flag = "  REGRESSION"
+                regressions += 1
+            print(f"  {label:>5} {name:<28} {old['ops_per_sec']:>12,.0f} -> {stats['ops_per_sec']:>12,.0f} ops/s "
+                  f"({change:+6.1f}%){flag}")
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="PetCare model-layer benchmark suite")
+    parser.add_argument("--sizes", default="10k", help=f"comma-separated, from {', '.join(SIZES)}")
+    parser.add_argument("--data-dir", help="where seeded databases are cached (default: a temp dir)")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply iteration counts")
+    parser.add_argument("--out", help="JSON results path (default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument("--compare", help="previous results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD,
+                        help="throughput drop in percent flagged as a regression")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    data_dir = args.data_dir or tempfile.mkdtemp(prefix="petcare-bench-data-")
+    os.makedirs(data_dir, exist_ok=True)
+
+    if args.worker:
+        json.dump(run_size(args.worker, data_dir, args.scale), sys.stdout)
+        return 0
+
+    labels = [label.strip().lower() for label in args.sizes.split(",") if label.strip()]
+    unknown = [label for label in labels if label not in SIZES]
+    if unknown:
+        parser.error(f"unknown size(s): {', '.join(unknown)}")
+
+    results = {"environment": environment(), "scale": args.scale, "sizes": {}}
+    for label in labels:
+        print(f"[{label}]", file=sys.stderr)
+        worker = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--worker", label,
+             "--data-dir", data_dir, "--scale", str(args.scale)],
+            stdout=subprocess.PIPE, check=True, text=True,
+        )
+        results["sizes"][label] = json.loads(worker.stdout)
+
+    out = args.out or os.path.join(ROOT, "benchmarks", "results", time.strftime("%Y%m%d-%H%M%S") + ".json")
+    os.makedirs(os.path.dirname(out), exist_ok=True)
+    with open(out, "w") as handle:
+        json.dump(results, handle, indent=2)
+    print(f"Results written to {out}", file=sys.stderr)
+
+    if args.compare:
+        return 1 if compare(results, args.compare, args.threshold) else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
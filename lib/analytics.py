@@ -0,0 +1,383 @@
+# lib/analytics.py
+# ----------------------------------------
+# Clinic-wide statistics from a columnar snapshot instead of row-by-row
+# model loops. build_snapshot() reads pets, appointments and medical
+# records (archived rows included) once and writes each column as one
+# typed array: strings dictionary-encoded as small integer codes (0 is
+# NULL), dates as days since 1970-01-01 plus a month number, ages and
+# ids as integers. The file is a JSON header followed by the raw
+# buffers, so Snapshot() just memory-maps it and points views at the
+# buffers; nothing is parsed or copied until a column is used.
+#
+# Aggregations group by the integer codes and decode only the result.
+# With NumPy installed the columns are NumPy arrays and grouping is done
+# with np.bincount / np.unique; without it they are memoryviews and
+# grouping runs through Counter and zip, which still loop in C.
+# A snapshot is a point-in-time copy: rebuild it to see later changes.
+# ----------------------------------------
+
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from collections import Counter, namedtuple
+from datetime import date, datetime
+from itertools import compress, repeat
+
+from lib.database import db_path, get_connection, has_archive
+from lib.dates import normalize_date
+
+try:
+    import numpy
+except ImportError:  # optional; the pure-Python path gives the same results
+    numpy = None
+
+MAGIC = b"PCSNAP01"
+
+# Buffers start on a multiple of this, so every typed view is aligned.
+ALIGN = 8
+
+_EPOCH = date(1970, 1, 1).toordinal()
+
+# Stored for a NULL (or unparseable) date.
+NULL_DAY = -(2 ** 31)
+
+# Column kinds: storage type and the value stored for NULL. "text"
+# columns hold dictionary codes; they and "month" columns are narrowed
+# to the smallest unsigned type that fits when written (months need 32
+# bits only for dates after the year 5461, i.e. typos).
+KINDS = {"int": ("i", -1), "day": ("i", NULL_DAY), "month": ("I", 0), "text": ("I", 0)}
+
+# SQL for a date column as days since 1970-01-01, and as year * 12 + month - 1.
+_DAY_SQL = "CAST(julianday({0}) - 2440587.5 AS INTEGER)"
+_MONTH_SQL = "CAST(strftime('%Y', {0}) AS INTEGER) * 12 + CAST(strftime('%m', {0}) AS INTEGER) - 1"
+
+# table -> ((column, kind), ...), select list, date column (if any).
+TABLES = {
+    "pets": (
+        (("id", "int"), ("owner_id", "int"), ("age", "int"), ("species", "text"), ("breed", "text")),
+        "id, owner_id, age, species, breed",
+        None,
+    ),
+    "appointments": (
+        (("id", "int"), ("pet_id", "int"), ("day", "day"), ("month", "month"),
+         ("vet_name", "text"), ("reason", "text"), ("duration", "int")),
+        f"id, pet_id, {_DAY_SQL.format('date')}, {_MONTH_SQL.format('date')}, vet_name, reason, duration",
+        "date",
+    ),
+    "medical_records": (
+        (("id", "int"), ("pet_id", "int"), ("day", "day"), ("month", "month"), ("treatment", "text")),
+        f"id, pet_id, {_DAY_SQL.format('record_date')}, {_MONTH_SQL.format('record_date')}, treatment",
+        "record_date",
+    ),
+}
+
+# Prefix naming a pet column looked up through pet_id, e.g. "pet.species".
+PET_PREFIX = "pet."
+
+Stats = namedtuple("Stats", "count mean min max")
+
+def snapshot_path(path=None):
+    """Default snapshot file: the database's name with "-analytics.snap" added."""
+    root, _ = os.path.splitext(path or db_path())
+    return f"{root}-analytics.snap"
+
+def to_day(value):
+    """An ISO date (or date object) as a day number."""
+    return date.fromisoformat(normalize_date(value)).toordinal() - _EPOCH
+
+def day_to_date(day):
+    """A stored day number as an ISO date (None for NULL_DAY)."""
+    return None if day == NULL_DAY else date.fromordinal(day + _EPOCH).isoformat()
+
+def month_label(month):
+    """A stored month number as "YYYY-MM" (None for 0)."""
+    return None if not month else f"{month // 12:04d}-{month % 12 + 1:02d}"
+
+def _aligned(offset):
+    return -(-offset // ALIGN) * ALIGN
+
+def _read_table(conn, table, include_archive):
+    """{column: array} and {column: dictionary list} for one table."""
+    columns, select, date_column = TABLES[table]
+    sql = f"SELECT {select} FROM {table}"
+    if include_archive and date_column:
+        sql += f" UNION ALL SELECT {select} FROM archive.{table}"
+    arrays = [array(KINDS[kind][0]) for _, kind in columns]
+    # One (append, dictionary or None, null) per column.
+    encoders = []
+    for (name, kind), values in zip(columns, arrays):
+        encoders.append((values.append, {None: 0} if kind == "text" else None, KINDS[kind][1]))
+    for row in conn.execute(sql):
+        for value, (append, codes, null) in zip(row, encoders):
+            if codes is not None:
+                code = codes.get(value)
+                if code is None:
+                    code = codes[value] = len(codes)
+                append(code)
+            else:
+                append(null if value is None else value)
+    result, dictionaries = {}, {}
+    for (name, kind), values, (_, codes, _) in zip(columns, arrays, encoders):
+        if codes is not None:
+            values = array("B" if len(codes) <= 1 << 8 else "H" if len(codes) <= 1 << 16 else "I", values)
+            dictionaries[name] = list(codes)
+        elif kind == "month" and max(values, default=0) < 1 << 16:
+            values = array("H", values)
+        result[name] = values
+    return result, dictionaries
+
+def build_snapshot(path=None, include_archive=True):
+    """
+    Write a snapshot of the current database to `path` (default
+    snapshot_path()). Archived appointments and records are included
+    unless include_archive=False. Returns the path written.
+    """
+    path = path or snapshot_path()
+    include_archive = include_archive and has_archive()
+    conn = get_connection()
+    header = {"created": datetime.now().isoformat(timespec="seconds"), "byteorder": sys.byteorder, "tables": {}}
+    buffers = []
+    offset = 0
+    for table, (columns, _, _) in TABLES.items():
+        arrays, dictionaries = _read_table(conn, table, include_archive)
+        info = {"rows": len(arrays["id"]), "columns": {}}
+        for name, kind in columns:
+            data = arrays[name].tobytes()
+            info["columns"][name] = {"kind": kind, "type": arrays[name].typecode, "offset": offset}
+            if name in dictionaries:
+                info["columns"][name]["dictionary"] = dictionaries[name]
+            buffers.append((offset, data))
+            offset = _aligned(offset + len(data))
+        header["tables"][table] = info
+    encoded = json.dumps(header).encode("utf-8")
+    start = _aligned(len(MAGIC) + 8 + len(encoded))
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as handle:
+        handle.write(MAGIC + struct.pack("<Q", len(encoded)) + encoded)
+        for offset, data in buffers:
+            handle.write(b"\0" * (start + offset - handle.tell()))
+            handle.write(data)
+    os.replace(tmp, path)
+    return path
+
+class Snapshot:
+    """
+    A snapshot file opened for reading. Columns are views onto the
+    memory-mapped file. Use as a context manager, or call close().
+    """
+
+    def __init__(self, path=None):
+        self.path = path or snapshot_path()
+        with open(self.path, "rb") as handle:
+            self._map = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._map[:len(MAGIC)] != MAGIC:
+            self._map.close()
+            raise ValueError(f"{self.path} is not a PetCare analytics snapshot")
+        (length,) = struct.unpack_from("<Q", self._map, len(MAGIC))
+        header = json.loads(self._map[len(MAGIC) + 8:len(MAGIC) + 8 + length])
+        if header["byteorder"] != sys.byteorder:
+            self._map.close()
+            raise ValueError(f"{self.path} was written on a {header['byteorder']}-endian machine")
+        self.created = header["created"]
+        self._tables = header["tables"]
+        self._start = _aligned(len(MAGIC) + 8 + length)
+        self._views = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._views.clear()
+        try:
+            self._map.close()
+        except BufferError:
+            pass  # a caller still holds a column; the map goes with it
+
+    def rows(self, table):
+        return self._tables[table]["rows"]
+
+    def _info(self, table, name):
+        if name.startswith(PET_PREFIX):
+            return self._tables["pets"]["columns"][name[len(PET_PREFIX):]]
+        return self._tables[table]["columns"][name]
+
+    def column(self, table, name):
+        """
+        Column `name` of `table` as stored (codes for text columns). A
+        "pet." name on appointments or medical_records gives that pet
+        column for each row's pet_id (NULL where the pet is missing).
+        """
+        key = (table, name)
+        if key not in self._views:
+            if name.startswith(PET_PREFIX):
+                self._views[key] = self._pet_column(table, name[len(PET_PREFIX):])
+            else:
+                info = self._tables[table]["columns"][name]
+                count = self._tables[table]["rows"]
+                offset = self._start + info["offset"]
+                if numpy is not None:
+                    view = numpy.frombuffer(self._map, info["type"], count, offset)
+                else:
+                    size = array(info["type"]).itemsize
+                    view = memoryview(self._map)[offset:offset + count * size].cast(info["type"])
+                self._views[key] = view
+        return self._views[key]
+
+    def _pet_column(self, table, name):
+        info = self._tables["pets"]["columns"][name]
+        null = KINDS[info["kind"]][1]
+        ids, values = self.column("pets", "id"), self.column("pets", name)
+        pet_ids = self.column(table, "pet_id")
+        if numpy is not None:
+            size = int(ids.max()) + 2 if len(ids) else 1
+            lookup = numpy.full(size, null, values.dtype)
+            lookup[ids] = values
+            # Unknown or NULL pet ids read the spare last slot, which holds NULL.
+            index = numpy.where((pet_ids >= 0) & (pet_ids < size), pet_ids, size - 1)
+            return lookup[index]
+        get = dict(zip(ids, values)).get
+        return array(info["type"], map(get, pet_ids, repeat(null)))
+
+    def decode(self, table, name, value):
+        """A stored value of column `name` as it reads in the database."""
+        info = self._info(table, name)
+        kind = info["kind"]
+        if kind == "text":
+            return info["dictionary"][value]
+        if kind == "month":
+            return month_label(value)
+        if kind == "day":
+            return day_to_date(value)
+        return None if value == -1 else value
+
+    def _mask(self, table, since, until):
+        """Row mask for `since` <= day <= `until` (None if unbounded)."""
+        if since is None and until is None:
+            return None
+        days = self.column(table, "day")
+        low = NULL_DAY + 1 if since is None else to_day(since)
+        high = 2 ** 31 - 1 if until is None else to_day(until)
+        if numpy is not None:
+            return (days >= low) & (days <= high)
+        return [low <= day <= high for day in days]
+
+    def group_count(self, table, by, since=None, until=None):
+        """
+        Row counts per distinct combination of the `by` columns, as a
+        Counter keyed by decoded tuples. `since`/`until` keep only rows
+        dated within that range (tables with a date).
+        """
+        columns = [self.column(table, name) for name in by]
+        mask = self._mask(table, since, until)
+        if numpy is not None:
+            if mask is not None:
+                columns = [values[mask] for values in columns]
+            keys, counts = _numpy_groups(columns)
+            counted = zip(zip(*(k.tolist() for k in keys)), counts.tolist())
+        else:
+            rows = zip(*columns)
+            counted = Counter(rows if mask is None else compress(rows, mask)).items()
+        return Counter({
+            tuple(self.decode(table, name, code) for name, code in zip(by, key)): count
+            for key, count in counted
+        })
+
+    def group_stats(self, table, by, value):
+        """
+        Stats(count, mean, min, max) of column `value` per distinct
+        combination of the `by` columns; NULL values are left out, as SQL
+        aggregates do (a group of only NULLs has count 0).
+        """
+        columns = [self.column(table, name) for name in by]
+        values = self.column(table, value)
+        null = KINDS[self._info(table, value)["kind"]][1]
+        result = {}
+        if numpy is not None:
+            keys, _, inverse = _numpy_groups(columns, inverse=True)
+            present = values != null
+            groups, kept = inverse[present], values[present].astype(numpy.int64)
+            count = numpy.bincount(groups, minlength=len(keys[0]))
+            total = numpy.bincount(groups, weights=kept, minlength=len(keys[0]))
+            # Sorted by group then value: each group's min is first, its max last.
+            order = numpy.lexsort((kept, groups))
+            ends = numpy.cumsum(count)
+            for i, key in enumerate(zip(*(k.tolist() for k in keys))):
+                n = int(count[i])
+                if n:
+                    low, high = int(kept[order[ends[i] - n]]), int(kept[order[ends[i] - 1]])
+                    result[key] = Stats(n, float(total[i]) / n, low, high)
+                else:
+                    result[key] = Stats(0, None, None, None)
+        else:
+            acc = {}
+            for key, v in zip(zip(*columns), values):
+                entry = acc.get(key)
+                if entry is None:
+                    entry = acc[key] = [0, 0, None, None]
+                if v != null:
+                    entry[0] += 1
+                    entry[1] += v
+                    entry[2] = v if entry[2] is None else min(entry[2], v)
+                    entry[3] = v if entry[3] is None else max(entry[3], v)
+            for key, (n, total, low, high) in acc.items():
+                result[key] = Stats(n, total / n, low, high) if n else Stats(0, None, None, None)
+        return {
+            tuple(self.decode(table, name, code) for name, code in zip(by, key)): stats
+            for key, stats in result.items()
+        }
+
+    # --- reports ---
+
+    def visits_per_vet_month(self, since=None, until=None):
+        """Counter of (vet_name, "YYYY-MM") -> appointments."""
+        return self.group_count("appointments", ("vet_name", "month"), since, until)
+
+    def age_distribution(self, by=("species",)):
+        """{(species,) or other pet columns: Stats of age}."""
+        return self.group_stats("pets", by, "age")
+
+    def treatment_frequency(self, by=("treatment",), since=None, until=None):
+        """Counter of treatment (or e.g. ("pet.species", "treatment")) -> records."""
+        return self.group_count("medical_records", by, since, until)
+
+def _numpy_groups(columns, inverse=False):
+    """
+    Distinct rows of the given NumPy columns: (per-column key arrays,
+    counts) or, with inverse=True, also each row's group number.
+    """
+    # Pack the columns into one int64 key; dictionary codes and months
+    # have small ranges, so the packed key usually stays small too.
+    key = numpy.zeros(len(columns[0]), numpy.int64)
+    layout = []
+    size = 1
+    for values in columns:
+        values = values.astype(numpy.int64)
+        low = int(values.min()) if len(values) else 0
+        span = int(values.max()) - low + 1 if len(values) else 1
+        if size * span >= 1 << 62:
+            raise OverflowError("too many distinct values to group by")
+        key = key * span + (values - low)
+        layout.append((low, span))
+        size *= span
+    if not inverse and size <= max(1 << 20, 4 * len(key)):
+        counts = numpy.bincount(key, minlength=size)
+        distinct = numpy.flatnonzero(counts)
+        counts = counts[distinct]
+    elif inverse:
+        distinct, groups, counts = numpy.unique(key, return_inverse=True, return_counts=True)
+    else:
+        distinct, counts = numpy.unique(key, return_counts=True)
+    keys = []
+    for low, span in reversed(layout):
+        distinct, part = numpy.divmod(distinct, span)
+        keys.append(part + low)
+    keys.reverse()
+    if inverse:
+        return keys, counts, groups
+    return keys, counts
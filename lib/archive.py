@@ -0,0 +1,138 @@
+# lib/archive.py
+# ----------------------------------------
+# Hot/cold storage for history. Appointments and medical records dated
+# before a cutoff are moved out of the main database into the archive
+# database, a second file attached as "archive" once it exists (see
+# ConnectionPool.create_archive), so the hot tables and their indexes
+# only hold recent rows. Queries read the archive only when asked
+# (find_by_pet(..., include_archive=True)).
+#
+# Rows move in chunks, each in two transactions: copy into the archive,
+# then delete from the main table. SQLite does not commit a transaction
+# spanning two WAL databases atomically, so a crash between the two
+# leaves a row in both stores (never in neither); running the archive
+# again finishes the move. Archived rows drop out of full-text search.
+#
+# Deleting rows leaves free pages in the main file. With auto_vacuum set
+# to INCREMENTAL they are returned to the filesystem a bounded number at
+# a time (reclaim / maybe_reclaim) instead of by a full VACUUM.
+# ----------------------------------------
+
+import json
+from datetime import date, timedelta
+
+from lib.database import create_archive, get_pool, invalidate_caches, transaction
+from lib.dates import normalize_date, today
+from lib.migrations import HEALTH_TRIGGERS, archived_treatments_upsert
+
+# table -> date column compared with the cutoff
+TABLES = {"appointments": "date", "medical_records": "record_date"}
+
+# Summary triggers skipped while archived rows are deleted: every
+# archived row is older than the rows left behind (and than today), and
+# archived_treatments has taken in the archived records first, so
+# neither a pet's latest treatment nor its next appointment changes.
+_DELETE_TRIGGERS = {"appointments": "health_appointments_ad", "medical_records": "health_records_ad"}
+
+DEFAULT_CHUNK_SIZE = 5000
+
+# maybe_reclaim() runs once free pages exceed this share of the file,
+# releasing at most RECLAIM_PAGES pages per call.
+RECLAIM_THRESHOLD = 0.1
+RECLAIM_PAGES = 2000
+
+def cutoff_for_age(days, as_of=None):
+    """The cutoff date for rows older than `days` (counted from `as_of`, default today)."""
+    return (date.fromisoformat(normalize_date(as_of) or today()) - timedelta(days=days)).isoformat()
+
+def archive_before(cutoff, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Move appointments and medical records dated before `cutoff` into the
+    archive, `chunk_size` rows at a time. Returns {table: rows moved}.
+    The cutoff may not be later than today.
+    """
+    cutoff = normalize_date(cutoff)
+    if cutoff is None or cutoff > today():
+        raise ValueError(f"Archive cutoff must be a date no later than today, got {cutoff!r}")
+    create_archive()
+    moved = {}
+    for table, column in TABLES.items():
+        moved[table] = 0
+        while True:
+            with transaction() as conn:
+                ids = [row[0] for row in conn.execute(
+                    f"SELECT id FROM {table} WHERE {column} < ? LIMIT ?", (cutoff, chunk_size)
+                )]
+                if not ids:
+                    break
+                conn.execute(
+                    f"INSERT OR REPLACE INTO archive.{table} SELECT * FROM {table} "
+                    "WHERE id IN (SELECT value FROM json_each(?))", (json.dumps(ids),)
+                )
+            with transaction() as conn:
+                if table == "medical_records":
+                    # What the summary triggers know of archived history.
+                    conn.execute(archived_treatments_upsert(
+                        "medical_records", "AND id IN (SELECT value FROM json_each(?))"
+                    ), (json.dumps(ids),))
+                trigger = _DELETE_TRIGGERS[table]
+                conn.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+                # Only rows the archive now holds, in case one changed in between.
+                conn.execute(
+                    f"DELETE FROM {table} WHERE id IN (SELECT id FROM archive.{table} "
+                    "WHERE id IN (SELECT value FROM json_each(?)))", (json.dumps(ids),)
+                )
+                conn.execute(HEALTH_TRIGGERS[trigger])
+            moved[table] += len(ids)
+            maybe_reclaim()
+    if any(moved.values()):
+        invalidate_caches()
+    return moved
+
+def vacuum_stats():
+    """{"auto_vacuum": mode, "page_count": n, "freelist_count": n} for the main database."""
+    conn = get_pool().connection()
+    return {
+        "auto_vacuum": ("none", "full", "incremental")[conn.execute("PRAGMA auto_vacuum").fetchone()[0]],
+        "page_count": conn.execute("PRAGMA page_count").fetchone()[0],
+        "freelist_count": conn.execute("PRAGMA freelist_count").fetchone()[0],
+    }
+
+def enable_incremental_vacuum():
+    """
+    Switch an existing database to auto_vacuum=INCREMENTAL. This needs one
+    full VACUUM (a rewrite of the whole file), so it is only done when asked.
+    Returns False if the database already uses it.
+    """
+    pool = get_pool()
+    conn = pool.connection()
+    if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+        return False
+    with pool.write_lock:
+        conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        conn.execute("VACUUM")
+    return True
+
+def reclaim(max_pages=None):
+    """
+    Return up to `max_pages` free pages (all of them if None) to the
+    filesystem, in its own transaction (not inside transaction()).
+    Returns the number of pages released.
+    """
+    pool = get_pool()
+    conn = pool.connection()
+    with pool.write_lock:
+        before = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        pages = before if max_pages is None else min(before, max_pages)
+        if pages:
+            # executescript runs the pragma to completion; execute() steps
+            # it once, which frees a single page.
+            conn.executescript(f"PRAGMA incremental_vacuum({int(pages)})")
+        return before - conn.execute("PRAGMA freelist_count").fetchone()[0]
+
+def maybe_reclaim(threshold=RECLAIM_THRESHOLD, max_pages=RECLAIM_PAGES):
+    """reclaim(max_pages) if free pages exceed `threshold` of the file; returns pages released."""
+    stats = vacuum_stats()
+    if stats["auto_vacuum"] != "incremental" or stats["freelist_count"] <= threshold * stats["page_count"]:
+        return 0
+    return reclaim(max_pages)
@@ -0,0 +1,139 @@
+# lib/batch.py
+# ----------------------------------------
+# Non-interactive mode: run a stream of commands from a file or stdin in
+# one process on one connection, committing every `batch_size` commands
+# instead of once per command. Commands are the operations in
+# lib/operations.py, one per line, either as JSON
+#   {"op": "add_owner", "params": {"name": "Alice", "contact": "0700"}, "as": "alice"}
+# or as a script line
+#   alice = add_owner name="Alice Johnson" contact=0700
+# Script values are JSON where they parse as JSON, plain text otherwise.
+# A value "$alice" or "$alice.id" is replaced by an earlier result saved
+# with "as" / "name =". Blank lines and lines starting with # are skipped.
+# ----------------------------------------
+
+import json
+import re
+import shlex
+import sys
+import time
+from itertools import islice
+
+from lib import operations
+from lib.database import savepoint, transaction
+
+DEFAULT_BATCH_SIZE = 1000
+
+_ASSIGNMENT = re.compile(r"^([A-Za-z_]\w*)\s*=\s*(?=[A-Za-z_])")
+
+class Command:
+    """One parsed line: operation name, params and an optional result name."""
+
+    __slots__ = ("op", "params", "name")
+
+    def __init__(self, op, params, name=None):
+        self.op = op
+        self.params = params
+        self.name = name
+
+def _script_value(text):
+    try:
+        return json.loads(text)
+    except ValueError:
+        return text
+
+def parse_line(text):
+    """Parse one JSON or script line into a Command (None for blank/comment)."""
+    text = text.strip()
+    if not text or text.startswith("#"):
+        return None
+    if text.startswith("{"):
+        data = json.loads(text)
+        if not isinstance(data, dict) or "op" not in data:
+            raise ValueError("JSON command needs an \"op\"")
+        return Command(data["op"], data.get("params") or {}, data.get("as"))
+    name = None
+    match = _ASSIGNMENT.match(text)
+    if match:
+        name = match.group(1)
+        text = text[match.end():]
+    op, *pairs = shlex.split(text)
+    params = {}
+    for pair in pairs:
+        key, sep, value = pair.partition("=")
+        if not sep:
+            raise ValueError(f"Expected key=value, got {pair!r}")
+        params[key] = _script_value(value)
+    return Command(op, params, name)
+
+def read_commands(handle):
+    """Yield (line, Command) for lines of `handle`; unparseable lines give (line, error)."""
+    for number, text in enumerate(handle, 1):
+        try:
+            command = parse_line(text)
+        except ValueError as exc:
+            yield number, exc
+            continue
+        if command is not None:
+            yield number, command
+
+def _resolve(value, results):
+    if isinstance(value, str) and value.startswith("$"):
+        name, _, field = value[1:].partition(".")
+        if name not in results:
+            raise operations.OperationError(f"No earlier result named {name!r}")
+        value = results[name]
+        return value[field] if field else value
+    if isinstance(value, list):
+        return [_resolve(v, results) for v in value]
+    return value
+
+def run_commands(commands, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Run (line, Command or parse error) pairs, yielding (line, ok, result or
+    exception) for each. Up to `batch_size` commands share one transaction;
+    each runs in its own savepoint, so a failing command undoes only its own
+    writes. A batch is committed before its results are yielded.
+    """
+    results = {}
+    commands = iter(commands)
+    while True:
+        chunk = list(islice(commands, batch_size))
+        if not chunk:
+            return
+        done = []
+        with transaction():
+            for line, command in chunk:
+                if isinstance(command, Exception):
+                    done.append((line, False, command))
+                    continue
+                try:
+                    with savepoint():
+                        params = {key: _resolve(value, results) for key, value in command.params.items()}
+                        result = operations.run(command.op, params)
+                except Exception as exc:
+                    done.append((line, False, exc))
+                    continue
+                if command.name:
+                    results[command.name] = result
+                done.append((line, True, result))
+        yield from done
+
+def run_stream(handle, out=None, batch_size=DEFAULT_BATCH_SIZE, quiet=False):
+    """
+    Run every command in `handle`, writing one JSON result line per command
+    to `out` ({"line": n, "result": ...} or {"line": n, "error": "..."};
+    with quiet=True only errors). Returns (commands run, errors, seconds).
+    """
+    out = out or sys.stdout
+    start = time.perf_counter()
+    count = errors = 0
+    for line, ok, value in run_commands(read_commands(handle), batch_size):
+        count += 1
+        if ok:
+            if not quiet:
+                out.write(json.dumps({"line": line, "result": value}, default=str) + "\n")
+        else:
+            errors += 1
+            out.write(json.dumps({"line": line, "error": f"{type(value).__name__}: {value}"}) + "\n")
+    return count, errors, time.perf_counter() - start
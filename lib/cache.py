@@ -0,0 +1,140 @@
+# lib/cache.py
+# ----------------------------------------
+# A small thread-safe LRU cache with hit/miss/eviction counters, and
+# IdentityMap, which gives each thread its own LRUCache. The model layer
+# uses an IdentityMap as its identity map (see lib/models/base.py).
+# ----------------------------------------
+
+import threading
+import weakref
+from collections import OrderedDict
+
+class LRUCache:
+    """Keeps at most `capacity` entries, evicting the least recently used."""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """Return the cached value (marking it recently used) or None."""
+        with self._lock:
+            value = self._data.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        """Store `value`, evicting the oldest entry if the cache is full."""
+        if self.capacity <= 0:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            if len(self._data) > self.capacity:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def discard(self, key):
+        """Drop `key` if present."""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        """Drop every entry (counters are kept)."""
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        """Counters for sizing the cache."""
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "capacity": self.capacity,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def __len__(self):
+        return len(self._data)
+
+class IdentityMap:
+    """
+    One LRUCache of `capacity` entries per thread, so an object one thread
+    holds (and may be changing) is never handed to another. publish() and
+    discard() drop the key from every other thread's cache, so those
+    threads load the committed row again. `generation` counts those
+    drops: a reader that saw it change while it was querying must not
+    cache what it read (see put_if_current).
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.generation = 0
+        self._local = threading.local()
+        self._caches = weakref.WeakSet()
+        self._lock = threading.Lock()
+
+    def _cache(self):
+        cache = getattr(self._local, "cache", None)
+        if cache is None:
+            cache = self._local.cache = LRUCache(self.capacity)
+            with self._lock:
+                self._caches.add(cache)
+        return cache
+
+    def _drop_elsewhere(self, drop):
+        """
+        Call drop(cache) on every other thread's cache and bump the
+        generation, all under the lock put_if_current checks it with, so a
+        reader cannot slip a stale object in between. Returns this thread's.
+        """
+        mine = self._cache()
+        with self._lock:
+            self.generation += 1
+            for cache in self._caches:
+                if cache is not mine:
+                    drop(cache)
+        return mine
+
+    def get(self, key):
+        """This thread's cached object for `key`, or None."""
+        return self._cache().get(key)
+
+    def put_if_current(self, key, value, generation):
+        """Cache `value` for this thread unless a change was published since `generation`."""
+        cache = self._cache()
+        with self._lock:
+            if generation == self.generation:
+                cache.put(key, value)
+
+    def publish(self, key, value):
+        """`value` is the committed state of `key`: cache it here, drop it elsewhere."""
+        self._drop_elsewhere(lambda cache: cache.discard(key)).put(key, value)
+
+    def discard(self, key):
+        """Drop `key` from every thread's cache."""
+        self._drop_elsewhere(lambda cache: cache.discard(key)).discard(key)
+
+    def clear(self):
+        """Drop every thread's entries (counters are kept)."""
+        self._drop_elsewhere(lambda cache: cache.clear()).clear()
+
+    def stats(self):
+        """Counters summed over every thread's cache."""
+        with self._lock:
+            caches = list(self._caches)
+        totals = {"size": 0, "capacity": self.capacity, "hits": 0, "misses": 0, "evictions": 0}
+        for cache in caches:
+            for name, value in cache.stats().items():
+                if name != "capacity":
+                    totals[name] += value
+        return totals
@@ -2,15 +2,42 @@
 # ----------------------------------------
 # The main command-line interface logic.
 # Users interact here using text commands.
+# Each command imports what it uses, so the menu comes up without
+# loading every model, search and report module first.
 # ----------------------------------------
 
-from lib.models.owner import Owner
-from lib.models.pet import Pet
-from lib.models.appointment import Appointment
-from lib.models.medical_record import MedicalRecord
+from lib.dates import today
+
+# Rows printed before asking whether to show more.
+PAGE_SIZE = 20
+
+def owner_summary_lines(owner, as_of):
+    """Summary lines for an owner loaded with Owner.load_graph()."""
+    lines = [f"{owner.id}. {owner.name} - {owner.contact} ({len(owner.pets)} pet(s))"]
+    for pet in owner.pets:
+        upcoming = [a for a in pet.appointments if a.date >= as_of]
+        last = pet.medical_records[-1] if pet.medical_records else None
+        lines.append(
+            f"   {pet.name} ({pet.species}): {len(upcoming)} upcoming"
+            + (f", next {upcoming[0].date} {upcoming[0].reason}" if upcoming else "")
+            + f"; {len(pet.medical_records)} record(s)"
+            + (f", last {last.record_date} {last.treatment}" if last else "")
+        )
+    return lines
+
+def print_paged(items, fmt):
+    """Print items PAGE_SIZE at a time, asking before each further page."""
+    shown = 0
+    for item in items:
+        if shown and shown % PAGE_SIZE == 0:
+            if input("-- Enter for more, 'q' to stop -- ").strip().lower() == "q":
+                return
+        print(fmt(item))
+        shown += 1
 
 def main_menu():
     """Displays the main menu and handles user commands."""
+    schedule = None
     print("\n Welcome to PetCare — Pet Health & Appointment Tracker ")
     print("Type a command or 'help' to see options.\n")
 
@@ -22,27 +49,40 @@ def main_menu():
 Commands:
   add_owner          → Register a new pet owner
   view_owners        → List all owners
+  owner_summary      → Owners with their pets, appointments and records
   add_pet            → Add a new pet
   view_pets          → List all pets
   schedule_appt      → Schedule a vet appointment
   view_appts         → View appointments for a pet
+  vet_schedule       → View a vet's week
   add_record         → Add medical record
   view_records       → View pet medical history
+  due_report         → Pets due or overdue for vaccines/treatments
+  search             → Search owners, pets and notes
+  stats              → Show SQL timing, N+1 and cache counters
   exit               → Quit the app
 """)
 
         elif command == "add_owner":
+            from lib.models.owner import Owner
             name = input("Owner name: ")
             contact = input("Contact: ")
             Owner(name, contact).save()
             print(" Owner added successfully!")
 
         elif command == "view_owners":
-            owners = Owner.get_all()
-            for o in owners:
-                print(f"{o.id}. {o.name} - {o.contact}")
+            from lib.models.owner import Owner
+            print_paged(Owner.iter_all(PAGE_SIZE), lambda o: f"{o.id}. {o.name} - {o.contact}")
+
+        elif command == "owner_summary":
+            from lib.models.owner import Owner
+            ids = input("Owner IDs (comma-separated, blank for all): ").strip()
+            owners = Owner.load_graph(int(i) for i in ids.split(",")) if ids else Owner.iter_graph(chunk_size=PAGE_SIZE)
+            as_of = today()
+            print_paged(owners, lambda o: "\n".join(owner_summary_lines(o, as_of)))
 
         elif command == "add_pet":
+            from lib.models.pet import Pet
             name = input("Pet name: ")
             age = int(input("Age: "))
             species = input("Species: ")
@@ -52,26 +92,48 @@ Commands:
             print(" Pet added successfully!")
 
         elif command == "view_pets":
-            pets = Pet.get_all()
-            for p in pets:
-                print(f"{p.id}. {p.name} ({p.species}, {p.breed}) - Owner ID {p.owner_id}")
+            from lib.models.pet import Pet
+            print_paged(
+                Pet.iter_all(PAGE_SIZE),
+                lambda p: f"{p.id}. {p.name} ({p.species}, {p.breed}) - Owner ID {p.owner_id}",
+            )
 
         elif command == "schedule_appt":
+            from lib.models.appointment import Appointment
+            from lib.schedule import ScheduleConflict, VetSchedule
+            schedule = schedule or VetSchedule()
             pet_id = int(input("Pet ID: "))
             date = input("Date (YYYY-MM-DD): ")
             reason = input("Reason: ")
             vet = input("Vet name: ")
+            time = input("Time (HH:MM, blank if none): ").strip() or None
             notes = input("Notes: ")
-            Appointment(pet_id, date, reason, vet, notes).save()
-            print(" Appointment added successfully!")
+            try:
+                schedule.book(Appointment(pet_id, date, reason, vet, notes, time))
+                print(" Appointment added successfully!")
+            except ScheduleConflict as exc:
+                print(f" {exc}")
 
         elif command == "view_appts":
+            from lib.models.appointment import Appointment
             pet_id = int(input("Pet ID: "))
-            appts = Appointment.find_by_pet(pet_id)
-            for a in appts:
-                print(f"{a.date} - {a.reason} ({a.vet_name}) | {a.notes}")
+            print_paged(
+                Appointment.iter_by_pet(pet_id, PAGE_SIZE),
+                lambda a: f"{a.date} - {a.reason} ({a.vet_name}) | {a.notes}",
+            )
+
+        elif command == "vet_schedule":
+            from lib.schedule import VetSchedule
+            schedule = schedule or VetSchedule()
+            vet = input("Vet name: ")
+            date = input("Any date in the week (YYYY-MM-DD): ")
+            for day, appts in schedule.week(vet, date).items():
+                print(day)
+                for a in appts:
+                    print(f"   {a.time or '--:--'} ({a.duration} min) - {a.reason} | Pet ID {a.pet_id}")
 
         elif command == "add_record":
+            from lib.models.medical_record import MedicalRecord
             pet_id = int(input("Pet ID: "))
             date = input("Date (YYYY-MM-DD): ")
             treatment = input("Treatment: ")
@@ -80,10 +142,50 @@ Commands:
             print(" Record added successfully!")
 
         elif command == "view_records":
+            from lib.models.medical_record import MedicalRecord
             pet_id = int(input("Pet ID: "))
-            records = MedicalRecord.find_by_pet(pet_id)
-            for r in records:
-                print(f"{r.record_date} - {r.treatment} | {r.notes}")
+            print_paged(
+                MedicalRecord.iter_by_pet(pet_id, PAGE_SIZE),
+                lambda r: f"{r.record_date} - {r.treatment} | {r.notes}",
+            )
+
+        elif command == "due_report":
+            from lib import health
+            days = input("Include treatments due within how many days? (default 30): ").strip()
+            health.refresh_next_appointments()
+            rows = health.due_report(within_days=int(days) if days else 30)
+            print_paged(
+                rows,
+                lambda r: f"{'OVERDUE' if r[7] else 'due'} {r[6]} - {r[4]} for {r[1]} (Pet ID {r[0]}), "
+                          f"owner {r[2]} {r[3]} | last {r[5]}, next appt {r[8] or 'none'}",
+            )
+            if not rows:
+                print(" Nothing due.")
+
+        elif command == "search":
+            from lib.search import search
+            text = input("Search for: ")
+            results = search(text)
+            for kind, row_id, label in results:
+                print(f"[{kind} {row_id}] {label}")
+            if not results:
+                print(" No matches.")
+
+        elif command == "stats":
+            from lib.database import enable_instrumentation, query_stats
+            from lib.instrumentation import format_stats
+            from lib.models.base import cache_stats
+            stats = query_stats()
+            if stats is None:
+                if input("Query instrumentation is off. Turn it on? (y/n): ").strip().lower() == "y":
+                    enable_instrumentation()
+                    print(" Collecting from now on; run 'stats' again later.")
+            else:
+                for line in format_stats(stats.snapshot()):
+                    print(line)
+            cache = cache_stats()
+            print(f"Identity map: {cache['size']}/{cache['capacity']} entries, "
+                  f"{cache['hits']} hits, {cache['misses']} misses, {cache['evictions']} evictions")
 
         elif command == "exit":
             print(" Goodbye!")
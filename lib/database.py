@@ -1,58 +1,329 @@
 # lib/database.py
 # ----------------------------------------
-# Handles database connection and table creation using sqlite3.
-# This file defines CURSOR and CONN used by all model classes.
+# Handles database connections and schema setup using sqlite3.
+# Model classes get their connection from get_connection() and wrap
+# writes in transaction(), the unit-of-work used to batch commits.
+# Query instrumentation (lib/instrumentation.py) hooks in here too.
 # ----------------------------------------
 
+import os
 import sqlite3
+import threading
+from contextlib import contextmanager
 
-# Connect to SQLite database (creates one if it doesn't exist)
-CONN = sqlite3.connect('db/database.db')
-CURSOR = CONN.cursor()
+from lib.migrations import ARCHIVE_SCHEMA, SCHEMA_VERSION, migrate, schema_version
+
+# Used when the PETCARE_DB environment variable is not set.
+DEFAULT_DB_PATH = os.path.join("db", "database.db")
+
+def db_path():
+    """Path of the database file the app should use."""
+    return os.environ.get("PETCARE_DB", DEFAULT_DB_PATH)
+
+def archive_db_path(path=None):
+    """
+    Path of the archive database attached as "archive" (see lib/archive.py):
+    PETCARE_ARCHIVE_DB, or the main file's name with "-archive" added.
+    """
+    if os.environ.get("PETCARE_ARCHIVE_DB"):
+        return os.environ["PETCARE_ARCHIVE_DB"]
+    root, ext = os.path.splitext(path or db_path())
+    return f"{root}-archive{ext or '.db'}"
+
+# The active QueryStats, or None when instrumentation is off (the default;
+# PETCARE_SQL_STATS=1 turns it on at startup).
+_stats = None
+_instrumented = None
+
+def enable_instrumentation(**options):
+    """
+    Start timing every statement. Options are passed to QueryStats
+    (slow_ms, n_plus_one_threshold, window). Returns the collector.
+    """
+    global _stats, _instrumented
+    # Imported here so startup without instrumentation skips it (and logging).
+    from lib.instrumentation import InstrumentedConnection, QueryStats
+    _instrumented = InstrumentedConnection
+    _stats = QueryStats(**options)
+    return _stats
+
+def disable_instrumentation():
+    """Stop collecting; connections go back to being raw sqlite3 ones."""
+    global _stats
+    _stats = None
+
+def query_stats():
+    """The active QueryStats, or None if instrumentation is off."""
+    return _stats
+
+def _wrap(conn):
+    stats = _stats
+    return conn if stats is None else _instrumented(conn, stats)
+
+# Callbacks run when cached model state may no longer match the database:
+# after a rollback, or when PETCARE_DB starts pointing at another file.
+_invalidation_hooks = []
+
+def add_invalidation_hook(hook):
+    """Register a no-argument callable that drops cached state."""
+    _invalidation_hooks.append(hook)
+
+def _invalidate():
+    for hook in _invalidation_hooks:
+        hook()
+
+def invalidate_caches():
+    """Drop cached model state after writes that bypassed the models."""
+    _invalidate()
+
+class ConnectionPool:
+    """
+    Hands each thread its own sqlite3 connection to one database file.
+    In WAL mode those connections read concurrently; writers take
+    write_lock so only one transaction writes at a time.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.archive_path = archive_db_path(path)
+        self._archive_exists = os.path.exists(self.archive_path)
+        self.write_lock = threading.RLock()
+        self._local = threading.local()
+
+    def connection(self):
+        """Return this thread's connection, opening it on first use."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+            self._local.depth = 0
+            self._local.pending = []
+            self._local.undo = []
+            self._local.archive = False
+        if self._archive_exists and not self._local.archive and not self._local.depth:
+            self._attach_archive(conn)
+        return conn
+
+    def _connect(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # isolation_level=None lets transaction() decide when BEGIN/COMMIT happen.
+        fresh = not os.path.exists(self.path)
+        conn = sqlite3.connect(self.path, isolation_level=None, timeout=30)
+        if fresh:
+            # auto_vacuum can only be chosen before anything is written, even
+            # the WAL switch; older files get it from a VACUUM (see
+            # lib/archive.enable_incremental_vacuum).
+            conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        # WAL lets readers proceed while a write is in progress and, with
+        # synchronous=NORMAL, avoids an fsync on every commit. Foreign keys are
+        # off by default in SQLite and must be enabled per connection.
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        return conn
+
+    def _attach_archive(self, conn):
+        conn.execute("ATTACH DATABASE ? AS archive", (self.archive_path,))
+        conn.execute("PRAGMA archive.synchronous=NORMAL")
+        self._local.archive = True
+
+    def has_archive(self):
+        """
+        Whether this thread's connection has the archive database (see
+        lib/archive.py) attached as "archive". The file is attached once it
+        exists; ATTACH is not allowed inside a transaction, so a file first
+        created meanwhile is picked up by the next call made outside one.
+        """
+        conn = self.connection()
+        if not self._local.archive and not self._local.depth and os.path.exists(self.archive_path):
+            self._archive_exists = True
+            self._attach_archive(conn)
+        return self._local.archive
+
+    def create_archive(self):
+        """Create (if needed) and attach the archive database and its tables."""
+        if self.in_transaction():
+            raise RuntimeError("create_archive() cannot run inside transaction()")
+        conn = self.connection()
+        with self.write_lock:
+            if not self._local.archive:
+                self._attach_archive(conn)
+            conn.execute("PRAGMA archive.journal_mode=WAL")
+            for statement in ARCHIVE_SCHEMA:
+                conn.execute(statement)
+        self._archive_exists = True
+
+    def close(self):
+        """Close the calling thread's connection (if it opened one)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    @contextmanager
+    def transaction(self):
+        """
+        Unit of work: every write inside the block is committed once, when the
+        outermost block exits. An exception rolls the whole block back.
+        Nested blocks simply join the outer transaction.
+        """
+        conn = self.connection()
+        depth = self._local.depth
+        if depth == 0:
+            self.write_lock.acquire()
+            try:
+                # IMMEDIATE takes SQLite's write lock up front, so a
+                # transaction never fails halfway on lock upgrade.
+                conn.execute("BEGIN IMMEDIATE")
+            except BaseException:
+                self.write_lock.release()
+                raise
+        self._local.depth = depth + 1
+        try:
+            yield _wrap(conn)
+        except BaseException:
+            self._local.depth = depth
+            if depth == 0:
+                self._local.pending.clear()
+                self._local.undo.clear()
+                try:
+                    conn.rollback()
+                    _invalidate()
+                finally:
+                    self.write_lock.release()
+            raise
+        self._local.depth = depth
+        if depth == 0:
+            self._local.undo.clear()
+            try:
+                conn.commit()
+            except BaseException:
+                self._local.pending.clear()
+                conn.rollback()
+                _invalidate()
+                raise
+            finally:
+                self.write_lock.release()
+            self._run_pending()
+
+    def in_transaction(self):
+        """True while this thread is inside transaction()."""
+        return bool(getattr(self._local, "depth", 0))
+
+    def after_commit(self, callback):
+        """
+        Run `callback` once this thread's outermost transaction commits (it
+        is dropped if the transaction, or the savepoint around it, rolls
+        back). Outside a transaction it runs at once.
+        """
+        if self.in_transaction():
+            self._local.pending.append(callback)
+        else:
+            callback()
+
+    def on_rollback(self, callback):
+        """
+        Run `callback` if the savepoint this thread is in rolls back, to
+        undo an in-memory side effect of the writes it held. A rollback of
+        the whole transaction drops every cache instead (the invalidation
+        hooks), so outside a savepoint there is nothing to register.
+        """
+        if self.in_transaction():
+            self._local.undo.append(callback)
+
+    def _run_pending(self):
+        pending, self._local.pending = self._local.pending, []
+        for callback in pending:
+            callback()
+
+    @contextmanager
+    def savepoint(self):
+        """
+        A block inside transaction() that can fail on its own: an exception
+        rolls back just this block's writes (and is re-raised) while the
+        enclosing transaction carries on.
+        """
+        conn = self.connection()
+        if not self._local.depth:
+            raise RuntimeError("savepoint() must be used inside transaction()")
+        pending, undo = len(self._local.pending), len(self._local.undo)
+        conn.execute("SAVEPOINT petcare_sp")
+        try:
+            yield _wrap(conn)
+        except BaseException:
+            conn.execute("ROLLBACK TO petcare_sp")
+            conn.execute("RELEASE petcare_sp")
+            # Only this block's side effects are undone; caches filled by
+            # committed data stay (after_commit work was never run).
+            del self._local.pending[pending:]
+            callbacks = self._local.undo[undo:]
+            del self._local.undo[undo:]
+            for callback in reversed(callbacks):
+                callback()
+            raise
+        conn.execute("RELEASE petcare_sp")
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool():
+    """The pool for the current database path (re-created if PETCARE_DB changes)."""
+    global _pool
+    path = db_path()
+    pool = _pool
+    if pool is None or pool.path != path:
+        with _pool_lock:
+            if _pool is None or _pool.path != path:
+                if _pool is not None:
+                    _invalidate()
+                _pool = ConnectionPool(path)
+            pool = _pool
+    return pool
+
+def get_connection():
+    """This thread's connection to the app database."""
+    return _wrap(get_pool().connection())
+
+def transaction():
+    """Open (or join) a write transaction on this thread's connection."""
+    return get_pool().transaction()
+
+def savepoint():
+    """Open a savepoint in this thread's current transaction."""
+    return get_pool().savepoint()
+
+def after_commit(callback):
+    """Run `callback` after this thread's current transaction commits (now if there is none)."""
+    get_pool().after_commit(callback)
+
+def on_rollback(callback):
+    """Run `callback` if this thread's current savepoint rolls back."""
+    get_pool().on_rollback(callback)
+
+def has_archive():
+    """Whether the archive database is attached to this thread's connection."""
+    return get_pool().has_archive()
+
+def create_archive():
+    """Create and attach the archive database (a no-op if it exists)."""
+    get_pool().create_archive()
+
+def in_transaction():
+    """True while this thread is inside transaction()."""
+    return get_pool().in_transaction()
 
 def create_tables():
-    """Creates all necessary tables if they don't exist."""
-    CURSOR.execute('''
-        CREATE TABLE IF NOT EXISTS owners (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL,
-            contact TEXT NOT NULL
-        )
-    ''')
-
-    CURSOR.execute('''
-        CREATE TABLE IF NOT EXISTS pets (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL,
-            age INTEGER,
-            species TEXT,
-            breed TEXT,
-            owner_id INTEGER,
-            FOREIGN KEY (owner_id) REFERENCES owners(id)
-        )
-    ''')
-
-    CURSOR.execute('''
-        CREATE TABLE IF NOT EXISTS appointments (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            pet_id INTEGER,
-            date TEXT,
-            reason TEXT,
-            vet_name TEXT,
-            notes TEXT,
-            FOREIGN KEY (pet_id) REFERENCES pets(id)
-        )
-    ''')
-
-    CURSOR.execute('''
-        CREATE TABLE IF NOT EXISTS medical_records (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            pet_id INTEGER,
-            record_date TEXT,
-            treatment TEXT,
-            notes TEXT,
-            FOREIGN KEY (pet_id) REFERENCES pets(id)
-        )
-    ''')
-
-    CONN.commit()
+    """
+    Brings the schema up to date by applying any pending migrations.
+    When the database is already current this is a single PRAGMA read.
+    """
+    pool = get_pool()
+    conn = pool.connection()
+    if schema_version(conn) == SCHEMA_VERSION:
+        return
+    with pool.write_lock:
+        migrate(conn)
+
+if os.environ.get("PETCARE_SQL_STATS"):
+    enable_instrumentation()
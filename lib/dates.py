@@ -0,0 +1,61 @@
+# lib/dates.py
+# ----------------------------------------
+# Helpers for the date/time text stored in the database.
+# Dates are kept as ISO "YYYY-MM-DD" so they sort and range-compare
+# correctly as TEXT (and can use the date indexes); times as "HH:MM".
+# ----------------------------------------
+
+from datetime import date, datetime
+
+# Accepted input formats besides ISO, tried in order.
+_DATE_FORMATS = ("%Y/%m/%d", "%d/%m/%Y", "%d-%m-%Y", "%d.%m.%Y")
+
+def normalize_date(value):
+    """
+    Return `value` as an ISO "YYYY-MM-DD" string. Accepts date/datetime
+    objects, ISO strings (a trailing time part is dropped) and the common
+    day-first formats. None is passed through; anything else raises ValueError.
+    """
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value.date().isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    text = str(value).strip()
+    try:
+        return date.fromisoformat(text[:10]).isoformat()
+    except ValueError:
+        pass
+    for fmt in _DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).date().isoformat()
+        except ValueError:
+            continue
+    raise ValueError(f"Unrecognised date: {value!r}")
+
+def today():
+    """Today's date as an ISO string."""
+    return date.today().isoformat()
+
+def parse_time(value):
+    """Convert "HH:MM" to minutes after midnight (None stays None)."""
+    if value is None or value == "":
+        return None
+    hours, _, minutes = str(value).strip().partition(":")
+    try:
+        hours, minutes = int(hours), int(minutes or 0)
+    except ValueError:
+        raise ValueError(f"Unrecognised time: {value!r}") from None
+    if not (0 <= hours < 24 and 0 <= minutes < 60):
+        raise ValueError(f"Time out of range: {value!r}")
+    return hours * 60 + minutes
+
+def format_time(minutes):
+    """Convert minutes after midnight back to "HH:MM"."""
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+def normalize_time(value):
+    """Return `value` as "HH:MM" (None/"" become None); raises ValueError otherwise."""
+    minutes = parse_time(value)
+    return None if minutes is None else format_time(minutes)
@@ -0,0 +1,99 @@
+# lib/health.py
+# ----------------------------------------
+# Vaccination / treatment due-date report.
+# pet_treatments holds each pet's latest record per treatment and the
+# date it is next due (last date + treatment_intervals.interval_days);
+# pet_health holds each pet's next appointment. Both are kept current by
+# triggers (see HEALTH_TRIGGERS in lib/migrations.py), so the report is
+# one range scan over the due_date index instead of a history scan.
+# ----------------------------------------
+
+from datetime import date, timedelta
+
+from lib.database import get_connection, has_archive, transaction
+from lib.dates import normalize_date, today
+from lib.migrations import HEALTH_REBUILD, HEALTH_REBUILD_ARCHIVE, HEALTH_TRIGGERS, archived_treatments_upsert
+
+# Triggers fired once per inserted row; dropped during bulk loads.
+BULK_TRIGGERS = tuple(name for name in HEALTH_TRIGGERS if name.startswith(("health_records", "health_appointments")))
+
+def due_report(as_of=None, within_days=30):
+    """
+    Treatments due on or before `as_of` (default today) plus `within_days`,
+    most overdue first. Each row is (pet_id, pet_name, owner_name, contact,
+    treatment, last_date, due_date, overdue, next_appointment), where
+    overdue is 1 when due_date is before `as_of`.
+    """
+    as_of = normalize_date(as_of) or today()
+    until = (date.fromisoformat(as_of) + timedelta(days=within_days)).isoformat()
+    # pet_health.next_appointment was computed on the day it last changed;
+    # one that has since passed is looked up again (an index probe).
+    return get_connection().execute(
+        """
+        SELECT t.pet_id, p.name, o.name, o.contact, t.treatment, t.last_date, t.due_date,
+               t.due_date < :as_of,
+               CASE WHEN h.next_appointment IS NULL OR h.next_appointment >= :as_of
+                    THEN h.next_appointment
+                    ELSE (SELECT MIN(date) FROM appointments WHERE pet_id = t.pet_id AND date >= :as_of)
+               END
+        FROM pet_treatments t
+        JOIN pets p ON p.id = t.pet_id
+        LEFT JOIN owners o ON o.id = p.owner_id
+        LEFT JOIN pet_health h ON h.pet_id = t.pet_id
+        WHERE t.due_date <= :until
+        ORDER BY t.due_date
+        """,
+        {"as_of": as_of, "until": until}
+    ).fetchall()
+
+def refresh_next_appointments(as_of=None):
+    """
+    Move pet_health rows whose next appointment is before `as_of` (default
+    today) on to the following one. Only those rows are touched, found
+    through the next_appointment index. Returns how many were updated.
+    """
+    as_of = normalize_date(as_of) or today()
+    with transaction() as conn:
+        return conn.execute(
+            "UPDATE pet_health SET next_appointment = "
+            "(SELECT MIN(date) FROM appointments WHERE pet_id = pet_health.pet_id AND date >= ?) "
+            "WHERE next_appointment < ?",
+            (as_of, as_of)
+        ).rowcount
+
+def intervals():
+    """Return {treatment: interval_days} for every treatment with a due date."""
+    return dict(get_connection().execute("SELECT treatment, interval_days FROM treatment_intervals ORDER BY treatment"))
+
+def set_interval(treatment, days):
+    """Set how many days after a treatment it is next due; due dates update."""
+    with transaction() as conn:
+        conn.execute(
+            "INSERT INTO treatment_intervals (treatment, interval_days) VALUES (?, ?) "
+            "ON CONFLICT (treatment) DO UPDATE SET interval_days = excluded.interval_days",
+            (treatment, days)
+        )
+
+def remove_interval(treatment):
+    """Stop tracking due dates for a treatment."""
+    with transaction() as conn:
+        conn.execute("DELETE FROM treatment_intervals WHERE treatment=?", (treatment,))
+
+def drop_bulk_triggers(conn):
+    """Drop the per-row summary triggers (see lib/search.deferred_indexing)."""
+    for name in BULK_TRIGGERS:
+        conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+
+def rebuild(conn):
+    """
+    (Re)create the summary triggers and recompute both tables from scratch,
+    counting archived records (lib/archive.py) as well.
+    """
+    for statement in HEALTH_TRIGGERS.values():
+        conn.execute(statement)
+    for statement in HEALTH_REBUILD:
+        conn.execute(statement)
+    if has_archive():
+        conn.execute("DELETE FROM archived_treatments")
+        conn.execute(archived_treatments_upsert("archive.medical_records"))
+    conn.execute(HEALTH_REBUILD_ARCHIVE)
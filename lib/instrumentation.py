@@ -0,0 +1,263 @@
+# lib/instrumentation.py
+# ----------------------------------------
+# Optional SQL instrumentation. When enabled (see
+# lib.database.enable_instrumentation), get_connection() and transaction()
+# hand out thin wrappers that time every statement, including the time to
+# fetch its rows, and feed a QueryStats collector:
+#   - per-statement latency histograms and row counts
+#   - a slow-query log
+#   - an N+1 detector for one statement repeated in a tight loop
+# When disabled the raw sqlite3 connection is used and nothing here runs.
+# ----------------------------------------
+
+import logging
+import re
+import threading
+import time
+from collections import deque
+
+log = logging.getLogger("petcare.sql")
+
+# Upper bounds (ms) of the latency histogram buckets; the last is open-ended.
+BUCKETS_MS = (0.1, 0.5, 1, 5, 10, 50, 100, 500)
+
+_WHITESPACE = re.compile(r"\s+")
+
+class StatementStats:
+    """Counters for one distinct SQL statement."""
+
+    __slots__ = ("sql", "calls", "rows", "total", "max", "histogram", "burst_start", "burst_calls")
+
+    def __init__(self, sql):
+        self.sql = sql
+        self.calls = 0
+        self.rows = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.histogram = [0] * (len(BUCKETS_MS) + 1)
+        self.burst_start = 0.0
+        self.burst_calls = 0
+
+    def as_dict(self):
+        return {
+            "sql": self.sql,
+            "calls": self.calls,
+            "rows": self.rows,
+            "total_ms": self.total * 1000,
+            "avg_ms": self.total * 1000 / self.calls if self.calls else 0.0,
+            "max_ms": self.max * 1000,
+            "histogram": dict(zip([f"<{b}ms" for b in BUCKETS_MS] + [f">={BUCKETS_MS[-1]}ms"], self.histogram)),
+        }
+
+class QueryStats:
+    """
+    Thread-safe collector. A statement counts as an N+1 suspect when it
+    runs `n_plus_one_threshold` times within `window` seconds.
+    """
+
+    def __init__(self, slow_ms=50.0, n_plus_one_threshold=50, window=1.0, slow_log_size=100):
+        self.slow_ms = slow_ms
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self.window = window
+        self.statements = {}
+        self.slow_queries = deque(maxlen=slow_log_size)
+        self.n_plus_one = {}   # sql -> largest burst seen
+        self._lock = threading.Lock()
+
+    def _entry(self, sql):
+        entry = self.statements.get(sql)
+        if entry is None:
+            key = _WHITESPACE.sub(" ", sql).strip()
+            entry = self.statements.get(key)
+            if entry is None:
+                entry = self.statements[key] = StatementStats(key)
+            self.statements[sql] = entry
+        return entry
+
+    def started(self, sql, now):
+        """Count one execution toward the N+1 detector."""
+        with self._lock:
+            entry = self._entry(sql)
+            if now - entry.burst_start > self.window:
+                entry.burst_start = now
+                entry.burst_calls = 0
+            entry.burst_calls += 1
+            if entry.burst_calls >= self.n_plus_one_threshold:
+                previous = self.n_plus_one.get(entry.sql, 0)
+                self.n_plus_one[entry.sql] = max(previous, entry.burst_calls)
+                if not previous:
+                    log.warning("possible N+1: %r ran %d times within %.1fs",
+                                entry.sql, entry.burst_calls, self.window)
+
+    def finished(self, sql, params, elapsed, rows):
+        """Record one completed execution."""
+        elapsed_ms = elapsed * 1000
+        bucket = len(BUCKETS_MS)
+        for i, bound in enumerate(BUCKETS_MS):
+            if elapsed_ms < bound:
+                bucket = i
+                break
+        with self._lock:
+            entry = self._entry(sql)
+            entry.calls += 1
+            entry.rows += rows
+            entry.total += elapsed
+            if elapsed > entry.max:
+                entry.max = elapsed
+            entry.histogram[bucket] += 1
+            if elapsed_ms >= self.slow_ms:
+                self.slow_queries.append({
+                    "at": time.time(), "sql": entry.sql, "params": repr(params)[:200],
+                    "ms": elapsed_ms, "rows": rows,
+                })
+                log.warning("slow query (%.1f ms): %s", elapsed_ms, entry.sql)
+
+    def reset(self):
+        with self._lock:
+            self.statements.clear()
+            self.slow_queries.clear()
+            self.n_plus_one.clear()
+
+    def snapshot(self):
+        """Plain-data copy of every counter, busiest statements first."""
+        with self._lock:
+            unique = {id(e): e for e in self.statements.values()}.values()
+            return {
+                "statements": sorted((e.as_dict() for e in unique), key=lambda s: -s["total_ms"]),
+                "slow_queries": list(self.slow_queries),
+                "n_plus_one": dict(self.n_plus_one),
+            }
+
+class InstrumentedCursor:
+    """
+    Wraps a sqlite3 cursor. A statement's time runs from execute() until
+    its rows have been consumed (fetchall, exhausting iteration, fetchone,
+    or the next execute), so slow fetches are charged to the right query.
+    """
+
+    def __init__(self, cursor, stats):
+        self._cursor = cursor
+        self._stats = stats
+        self._sql = None
+        self._params = None
+        self._elapsed = 0.0
+        self._rows = 0
+
+    @property
+    def row_factory(self):
+        return self._cursor.row_factory
+
+    @row_factory.setter
+    def row_factory(self, factory):
+        self._cursor.row_factory = factory
+
+    def _begin(self, sql, params, run):
+        self._finish()
+        start = time.perf_counter()
+        self._stats.started(sql, start)
+        run()
+        self._sql, self._params = sql, params
+        self._elapsed = time.perf_counter() - start
+        self._rows = 0
+        if self._cursor.description is None:  # no result rows to fetch
+            self._rows = max(self._cursor.rowcount, 0)
+            self._finish()
+        return self
+
+    def _finish(self):
+        if self._sql is not None:
+            self._stats.finished(self._sql, self._params, self._elapsed, self._rows)
+            self._sql = None
+
+    def execute(self, sql, params=()):
+        return self._begin(sql, params, lambda: self._cursor.execute(sql, params))
+
+    def executemany(self, sql, seq_of_params):
+        return self._begin(sql, "<many>", lambda: self._cursor.executemany(sql, seq_of_params))
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = self._cursor.fetchone()
+        if self._sql is not None:
+            self._elapsed += time.perf_counter() - start
+            self._rows += row is not None
+            self._finish()
+        return row
+
+    def fetchmany(self, size=None):
+        start = time.perf_counter()
+        rows = self._cursor.fetchmany(size if size is not None else self._cursor.arraysize)
+        if self._sql is not None:
+            self._elapsed += time.perf_counter() - start
+            self._rows += len(rows)
+            if not rows:
+                self._finish()
+        return rows
+
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = self._cursor.fetchall()
+        if self._sql is not None:
+            self._elapsed += time.perf_counter() - start
+            self._rows += len(rows)
+            self._finish()
+        return rows
+
+    def __iter__(self):
+        while True:
+            rows = self.fetchmany(100)
+            if not rows:
+                return
+            yield from rows
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __del__(self):
+        # A cursor abandoned before its rows were consumed still counts.
+        try:
+            self._finish()
+        except Exception:
+            pass
+
+class InstrumentedConnection:
+    """Wraps a sqlite3 connection so every statement goes through InstrumentedCursor."""
+
+    __slots__ = ("_conn", "_stats")
+
+    def __init__(self, conn, stats):
+        self._conn = conn
+        self._stats = stats
+
+    def cursor(self):
+        return InstrumentedCursor(self._conn.cursor(), self._stats)
+
+    def execute(self, sql, params=()):
+        return self.cursor().execute(sql, params)
+
+    def executemany(self, sql, seq_of_params):
+        return self.cursor().executemany(sql, seq_of_params)
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+def format_stats(snapshot, limit=15):
+    """Human-readable lines for the CLI `stats` command."""
+    lines = []
+    statements = snapshot["statements"]
+    lines.append(f"{len(statements)} distinct statements, "
+                 f"{sum(s['calls'] for s in statements)} executions")
+    for s in statements[:limit]:
+        lines.append(f"  {s['calls']:>7} calls {s['total_ms']:>10.1f} ms total {s['avg_ms']:>8.3f} ms avg "
+                     f"{s['max_ms']:>8.1f} ms max {s['rows']:>8} rows  {s['sql'][:80]}")
+        busy = [f"{k}:{v}" for k, v in s["histogram"].items() if v]
+        lines.append(f"          {' '.join(busy)}")
+    if snapshot["n_plus_one"]:
+        lines.append("Possible N+1 patterns (statement, largest burst):")
+        for sql, burst in snapshot["n_plus_one"].items():
+            lines.append(f"  {burst:>7}x  {sql[:100]}")
+    if snapshot["slow_queries"]:
+        lines.append("Slow queries (most recent last):")
+        for q in snapshot["slow_queries"][-limit:]:
+            lines.append(f"  {q['ms']:>8.1f} ms {q['rows']:>7} rows  {q['sql'][:80]}  {q['params']}")
+    return lines
@@ -0,0 +1,57 @@
+# lib/maintenance.py
+# ----------------------------------------
+# Database housekeeping. sweep_orphans() removes rows whose parent is
+# gone: pets of deleted owners, and appointments, medical records
+# (hot and archived) and health-summary rows of deleted pets. Such rows
+# come from databases written before foreign keys were enforced. Each
+# table is cleaned by one NOT EXISTS anti-join, probing the parent's
+# primary key per row.
+# ----------------------------------------
+
+from lib.database import has_archive, invalidate_caches, transaction
+from lib.models.pet import Pet
+
+# (table, foreign key column, parent table) swept after orphaned pets
+# (and everything depending on them) are gone. The archive.* ones are
+# skipped while there is no archive database.
+PET_DEPENDENTS = (
+    ("appointments", "pet_id", "pets"),
+    ("medical_records", "pet_id", "pets"),
+    ("pet_treatments", "pet_id", "pets"),
+    ("pet_health", "pet_id", "pets"),
+    ("archived_treatments", "pet_id", "pets"),
+    ("archive.appointments", "pet_id", "pets"),
+    ("archive.medical_records", "pet_id", "pets"),
+)
+
+class _DryRun(Exception):
+    pass
+
+def _orphaned(table, column, parent):
+    return f"{column} IS NOT NULL AND NOT EXISTS (SELECT 1 FROM {parent} WHERE {parent}.id = {table}.{column})"
+
+def sweep_orphans(dry_run=False):
+    """
+    Delete orphaned rows in one transaction and return {table: rows deleted}.
+    With dry_run=True the deletes are rolled back, so only the counts are
+    reported.
+    """
+    counts = {}
+    dependents = [d for d in PET_DEPENDENTS if has_archive() or not d[0].startswith("archive.")]
+    try:
+        with transaction() as conn:
+            # Pets without an owner go with their appointments and records.
+            deleted = []
+            Pet._cascade(conn, _orphaned("pets", "owner_id", "owners"), (), deleted, hydrate=False)
+            for model, count in deleted:
+                counts[model.TABLE] = count
+            for table, column, parent in dependents:
+                count = conn.execute(f"DELETE FROM {table} WHERE {_orphaned(table, column, parent)}").rowcount
+                counts[table] = counts.get(table, 0) + count
+            if dry_run:
+                raise _DryRun
+    except _DryRun:
+        return counts
+    if any(counts.values()):
+        invalidate_caches()
+    return counts
@@ -0,0 +1,401 @@
+# lib/migrations.py
+# ----------------------------------------
+# Ordered schema migrations. The database's PRAGMA user_version records
+# how many of them have been applied; migrate() runs only the rest.
+# Never edit a released migration — append a new one instead.
+# A migration step is either an SQL string or a callable taking the
+# connection, for data fixes that need Python.
+# ----------------------------------------
+
+from lib.dates import normalize_date
+
+def _normalize_dates(conn, table, column):
+    """Rewrite free-form dates in table.column as ISO so range queries work."""
+    rows = conn.execute(
+        f"SELECT id, {column} FROM {table} "
+        f"WHERE {column} IS NOT NULL AND {column} NOT GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]'"
+    ).fetchall()
+    for row_id, value in rows:
+        try:
+            fixed = normalize_date(value)
+        except ValueError:
+            continue  # leave unparseable legacy text as it is
+        conn.execute(f"UPDATE {table} SET {column}=? WHERE id=?", (fixed, row_id))
+
+def _normalize_appointment_dates(conn):
+    _normalize_dates(conn, "appointments", "date")
+
+def _normalize_record_dates(conn):
+    _normalize_dates(conn, "medical_records", "record_date")
+
+# Tables with an FTS5 index (see lib/search.py) and the columns indexed.
+FTS_TABLES = {
+    "owners": ("name", "contact"),
+    "pets": ("name", "species", "breed"),
+    "appointments": ("reason", "notes"),
+    "medical_records": ("treatment", "notes"),
+}
+
+def fts_triggers(table, columns):
+    """SQL for the triggers that keep {table}_fts in sync with `table`."""
+    fts = f"{table}_fts"
+    cols = ", ".join(columns)
+    new = ", ".join(f"new.{c}" for c in columns)
+    old = ", ".join(f"old.{c}" for c in columns)
+    return (
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN "
+        f"INSERT INTO {fts} (rowid, {cols}) VALUES (new.id, {new}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN "
+        f"INSERT INTO {fts} ({fts}, rowid, {cols}) VALUES ('delete', old.id, {old}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {cols} ON {table} BEGIN "
+        f"INSERT INTO {fts} ({fts}, rowid, {cols}) VALUES ('delete', old.id, {old}); "
+        f"INSERT INTO {fts} (rowid, {cols}) VALUES (new.id, {new}); END",
+    )
+
+def _fts_table(table):
+    """
+    SQL for an external-content FTS5 index over `table`, its sync triggers,
+    and a rebuild that indexes the rows already present.
+    prefix='2 3 4' adds prefix indexes so type-ahead queries stay fast.
+    """
+    fts = f"{table}_fts"
+    cols = ", ".join(FTS_TABLES[table])
+    return (
+        f"CREATE VIRTUAL TABLE {fts} USING fts5({cols}, content='{table}', content_rowid='id', prefix='2 3 4')",
+        *fts_triggers(table, FTS_TABLES[table]),
+        f"INSERT INTO {fts} ({fts}) VALUES ('rebuild')",
+    )
+
+# Default repeat intervals (days) used to compute treatment due dates.
+TREATMENT_INTERVALS = {
+    "Rabies Vaccine": 365,
+    "Distemper Vaccine": 365,
+    "Deworming": 90,
+    "Flea Treatment": 30,
+    "Dental Scaling": 365,
+}
+
+def _due_date(last_date, treatment):
+    """SQL expression: last_date plus the interval for treatment (NULL if none)."""
+    return (
+        f"date({last_date}, '+' || (SELECT interval_days FROM treatment_intervals "
+        f"WHERE treatment_intervals.treatment = {treatment}) || ' days')"
+    )
+
+def _recompute_treatment(ref):
+    """
+    SQL recomputing the pet_treatments row for the old/new record `ref`
+    from the hot records and the pet's archived_treatments row.
+    """
+    return (
+        f"DELETE FROM pet_treatments WHERE pet_id = {ref}.pet_id AND treatment = {ref}.treatment; "
+        f"INSERT INTO pet_treatments (pet_id, treatment, last_date, due_date) "
+        f"SELECT pet_id, treatment, MAX(last_date), {_due_date('MAX(last_date)', 'latest.treatment')} "
+        f"FROM (SELECT pet_id, treatment, record_date AS last_date FROM medical_records "
+        f"WHERE pet_id = {ref}.pet_id AND treatment = {ref}.treatment COLLATE NOCASE AND record_date IS NOT NULL "
+        f"UNION ALL SELECT pet_id, treatment, last_date FROM archived_treatments "
+        f"WHERE pet_id = {ref}.pet_id AND treatment = {ref}.treatment) AS latest GROUP BY pet_id;"
+    )
+
+def archived_treatments_upsert(source, where=""):
+    """
+    SQL folding the latest record per pet and treatment in `source` (a
+    medical_records table) into archived_treatments.
+    """
+    return (
+        "INSERT INTO archived_treatments (pet_id, treatment, last_date) "
+        f"SELECT pet_id, treatment, MAX(record_date) FROM {source} "
+        f"WHERE pet_id IS NOT NULL AND treatment IS NOT NULL AND record_date IS NOT NULL {where} "
+        "GROUP BY pet_id, treatment COLLATE NOCASE "
+        "ON CONFLICT (pet_id, treatment) DO UPDATE SET last_date = excluded.last_date "
+        "WHERE excluded.last_date > archived_treatments.last_date"
+    )
+
+def _recompute_next_appointment(pet_id):
+    """SQL recomputing pet_health.next_appointment for `pet_id` as of today."""
+    return (
+        f"INSERT INTO pet_health (pet_id, next_appointment) "
+        f"SELECT {pet_id}, (SELECT MIN(date) FROM appointments WHERE pet_id = {pet_id} "
+        f"AND date >= date('now', 'localtime')) WHERE {pet_id} IS NOT NULL "
+        f"ON CONFLICT (pet_id) DO UPDATE SET next_appointment = excluded.next_appointment;"
+    )
+
+# Triggers keeping pet_treatments / pet_health (see lib/health.py) current.
+# The medical_records and appointments ones can be dropped for bulk loads.
+HEALTH_TRIGGERS = {
+    "health_records_ai": (
+        "CREATE TRIGGER IF NOT EXISTS health_records_ai AFTER INSERT ON medical_records "
+        "WHEN new.pet_id IS NOT NULL AND new.treatment IS NOT NULL AND new.record_date IS NOT NULL BEGIN "
+        "INSERT INTO pet_treatments (pet_id, treatment, last_date, due_date) "
+        f"VALUES (new.pet_id, new.treatment, new.record_date, {_due_date('new.record_date', 'new.treatment')}) "
+        "ON CONFLICT (pet_id, treatment) DO UPDATE SET last_date = excluded.last_date, "
+        "due_date = excluded.due_date WHERE excluded.last_date > pet_treatments.last_date; END"
+    ),
+    "health_records_ad": (
+        "CREATE TRIGGER IF NOT EXISTS health_records_ad AFTER DELETE ON medical_records BEGIN "
+        f"{_recompute_treatment('old')} END"
+    ),
+    "health_records_au": (
+        "CREATE TRIGGER IF NOT EXISTS health_records_au "
+        "AFTER UPDATE OF pet_id, record_date, treatment ON medical_records BEGIN "
+        f"{_recompute_treatment('old')} {_recompute_treatment('new')} END"
+    ),
+    "health_appointments_ai": (
+        "CREATE TRIGGER IF NOT EXISTS health_appointments_ai AFTER INSERT ON appointments BEGIN "
+        f"{_recompute_next_appointment('new.pet_id')} END"
+    ),
+    "health_appointments_ad": (
+        "CREATE TRIGGER IF NOT EXISTS health_appointments_ad AFTER DELETE ON appointments BEGIN "
+        f"{_recompute_next_appointment('old.pet_id')} END"
+    ),
+    "health_appointments_au": (
+        "CREATE TRIGGER IF NOT EXISTS health_appointments_au AFTER UPDATE OF pet_id, date ON appointments BEGIN "
+        f"{_recompute_next_appointment('old.pet_id')} {_recompute_next_appointment('new.pet_id')} END"
+    ),
+    "health_pets_ad": (
+        "CREATE TRIGGER IF NOT EXISTS health_pets_ad AFTER DELETE ON pets BEGIN "
+        "DELETE FROM pet_treatments WHERE pet_id = old.id; "
+        "DELETE FROM archived_treatments WHERE pet_id = old.id; "
+        "DELETE FROM pet_health WHERE pet_id = old.id; END"
+    ),
+    "health_intervals_ai": (
+        "CREATE TRIGGER IF NOT EXISTS health_intervals_ai AFTER INSERT ON treatment_intervals BEGIN "
+        "UPDATE pet_treatments SET due_date = date(last_date, '+' || new.interval_days || ' days') "
+        "WHERE treatment = new.treatment; END"
+    ),
+    "health_intervals_au": (
+        "CREATE TRIGGER IF NOT EXISTS health_intervals_au AFTER UPDATE ON treatment_intervals BEGIN "
+        "UPDATE pet_treatments SET due_date = NULL WHERE treatment = old.treatment; "
+        "UPDATE pet_treatments SET due_date = date(last_date, '+' || new.interval_days || ' days') "
+        "WHERE treatment = new.treatment; END"
+    ),
+    "health_intervals_ad": (
+        "CREATE TRIGGER IF NOT EXISTS health_intervals_ad AFTER DELETE ON treatment_intervals BEGIN "
+        "UPDATE pet_treatments SET due_date = NULL WHERE treatment = old.treatment; END"
+    ),
+}
+
+# Full rebuild of the health summary tables from the source rows.
+HEALTH_REBUILD = (
+    "DELETE FROM pet_treatments",
+    "INSERT INTO pet_treatments (pet_id, treatment, last_date, due_date) "
+    f"SELECT pet_id, treatment, MAX(record_date), {_due_date('MAX(record_date)', 'medical_records.treatment')} "
+    "FROM medical_records WHERE pet_id IS NOT NULL AND treatment IS NOT NULL AND record_date IS NOT NULL "
+    "GROUP BY pet_id, treatment COLLATE NOCASE",
+    "DELETE FROM pet_health",
+    "INSERT INTO pet_health (pet_id, next_appointment) "
+    "SELECT pet_id, MIN(date) FROM appointments "
+    "WHERE pet_id IS NOT NULL AND date >= date('now', 'localtime') GROUP BY pet_id",
+)
+
+# Run after HEALTH_REBUILD: archived records still count towards a pet's
+# latest treatment.
+HEALTH_REBUILD_ARCHIVE = (
+    "INSERT INTO pet_treatments (pet_id, treatment, last_date, due_date) "
+    f"SELECT a.pet_id, a.treatment, a.last_date, {_due_date('a.last_date', 'a.treatment')} "
+    "FROM archived_treatments a JOIN pets p ON p.id = a.pet_id WHERE true "
+    "ON CONFLICT (pet_id, treatment) DO UPDATE SET last_date = excluded.last_date, "
+    "due_date = excluded.due_date WHERE excluded.last_date > pet_treatments.last_date"
+)
+
+def _backfill_archived_treatments(conn):
+    """Fill archived_treatments from an archive attached before migration 8."""
+    if any(row[1] == "archive" for row in conn.execute("PRAGMA database_list")):
+        conn.execute(archived_treatments_upsert("archive.medical_records"))
+        conn.execute(HEALTH_REBUILD_ARCHIVE)
+
+MIGRATIONS = [
+    # 1: base tables (IF NOT EXISTS so databases created before
+    #    versioning was introduced upgrade cleanly)
+    (
+        '''
+        CREATE TABLE IF NOT EXISTS owners (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            contact TEXT NOT NULL
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS pets (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            age INTEGER,
+            species TEXT,
+            breed TEXT,
+            owner_id INTEGER,
+            FOREIGN KEY (owner_id) REFERENCES owners(id)
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS appointments (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            pet_id INTEGER,
+            date TEXT,
+            reason TEXT,
+            vet_name TEXT,
+            notes TEXT,
+            FOREIGN KEY (pet_id) REFERENCES pets(id)
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS medical_records (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            pet_id INTEGER,
+            record_date TEXT,
+            treatment TEXT,
+            notes TEXT,
+            FOREIGN KEY (pet_id) REFERENCES pets(id)
+        )
+        ''',
+    ),
+    # 2: secondary indexes for the find_by_* lookups and date/vet queries
+    (
+        "CREATE INDEX IF NOT EXISTS idx_pets_owner ON pets (owner_id)",
+        "CREATE INDEX IF NOT EXISTS idx_appointments_pet_date ON appointments (pet_id, date)",
+        "CREATE INDEX IF NOT EXISTS idx_appointments_vet_date ON appointments (vet_name, date)",
+        "CREATE INDEX IF NOT EXISTS idx_medical_records_pet_date ON medical_records (pet_id, record_date)",
+    ),
+    # 3: appointment start time and length for vet schedules; ISO dates;
+    #    date indexes extended with time so schedules come back pre-sorted
+    (
+        "ALTER TABLE appointments ADD COLUMN time TEXT",
+        "ALTER TABLE appointments ADD COLUMN duration INTEGER NOT NULL DEFAULT 30",
+        _normalize_appointment_dates,
+        "DROP INDEX IF EXISTS idx_appointments_pet_date",
+        "DROP INDEX IF EXISTS idx_appointments_vet_date",
+        "CREATE INDEX idx_appointments_pet_date ON appointments (pet_id, date, time)",
+        "CREATE INDEX idx_appointments_vet_date ON appointments (vet_name, date, time)",
+    ),
+    # 4: FTS5 full-text/prefix search (see lib/search.py)
+    (
+        *_fts_table("owners"),
+        *_fts_table("pets"),
+        *_fts_table("appointments"),
+        *_fts_table("medical_records"),
+    ),
+    # 5: materialized health summary for the due/overdue report
+    #    (see lib/health.py): latest record and due date per pet and
+    #    treatment, and each pet's next appointment, kept by triggers
+    (
+        _normalize_record_dates,
+        """
+        CREATE TABLE treatment_intervals (
+            treatment TEXT PRIMARY KEY COLLATE NOCASE,
+            interval_days INTEGER NOT NULL
+        )
+        """,
+        *(
+            f"INSERT INTO treatment_intervals VALUES ('{treatment}', {days})"
+            for treatment, days in TREATMENT_INTERVALS.items()
+        ),
+        """
+        CREATE TABLE pet_treatments (
+            pet_id INTEGER NOT NULL,
+            treatment TEXT NOT NULL COLLATE NOCASE,
+            last_date TEXT NOT NULL,
+            due_date TEXT,
+            PRIMARY KEY (pet_id, treatment)
+        ) WITHOUT ROWID
+        """,
+        "CREATE INDEX idx_pet_treatments_due ON pet_treatments (due_date) WHERE due_date IS NOT NULL",
+        """
+        CREATE TABLE pet_health (
+            pet_id INTEGER PRIMARY KEY,
+            next_appointment TEXT
+        )
+        """,
+        "CREATE INDEX idx_pet_health_next ON pet_health (next_appointment)",
+        *HEALTH_TRIGGERS.values(),
+        *HEALTH_REBUILD,
+    ),
+    # 6: clinic-wide date index for the reminder window (lib/reminders.py)
+    (
+        "CREATE INDEX idx_appointments_date ON appointments (date, time)",
+    ),
+    # 7: record date index for picking rows to archive (lib/archive.py)
+    (
+        "CREATE INDEX idx_medical_records_date ON medical_records (record_date)",
+    ),
+    # 8: latest archived record per pet and treatment, so the summary
+    #    triggers (which cannot read another database) still count
+    #    archived history when hot records change. Databases created
+    #    from scratch already got the new triggers in migration 5.
+    (
+        """
+        CREATE TABLE archived_treatments (
+            pet_id INTEGER NOT NULL,
+            treatment TEXT NOT NULL COLLATE NOCASE,
+            last_date TEXT NOT NULL,
+            PRIMARY KEY (pet_id, treatment)
+        ) WITHOUT ROWID
+        """,
+        *(f"DROP TRIGGER IF EXISTS {name}" for name in ("health_records_ad", "health_records_au", "health_pets_ad")),
+        *(HEALTH_TRIGGERS[name] for name in ("health_records_ad", "health_records_au", "health_pets_ad")),
+        _backfill_archived_treatments,
+    ),
+]
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
+# Tables in the archive database (lib/archive.py), created by
+# database.create_archive() when rows are first archived. Columns must
+# stay in the same order as the hot tables, since rows are copied with
+# SELECT *; a migration adding a column to a hot table has to add it
+# here too.
+ARCHIVE_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS archive.appointments (
+        id INTEGER PRIMARY KEY,
+        pet_id INTEGER,
+        date TEXT,
+        reason TEXT,
+        vet_name TEXT,
+        notes TEXT,
+        time TEXT,
+        duration INTEGER NOT NULL DEFAULT 30
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS archive.idx_appointments_pet_date ON appointments (pet_id, date, time)",
+    """
+    CREATE TABLE IF NOT EXISTS archive.medical_records (
+        id INTEGER PRIMARY KEY,
+        pet_id INTEGER,
+        record_date TEXT,
+        treatment TEXT,
+        notes TEXT
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS archive.idx_medical_records_pet_date ON medical_records (pet_id, record_date)",
+)
+
+def schema_version(conn):
+    """Return the number of migrations applied to this database."""
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+def migrate(conn):
+    """
+    Apply every pending migration in order. Each migration runs in its own
+    transaction together with its user_version bump, so a failure leaves
+    the database at the last fully applied version. The version is re-read
+    under the write lock, so concurrent processes never apply one twice.
+    Returns the list of version numbers applied (empty if already current).
+    """
+    applied = []
+    while True:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            version = schema_version(conn) + 1
+            if version > SCHEMA_VERSION:
+                conn.rollback()
+                return applied
+            for step in MIGRATIONS[version - 1]:
+                if callable(step):
+                    step(conn)
+                else:
+                    conn.execute(step)
+            conn.execute(f"PRAGMA user_version = {version}")
+        except BaseException:
+            conn.rollback()
+            raise
+        conn.commit()
+        applied.append(version)
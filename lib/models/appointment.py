@@ -1,35 +1,166 @@
 # lib/models/appointment.py
 # ----------------------------------------
 # Represents the "appointments" table for pet vet visits.
+# Dates are stored as ISO "YYYY-MM-DD" (see lib/dates.py), so the
+# date-range queries below are index range scans on
+# (pet_id, date), (vet_name, date) and (date).
 # ----------------------------------------
 
-from lib.database import CURSOR, CONN
+import logging
 
-class Appointment:
-    def __init__(self, pet_id, date, reason, vet_name, notes, id=None):
+from lib.database import get_connection, transaction
+from lib.dates import normalize_date, normalize_time, today
+from lib.models.base import CHUNK_SIZE, Model
+
+log = logging.getLogger("petcare.appointments")
+
+# Callables run as listener(event, appointment) after an appointment is
+# saved ("saved") or deleted ("deleted", cascaded deletes included)
+# through this class; see lib/reminders.py. Rows written by other
+# processes or by bulk imports (lib/transfer.py) do not notify. The write
+# has already happened, so a failing listener is logged and the rest
+# still run.
+_listeners = []
+
+def add_listener(listener):
+    """Register a callable to be told about saved and deleted appointments."""
+    _listeners.append(listener)
+
+def remove_listener(listener):
+    """Unregister a callable added with add_listener()."""
+    if listener in _listeners:
+        _listeners.remove(listener)
+
+def _notify(event, appointment):
+    for listener in list(_listeners):
+        try:
+            listener(event, appointment)
+        except Exception:
+            log.exception("Appointment listener %r failed on %s", listener, event)
+
+class Appointment(Model):
+    TABLE = "appointments"
+    COLUMNS = ("pet_id", "date", "reason", "vet_name", "notes", "time", "duration")
+    ARCHIVED = True
+    __slots__ = ("id", "pet_id", "date", "reason", "vet_name", "notes", "time", "duration")
+
+    def __init__(self, pet_id, date, reason, vet_name, notes=None, time=None, duration=30, id=None):
         self.id = id
         self.pet_id = pet_id
         self.date = date
         self.reason = reason
         self.vet_name = vet_name
         self.notes = notes
+        self.time = time
+        self.duration = duration
+
+    @classmethod
+    def _from_row(cls, row):
+        obj = cls.__new__(cls)
+        obj.id, obj.pet_id, obj.date, obj.reason, obj.vet_name, obj.notes, obj.time, obj.duration = row
+        return obj
+
+    def _values(self):
+        self.date = normalize_date(self.date)
+        self.time = normalize_time(self.time)
+        return super()._values()
 
     def save(self):
         """Insert a new appointment record."""
-        CURSOR.execute(
-            "INSERT INTO appointments (pet_id, date, reason, vet_name, notes) VALUES (?, ?, ?, ?, ?)",
-            (self.pet_id, self.date, self.reason, self.vet_name, self.notes)
-        )
-        CONN.commit()
-        self.id = CURSOR.lastrowid
+        values = self._values()
+        with transaction() as conn:
+            cursor = conn.execute(
+                "INSERT INTO appointments (pet_id, date, reason, vet_name, notes, time, duration) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                values
+            )
+            self.id = cursor.lastrowid
+        self._remember()
+        _notify("saved", self)
         return self
 
     @classmethod
-    def find_by_pet(cls, pet_id):
-        """Return all appointments for a given pet."""
-        rows = CURSOR.execute("SELECT * FROM appointments WHERE pet_id=?", (pet_id,)).fetchall()
-        return [cls(id=row[0], pet_id=row[1], date=row[2], reason=row[3], vet_name=row[4], notes=row[5]) for row in rows]
+    def save_many(cls, objects):
+        objects = super().save_many(objects)
+        for obj in objects:
+            _notify("saved", obj)
+        return objects
+
+    @classmethod
+    def _deleted(cls, objects):
+        super()._deleted(objects)
+        for obj in objects:
+            _notify("deleted", obj)
+
+    @classmethod
+    def find_by_pet(cls, pet_id, include_archive=False):
+        """Return all appointments for a given pet (archived ones too if asked)."""
+        return cls._select_pet(pet_id, include_archive)
 
+    @classmethod
+    def iter_by_pet(cls, pet_id, chunk_size=CHUNK_SIZE):
+        """Stream a pet's appointments in id order without loading them all."""
+        return cls._iter_where("pet_id=?", (pet_id,), chunk_size)
+
+    @classmethod
+    def upcoming_for_pet(cls, pet_id, as_of=None):
+        """Appointments for a pet on or after `as_of` (default today), soonest first."""
+        return cls._select(
+            "SELECT * FROM appointments WHERE pet_id=? AND date>=? ORDER BY date, time",
+            (pet_id, normalize_date(as_of) or today())
+        ).fetchall()
+
+    @classmethod
+    def past_for_pet(cls, pet_id, as_of=None):
+        """Appointments for a pet before `as_of` (default today), most recent first."""
+        return cls._select(
+            "SELECT * FROM appointments WHERE pet_id=? AND date<? ORDER BY date DESC, time DESC",
+            (pet_id, normalize_date(as_of) or today())
+        ).fetchall()
+
+    @classmethod
+    def next_appointment_for_pet(cls, pet_id, as_of=None):
+        """The pet's next appointment row (id first) on or after `as_of`, or None."""
+        return get_connection().execute(
+            "SELECT * FROM appointments WHERE pet_id=? AND date>=? ORDER BY date, time LIMIT 1",
+            (pet_id, normalize_date(as_of) or today())
+        ).fetchone()
 
+    @classmethod
+    def upcoming_for_owner(cls, owner_id, as_of=None):
+        """
+        Upcoming appointments across all of an owner's pets, as rows of
+        (appointment id, date, time, reason, vet_name, pet id, pet name).
+        """
+        return get_connection().execute(
+            "SELECT a.id, a.date, a.time, a.reason, a.vet_name, p.id, p.name "
+            "FROM pets p JOIN appointments a ON a.pet_id = p.id "
+            "WHERE p.owner_id=? AND a.date>=? ORDER BY a.date, a.time",
+            (owner_id, normalize_date(as_of) or today())
+        ).fetchall()
+
+    @classmethod
+    def between(cls, start, end):
+        """Every appointment with start <= date <= end, in date/time order."""
+        return cls._select(
+            "SELECT * FROM appointments WHERE date BETWEEN ? AND ? ORDER BY date, time",
+            (normalize_date(start), normalize_date(end))
+        ).fetchall()
 
+    @classmethod
+    def added_after(cls, last_id):
+        """Appointments with an id above `last_id`, in id order (ids only grow: AUTOINCREMENT)."""
+        return cls._select("SELECT * FROM appointments WHERE id > ? ORDER BY id", (last_id,)).fetchall()
 
+    @classmethod
+    def current(cls, ids):
+        """The appointments among `ids` that still exist, read from the database."""
+        return cls._select_in("id", ids).fetchall()
+
+    @classmethod
+    def for_vet(cls, vet_name, start, end):
+        """A vet's appointments with start <= date <= end, in date/time order."""
+        return cls._select(
+            "SELECT * FROM appointments WHERE vet_name=? AND date BETWEEN ? AND ? ORDER BY date, time",
+            (vet_name, normalize_date(start), normalize_date(end))
+        ).fetchall()
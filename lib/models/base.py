@@ -0,0 +1,217 @@
+# lib/models/base.py
+# ----------------------------------------
+# Shared behaviour for the table-backed model classes.
+# Each model declares TABLE and COLUMNS (every column except id,
+# in table order, matching its __init__ argument order), __slots__
+# for those attributes, and a _from_row() that fills them from a row.
+# CHILDREN lists (model, foreign key column) pairs for the rows that
+# depend on it, which delete_many() removes first. ARCHIVED models may
+# also have older rows in the archive database, when one exists (see
+# lib/archive.py).
+# ----------------------------------------
+
+import json
+import os
+
+from lib.cache import IdentityMap
+from lib.database import (
+    add_invalidation_hook, after_commit, get_connection, has_archive, in_transaction, transaction
+)
+from lib.models.rowset import RowSet
+
+# Rows fetched per query by the iter_* generators.
+CHUNK_SIZE = 1000
+
+# Identity map shared by every model class, keyed by (table, id), with
+# one cache per thread. While an object is cached, find_by_id on that
+# thread returns that same object. Only committed state goes in: writes
+# publish their objects after the outermost transaction commits.
+identity_map = IdentityMap(int(os.environ.get("PETCARE_CACHE_SIZE", 10000)))
+add_invalidation_hook(identity_map.clear)
+
+def cache_stats():
+    """Hit/miss/eviction counters for the identity map."""
+    return identity_map.stats()
+
+class Model:
+    __slots__ = ()
+    TABLE = None
+    COLUMNS = ()
+    CHILDREN = ()
+    ARCHIVED = False
+
+    @classmethod
+    def _from_row(cls, row):
+        """Build an object from a SELECT * row (id first)."""
+        return cls(*row[1:], id=row[0])
+
+    @classmethod
+    def _select(cls, sql, params=()):
+        """
+        Run a SELECT * query whose cursor hydrates rows straight into model
+        objects (via row_factory), so no intermediate list of tuples is built.
+        """
+        from_row = cls._from_row
+        cursor = get_connection().cursor()
+        cursor.row_factory = lambda _cursor, row: from_row(row)
+        return cursor.execute(sql, params)
+
+    @classmethod
+    def _select_in(cls, column, values, order="id"):
+        """
+        SELECT * rows whose `column` is any of `values`, in one query however
+        many values there are (they are passed as a single JSON array).
+        """
+        return cls._select(
+            f"SELECT * FROM {cls.TABLE} WHERE {column} IN (SELECT value FROM json_each(?)) ORDER BY {order}",
+            (json.dumps(list(values)),)
+        )
+
+    @classmethod
+    def _select_pet(cls, pet_id, include_archive=False):
+        """A pet's rows in id order; with include_archive, archived rows too."""
+        sql = f"SELECT * FROM {cls.TABLE} WHERE pet_id=?"
+        params = (pet_id,)
+        if include_archive and cls.ARCHIVED and has_archive():
+            # UNION, not UNION ALL: a row being archived is briefly in both.
+            sql += f" UNION SELECT * FROM archive.{cls.TABLE} WHERE pet_id=?"
+            params += (pet_id,)
+        return cls._select(sql + " ORDER BY id", params).fetchall()
+
+    @classmethod
+    def _rows(cls, where="", params=()):
+        """A lazy RowSet over the raw rows matching `where`, in id order."""
+        sql = f"SELECT * FROM {cls.TABLE} {'WHERE ' + where if where else ''} ORDER BY id"
+        return RowSet(cls, get_connection().execute(sql, params).fetchall())
+
+    @classmethod
+    def all_rows(cls):
+        """Every row as a lazy RowSet; objects are built only when accessed."""
+        return cls._rows()
+
+    def _values(self):
+        """Column values for this object, in COLUMNS order."""
+        return tuple(getattr(self, column) for column in self.COLUMNS)
+
+    def _remember(self):
+        """Put this object in the identity map once its save or update commits."""
+        after_commit(lambda: identity_map.publish((self.TABLE, self.id), self))
+
+    def _forget(self):
+        """Drop this object from the identity map once its delete commits."""
+        after_commit(lambda: identity_map.discard((self.TABLE, self.id)))
+
+    @classmethod
+    def find_by_id(cls, id):
+        """Find a row by primary key, served from the identity map when cached."""
+        key = (cls.TABLE, id)
+        obj = identity_map.get(key)
+        if obj is not None:
+            return obj
+        generation = identity_map.generation
+        obj = cls._select(f"SELECT * FROM {cls.TABLE} WHERE id=?", (id,)).fetchone()
+        # Inside a transaction the row may hold this thread's uncommitted writes.
+        if obj is not None and not in_transaction():
+            identity_map.put_if_current(key, obj, generation)
+        return obj
+
+    def delete(self):
+        """Delete this row and, first, every row that depends on it."""
+        self.delete_many([self.id])
+
+    @classmethod
+    def delete_many(cls, ids):
+        """
+        Delete the rows with these ids and their dependent rows (CHILDREN,
+        recursively) in one transaction, with one set-based DELETE per
+        table however many ids there are. Returns the number of rows of
+        this table deleted.
+        """
+        deleted = []
+        has_archive()  # attach a newly created archive while we still can
+        with transaction() as conn:
+            count = cls._cascade(
+                conn, "id IN (SELECT value FROM json_each(?))", (json.dumps(list(ids)),), deleted
+            )
+        for model, objects in deleted:
+            model._deleted(objects)
+        return count
+
+    @classmethod
+    def _cascade(cls, conn, where, params, deleted, hydrate=True):
+        """
+        Delete this table's rows matching `where`, children first, appending
+        (model, removed objects) to `deleted` for each table so caches can
+        be told. With hydrate=False, (model, row count) is appended instead.
+        Returns the number of this table's rows deleted.
+        """
+        for child, column in cls.CHILDREN:
+            child._cascade(conn, f"{column} IN (SELECT id FROM {cls.TABLE} WHERE {where})", params, deleted, hydrate)
+        if cls.ARCHIVED and has_archive():
+            conn.execute(f"DELETE FROM archive.{cls.TABLE} WHERE {where}", params)
+        if not hydrate:
+            count = conn.execute(f"DELETE FROM {cls.TABLE} WHERE {where}", params).rowcount
+            deleted.append((cls, count))
+            return count
+        rows = conn.execute(f"DELETE FROM {cls.TABLE} WHERE {where} RETURNING *", params).fetchall()
+        deleted.append((cls, [cls._from_row(row) for row in rows]))
+        return len(rows)
+
+    @classmethod
+    def _deleted(cls, objects):
+        """Called with the objects delete_many() removed, after it commits."""
+        for obj in objects:
+            obj._forget()
+
+    @classmethod
+    def save_many(cls, objects):
+        """
+        Bulk-insert many objects with a single executemany() and one commit,
+        filling in each object's new id. Returns the list of saved objects.
+        """
+        objects = list(objects)
+        if not objects:
+            return objects
+        sql = "INSERT INTO {} ({}) VALUES ({})".format(
+            cls.TABLE, ", ".join(cls.COLUMNS), ", ".join("?" * len(cls.COLUMNS))
+        )
+        with transaction() as conn:
+            conn.executemany(sql, (obj._values() for obj in objects))
+            # Inside one write transaction AUTOINCREMENT ids are handed out
+            # consecutively, so the batch ends at last_insert_rowid().
+            last_id = conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+        first_id = last_id - len(objects) + 1
+        for offset, obj in enumerate(objects):
+            obj.id = first_id + offset
+        return objects
+
+    @classmethod
+    def page(cls, after_id=0, limit=50):
+        """
+        Return up to `limit` objects with id greater than `after_id`, in id
+        order. Pass the last id of one page as `after_id` to get the next.
+        """
+        return cls._select(
+            f"SELECT * FROM {cls.TABLE} WHERE id > ? ORDER BY id LIMIT ?", (after_id, limit)
+        ).fetchall()
+
+    @classmethod
+    def iter_all(cls, chunk_size=CHUNK_SIZE):
+        """Stream every row in id order, fetching `chunk_size` rows per query."""
+        return cls._iter_where("", (), chunk_size)
+
+    @classmethod
+    def _iter_where(cls, where, params, chunk_size=CHUNK_SIZE):
+        """
+        Keyset pagination: each chunk restarts the query after the last id
+        seen, so memory stays flat and no read transaction is held open
+        between chunks.
+        """
+        sql = f"SELECT * FROM {cls.TABLE} WHERE {where + ' AND ' if where else ''}id > ? ORDER BY id LIMIT ?"
+        after_id = 0
+        while True:
+            objects = cls._select(sql, (*params, after_id, chunk_size)).fetchall()
+            yield from objects
+            if len(objects) < chunk_size:
+                return
+            after_id = objects[-1].id
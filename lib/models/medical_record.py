@@ -1,11 +1,20 @@
 # lib/models/medical_record.py
 # ----------------------------------------
 # Represents the "medical_records" table for pet health logs.
+# record_date is stored as ISO "YYYY-MM-DD" (see lib/dates.py); each
+# insert also updates the due-date summary in lib/health.py by trigger.
 # ----------------------------------------
 
-from lib.database import CURSOR, CONN
+from lib.database import transaction
+from lib.dates import normalize_date
+from lib.models.base import CHUNK_SIZE, Model
+
+class MedicalRecord(Model):
+    TABLE = "medical_records"
+    COLUMNS = ("pet_id", "record_date", "treatment", "notes")
+    ARCHIVED = True
+    __slots__ = ("id", "pet_id", "record_date", "treatment", "notes")
 
-class MedicalRecord:
     def __init__(self, pet_id, record_date, treatment, notes, id=None):
         self.id = id
         self.pet_id = pet_id
@@ -13,48 +22,34 @@ class MedicalRecord:
         self.treatment = treatment
         self.notes = notes
 
-    def save(self):
-        """Insert a new medical record."""
-        CURSOR.execute(
-            "INSERT INTO medical_records (pet_id, record_date, treatment, notes) VALUES (?, ?, ?, ?)",
-            (self.pet_id, self.record_date, self.treatment, self.notes)
-        )
-        CONN.commit()
-        self.id = CURSOR.lastrowid
-        return self
-
     @classmethod
-    def find_by_pet(cls, pet_id):
-        """Get all medical records for a pet."""
-        rows = CURSOR.execute("SELECT * FROM medical_records WHERE pet_id=?", (pet_id,)).fetchall()
-        return [cls(id=row[0], pet_id=row[1], record_date=row[2], treatment=row[3], notes=row[4]) for row in rows]
-# lib/models/medical_record.py
-# ----------------------------------------
-# Represents the "medical_records" table for pet health logs.
-# ----------------------------------------
+    def _from_row(cls, row):
+        obj = cls.__new__(cls)
+        obj.id, obj.pet_id, obj.record_date, obj.treatment, obj.notes = row
+        return obj
 
-from lib.database import CURSOR, CONN
-
-class MedicalRecord:
-    def __init__(self, pet_id, record_date, treatment, notes, id=None):
-        self.id = id
-        self.pet_id = pet_id
-        self.record_date = record_date
-        self.treatment = treatment
-        self.notes = notes
+    def _values(self):
+        self.record_date = normalize_date(self.record_date)
+        return super()._values()
 
     def save(self):
         """Insert a new medical record."""
-        CURSOR.execute(
-            "INSERT INTO medical_records (pet_id, record_date, treatment, notes) VALUES (?, ?, ?, ?)",
-            (self.pet_id, self.record_date, self.treatment, self.notes)
-        )
-        CONN.commit()
-        self.id = CURSOR.lastrowid
+        values = self._values()
+        with transaction() as conn:
+            cursor = conn.execute(
+                "INSERT INTO medical_records (pet_id, record_date, treatment, notes) VALUES (?, ?, ?, ?)",
+                values
+            )
+            self.id = cursor.lastrowid
+        self._remember()
         return self
 
     @classmethod
-    def find_by_pet(cls, pet_id):
-        """Get all medical records for a pet."""
-        rows = CURSOR.execute("SELECT * FROM medical_records WHERE pet_id=?", (pet_id,)).fetchall()
-        return [cls(id=row[0], pet_id=row[1], record_date=row[2], treatment=row[3], notes=row[4]) for row in rows]
+    def find_by_pet(cls, pet_id, include_archive=False):
+        """Get all medical records for a pet (archived ones too if asked)."""
+        return cls._select_pet(pet_id, include_archive)
+
+    @classmethod
+    def iter_by_pet(cls, pet_id, chunk_size=CHUNK_SIZE):
+        """Stream a pet's medical records in id order without loading them all."""
+        return cls._iter_where("pet_id=?", (pet_id,), chunk_size)
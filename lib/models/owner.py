@@ -3,44 +3,122 @@
 # Represents the "owners" table and manages owner CRUD operations.
 # ----------------------------------------
 
-from lib.database import CURSOR, CONN
+from lib.database import after_commit, transaction
+from lib.models.base import Model
+from lib.models.pet import Pet
+from lib.models.appointment import Appointment
+from lib.models.medical_record import MedicalRecord
+from lib.search import fts_query, match_rows
+
+# Relations Owner.load_graph() can include.
+GRAPH_RELATIONS = ("pets", "appointments", "medical_records")
+
+class Owner(Model):
+    TABLE = "owners"
+    COLUMNS = ("name", "contact")
+    # pets is only set by load_graph().
+    __slots__ = ("id", "name", "contact", "pets")
+    CHILDREN = ((Pet, "owner_id"),)
 
-class Owner:
     def __init__(self, name, contact, id=None):
         self.id = id
         self.name = name
         self.contact = contact
 
+    @classmethod
+    def _from_row(cls, row):
+        obj = cls.__new__(cls)
+        obj.id, obj.name, obj.contact = row
+        return obj
+
     def save(self):
         """Insert a new owner record into the database."""
-        CURSOR.execute("INSERT INTO owners (name, contact) VALUES (?, ?)", (self.name, self.contact))
-        CONN.commit()
-        self.id = CURSOR.lastrowid
+        with transaction() as conn:
+            cursor = conn.execute("INSERT INTO owners (name, contact) VALUES (?, ?)", (self.name, self.contact))
+            self.id = cursor.lastrowid
+        self._remember()
         return self
 
     def update(self, name=None, contact=None):
-        """Update owner details."""
-        if name:
-            self.name = name
-        if contact:
-            self.contact = contact
-        CURSOR.execute("UPDATE owners SET name=?, contact=? WHERE id=?", (self.name, self.contact, self.id))
-        CONN.commit()
-
-    def delete(self):
-        """Delete an owner from the database."""
-        CURSOR.execute("DELETE FROM owners WHERE id=?", (self.id,))
-        CONN.commit()
+        """Update owner details; the object changes once the update commits."""
+        name = name or self.name
+        contact = contact or self.contact
+        with transaction() as conn:
+            conn.execute("UPDATE owners SET name=?, contact=? WHERE id=?", (name, contact, self.id))
+            after_commit(lambda: self._updated(name, contact))
+
+    def _updated(self, name, contact):
+        self.name = name
+        self.contact = contact
+        self._remember()
 
     @classmethod
     def get_all(cls):
         """Fetch all owners."""
-        rows = CURSOR.execute("SELECT * FROM owners").fetchall()
-        return [cls(id=row[0], name=row[1], contact=row[2]) for row in rows]
+        return cls._select("SELECT * FROM owners").fetchall()
+
+    @classmethod
+    def find_by_name(cls, name, limit=50):
+        """Owners whose name matches `name` (last word as a prefix), best match first."""
+        query = fts_query(name, column="name")
+        if query is None:
+            return []
+        rows = match_rows("owners_fts", "owners", "t.*", query, limit)
+        return [cls._from_row(row) for row in rows]
+
+    @classmethod
+    def load_graph(cls, owner_ids, include=GRAPH_RELATIONS):
+        """
+        Load owners with their pets and each pet's appointments and medical
+        records, using one query per level however many owners are asked
+        for, and wire them up as owner.pets, pet.appointments and
+        pet.medical_records. Including appointments or medical_records
+        implies pets. Returns owners in owner_ids order, skipping unknown ids.
+        """
+        owner_ids = list(owner_ids)
+        owners = {o.id: o for o in cls._select_in("id", owner_ids).fetchall()}
+        cls._attach(list(owners.values()), include)
+        return [owners[i] for i in dict.fromkeys(owner_ids) if i in owners]
 
     @classmethod
-    def find_by_id(cls, owner_id):
-        """Find an owner by their ID."""
-        row = CURSOR.execute("SELECT * FROM owners WHERE id=?", (owner_id,)).fetchone()
-        return cls(id=row[0], name=row[1], contact=row[2]) if row else None
+    def iter_graph(cls, include=GRAPH_RELATIONS, chunk_size=500):
+        """
+        Stream every owner with its object graph, `chunk_size` owners at a
+        time (keyset paginated), for clinic-wide roll-ups in flat memory.
+        """
+        after_id = 0
+        while True:
+            owners = cls.page(after_id, chunk_size)
+            if not owners:
+                return
+            cls._attach(owners, include)
+            yield from owners
+            after_id = owners[-1].id
 
+    @staticmethod
+    def _attach(owners, include):
+        include = set(include)
+        unknown = include - set(GRAPH_RELATIONS)
+        if unknown:
+            raise ValueError(f"Unknown relation(s): {', '.join(sorted(unknown))}")
+        if not include:
+            return
+        by_owner = {}
+        for owner in owners:
+            owner.pets = []
+            by_owner[owner.id] = owner
+        pets = Pet._select_in("owner_id", by_owner).fetchall()
+        by_pet = {}
+        for pet in pets:
+            by_owner[pet.owner_id].pets.append(pet)
+            by_pet[pet.id] = pet
+        if "appointments" in include:
+            for pet in pets:
+                pet.appointments = []
+            for appt in Appointment._select_in("pet_id", by_pet, "date, time, id"):
+                by_pet[appt.pet_id].appointments.append(appt)
+        if "medical_records" in include:
+            for pet in pets:
+                pet.medical_records = []
+            for record in MedicalRecord._select_in("pet_id", by_pet, "record_date, id"):
+                by_pet[record.pet_id].medical_records.append(record)
@@ -3,9 +3,19 @@
 # Represents the "pets" table and handles pet CRUD operations.
 # ----------------------------------------
 
-from lib.database import CURSOR, CONN
+from lib.database import transaction
+from lib.models.appointment import Appointment
+from lib.models.base import CHUNK_SIZE, Model
+from lib.models.medical_record import MedicalRecord
+from lib.search import fts_query, match_rows
+
+class Pet(Model):
+    TABLE = "pets"
+    COLUMNS = ("name", "age", "species", "breed", "owner_id")
+    # appointments / medical_records are only set by Owner.load_graph().
+    __slots__ = ("id", "name", "age", "species", "breed", "owner_id", "appointments", "medical_records")
+    CHILDREN = ((Appointment, "pet_id"), (MedicalRecord, "pet_id"))
 
-class Pet:
     def __init__(self, name, age, species, breed, owner_id, id=None):
         self.id = id
         self.name = name
@@ -14,29 +24,43 @@ class Pet:
         self.breed = breed
         self.owner_id = owner_id
 
+    @classmethod
+    def _from_row(cls, row):
+        obj = cls.__new__(cls)
+        obj.id, obj.name, obj.age, obj.species, obj.breed, obj.owner_id = row
+        return obj
+
     def save(self):
         """Insert a new pet into the database."""
-        CURSOR.execute(
-            "INSERT INTO pets (name, age, species, breed, owner_id) VALUES (?, ?, ?, ?, ?)",
-            (self.name, self.age, self.species, self.breed, self.owner_id)
-        )
-        CONN.commit()
-        self.id = CURSOR.lastrowid
+        with transaction() as conn:
+            cursor = conn.execute(
+                "INSERT INTO pets (name, age, species, breed, owner_id) VALUES (?, ?, ?, ?, ?)",
+                (self.name, self.age, self.species, self.breed, self.owner_id)
+            )
+            self.id = cursor.lastrowid
+        self._remember()
         return self
 
     @classmethod
     def get_all(cls):
         """Retrieve all pets."""
-        rows = CURSOR.execute("SELECT * FROM pets").fetchall()
-        return [cls(id=row[0], name=row[1], age=row[2], species=row[3], breed=row[4], owner_id=row[5]) for row in rows]
+        return cls._select("SELECT * FROM pets").fetchall()
 
     @classmethod
     def find_by_owner(cls, owner_id):
         """Find all pets belonging to a specific owner."""
-        rows = CURSOR.execute("SELECT * FROM pets WHERE owner_id=?", (owner_id,)).fetchall()
-        return [cls(id=row[0], name=row[1], age=row[2], species=row[3], breed=row[4], owner_id=row[5]) for row in rows]
+        return cls._select("SELECT * FROM pets WHERE owner_id=?", (owner_id,)).fetchall()
 
-    def delete(self):
-        """Delete a pet record."""
-        CURSOR.execute("DELETE FROM pets WHERE id=?", (self.id,))
-        CONN.commit()
+    @classmethod
+    def iter_by_owner(cls, owner_id, chunk_size=CHUNK_SIZE):
+        """Stream an owner's pets in id order without loading them all."""
+        return cls._iter_where("owner_id=?", (owner_id,), chunk_size)
+
+    @classmethod
+    def search_by_name(cls, name, limit=50):
+        """Pets whose name matches `name` (last word as a prefix), best match first."""
+        query = fts_query(name, column="name")
+        if query is None:
+            return []
+        rows = match_rows("pets_fts", "pets", "t.*", query, limit)
+        return [cls._from_row(row) for row in rows]
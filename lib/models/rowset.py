@@ -0,0 +1,40 @@
+# lib/models/rowset.py
+# ----------------------------------------
+# A read-only view over raw result rows. Holding tuples is far cheaper
+# than holding model objects, so bulk reports can scan or pick columns
+# from a RowSet and only build the objects they actually touch.
+# ----------------------------------------
+
+class RowSet:
+    """
+    Lazy result set: rows stay as the tuples sqlite3 returned. Indexing or
+    iterating builds model objects on demand; column() reads values
+    directly from the tuples without building any.
+    """
+
+    __slots__ = ("model", "rows")
+
+    def __init__(self, model, rows):
+        self.model = model
+        self.rows = rows
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return RowSet(self.model, self.rows[index])
+        return self.model._from_row(self.rows[index])
+
+    def __iter__(self):
+        from_row = self.model._from_row
+        for row in self.rows:
+            yield from_row(row)
+
+    def column(self, name):
+        """All values of one column ("id" or a name in the model's COLUMNS)."""
+        i = 0 if name == "id" else self.model.COLUMNS.index(name) + 1
+        return [row[i] for row in self.rows]
+
+    def __repr__(self):
+        return f"<RowSet {self.model.__name__} x {len(self.rows)}>"
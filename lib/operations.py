@@ -0,0 +1,184 @@
+# lib/operations.py
+# ----------------------------------------
+# The owner, pet, appointment and record operations offered to other
+# processes (lib/service.py). Each is registered by name with whether it
+# writes, takes keyword parameters and returns plain JSON-ready data.
+# run_batch() runs a group of writes as one transaction.
+# ----------------------------------------
+
+import inspect
+from collections import namedtuple
+
+from lib import health
+from lib.database import savepoint, transaction
+from lib.models.owner import Owner
+from lib.models.pet import Pet
+from lib.models.appointment import Appointment
+from lib.models.medical_record import MedicalRecord
+from lib.schedule import VetSchedule
+from lib.search import search
+
+Operation = namedtuple("Operation", "function writes signature")
+
+# name -> Operation
+OPERATIONS = {}
+
+class OperationError(ValueError):
+    """Raised for an unknown operation name or parameters that do not fit it."""
+
+def operation(name, writes=False):
+    """Decorator registering a function in OPERATIONS under `name`."""
+    def register(function):
+        OPERATIONS[name] = Operation(function, writes, inspect.signature(function))
+        return function
+    return register
+
+def lookup(name, params=None):
+    """Return the Operation for `name`, checking `params` fit its signature."""
+    op = OPERATIONS.get(name)
+    if op is None:
+        raise OperationError(f"Unknown operation: {name!r}")
+    if not isinstance(params or {}, dict):
+        raise OperationError(f"{name}: params must be an object")
+    try:
+        op.signature.bind(**(params or {}))
+    except TypeError as exc:
+        raise OperationError(f"{name}: {exc}") from None
+    return op
+
+def run(name, params=None):
+    """Run operation `name` with the keyword parameters in `params`."""
+    return lookup(name, params).function(**(params or {}))
+
+def run_batch(calls):
+    """
+    Run (name, params) write calls in one transaction with one commit,
+    each in its own savepoint so a failing call undoes only its own
+    writes. Returns [(True, result) or (False, exception)] in call order.
+    """
+    results = []
+    with transaction():
+        for name, params in calls:
+            try:
+                with savepoint():
+                    results.append((True, run(name, params)))
+            except Exception as exc:
+                results.append((False, exc))
+    return results
+
+def to_dict(obj):
+    """A model object as {"id": ..., column: value, ...} (None stays None)."""
+    if obj is None:
+        return None
+    return {"id": obj.id, **{column: getattr(obj, column) for column in obj.COLUMNS}}
+
+# Bookings go through one schedule so double-booking checks share its index.
+_schedule = None
+
+def _get_schedule():
+    global _schedule
+    if _schedule is None:
+        _schedule = VetSchedule()
+    return _schedule
+
+# --- owners ---
+
+@operation("add_owner", writes=True)
+def add_owner(name, contact):
+    return to_dict(Owner(name, contact).save())
+
+@operation("delete_owners", writes=True)
+def delete_owners(ids):
+    return Owner.delete_many(ids)
+
+@operation("get_owner")
+def get_owner(id):
+    return to_dict(Owner.find_by_id(id))
+
+@operation("list_owners")
+def list_owners(after_id=0, limit=50):
+    return [to_dict(o) for o in Owner.page(after_id, limit)]
+
+@operation("find_owners")
+def find_owners(name, limit=50):
+    return [to_dict(o) for o in Owner.find_by_name(name, limit)]
+
+@operation("owner_summary")
+def owner_summary(ids):
+    owners = []
+    for owner in Owner.load_graph(ids):
+        pets = []
+        for pet in owner.pets:
+            pets.append({
+                **to_dict(pet),
+                "appointments": [to_dict(a) for a in pet.appointments],
+                "medical_records": [to_dict(r) for r in pet.medical_records],
+            })
+        owners.append({**to_dict(owner), "pets": pets})
+    return owners
+
+# --- pets ---
+
+@operation("add_pet", writes=True)
+def add_pet(name, age, species, breed, owner_id):
+    return to_dict(Pet(name, age, species, breed, owner_id).save())
+
+@operation("delete_pets", writes=True)
+def delete_pets(ids):
+    return Pet.delete_many(ids)
+
+@operation("get_pet")
+def get_pet(id):
+    return to_dict(Pet.find_by_id(id))
+
+@operation("list_pets")
+def list_pets(owner_id):
+    return [to_dict(p) for p in Pet.find_by_owner(owner_id)]
+
+# --- appointments ---
+
+@operation("book_appointment", writes=True)
+def book_appointment(pet_id, date, reason, vet_name, notes=None, time=None, duration=30):
+    appointment = Appointment(pet_id, date, reason, vet_name, notes, time, duration)
+    return to_dict(_get_schedule().book(appointment))
+
+@operation("cancel_appointment", writes=True)
+def cancel_appointment(id):
+    appointment = Appointment.find_by_id(id)
+    if appointment is None:
+        raise OperationError(f"No appointment with id {id}")
+    _get_schedule().cancel(appointment)
+    return to_dict(appointment)
+
+@operation("list_appointments")
+def list_appointments(pet_id, include_archive=False):
+    return [to_dict(a) for a in Appointment.find_by_pet(pet_id, include_archive)]
+
+@operation("upcoming_appointments")
+def upcoming_appointments(pet_id, as_of=None):
+    return [to_dict(a) for a in Appointment.upcoming_for_pet(pet_id, as_of)]
+
+@operation("vet_week")
+def vet_week(vet_name, date):
+    week = _get_schedule().week(vet_name, date)
+    return {day: [to_dict(a) for a in appts] for day, appts in week.items()}
+
+# --- medical records ---
+
+@operation("add_record", writes=True)
+def add_record(pet_id, record_date, treatment, notes=None):
+    return to_dict(MedicalRecord(pet_id, record_date, treatment, notes).save())
+
+@operation("list_records")
+def list_records(pet_id, include_archive=False):
+    return [to_dict(r) for r in MedicalRecord.find_by_pet(pet_id, include_archive)]
+
+# --- reports ---
+
+@operation("search")
+def search_all(text, kinds=None, limit=10):
+    return [list(row) for row in search(text, kinds, limit)]
+
+@operation("due_report")
+def due_report(as_of=None, within_days=30):
+    return [list(row) for row in health.due_report(as_of, within_days)]
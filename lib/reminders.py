@@ -0,0 +1,236 @@
+# lib/reminders.py
+# ----------------------------------------
+# Appointment reminders without polling the appointments table.
+# ReminderScheduler keeps a min-heap of (reminder time, appointment id)
+# for the appointments in a moving window (one indexed date-range query
+# per window). Appointment saves and deletes in this process update it
+# through appointment listeners once they commit: a save is one heap
+# push, a delete just forgets the id, and the stale heap entry is skipped
+# when it surfaces (lazy deletion).
+#
+# Other processes (the CLI, serve, batch) write to the same database
+# without telling us. Each run_due() therefore picks up appointments
+# added since the last id it saw (a primary-key range scan of the new
+# rows only), and re-reads the due appointments before sending, so one
+# cancelled or moved elsewhere gets no reminder. Due reminders go to a
+# sink with a send(reminder) method: StdoutSink, FileSink, or anything
+# else with that method.
+# ----------------------------------------
+
+import heapq
+import json
+import sys
+import threading
+import weakref
+from collections import namedtuple
+from datetime import datetime, time, timedelta
+
+from lib.database import add_invalidation_hook, after_commit, get_connection, in_transaction
+from lib.dates import parse_time
+from lib.models import appointment as appointment_module
+from lib.models.appointment import Appointment
+
+# Reminder time for appointments booked without a time of day.
+DEFAULT_TIME = time(9, 0)
+
+Reminder = namedtuple("Reminder", "due appointment")
+
+# Live schedulers, so a rollback can make them reload their window.
+_schedulers = weakref.WeakSet()
+
+def _invalidate_schedulers():
+    for scheduler in list(_schedulers):
+        # A rollback may have undone saves we were told about.
+        scheduler._stale = True
+
+add_invalidation_hook(_invalidate_schedulers)
+
+def starts_at(appointment):
+    """The appointment's start as a datetime (DEFAULT_TIME if it has none)."""
+    minutes = parse_time(appointment.time)
+    start = datetime.fromisoformat(appointment.date)
+    if minutes is None:
+        return datetime.combine(start.date(), DEFAULT_TIME)
+    return start + timedelta(minutes=minutes)
+
+def reminder_text(reminder):
+    appt = reminder.appointment
+    return (f"Reminder: pet {appt.pet_id} has '{appt.reason}' with {appt.vet_name} "
+            f"on {appt.date} at {appt.time or DEFAULT_TIME.strftime('%H:%M')} (appointment {appt.id})")
+
+class StdoutSink:
+    """Prints each reminder."""
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+
+    def send(self, reminder):
+        print(f"[{reminder.due:%Y-%m-%d %H:%M}] {reminder_text(reminder)}", file=self.stream, flush=True)
+
+class FileSink:
+    """Appends each reminder to a file as a JSON line."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def send(self, reminder):
+        appt = reminder.appointment
+        line = {"due": reminder.due.isoformat(), "appointment_id": appt.id, "pet_id": appt.pet_id,
+                "date": appt.date, "time": appt.time, "vet_name": appt.vet_name, "text": reminder_text(reminder)}
+        with open(self.path, "a", encoding="utf-8") as handle:
+            handle.write(json.dumps(line) + "\n")
+
+class ReminderScheduler:
+    """
+    Sends a reminder `lead` before each appointment. Only appointments in
+    the next `window` are held in memory; the window moves forward as
+    time passes. Reminders whose time has already passed when the
+    scheduler starts are skipped.
+    """
+
+    def __init__(self, sink, lead=timedelta(days=1), window=timedelta(days=7), now=None):
+        self.sink = sink
+        self.lead = lead
+        self.window = window
+        self._heap = []
+        self._live = {}  # appointment id -> Reminder currently scheduled
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._sent_until = now or datetime.now()
+        self._horizon = self._sent_until
+        self._stale = False
+        self._stopping = False
+        # Read before the window, so rows committed meanwhile are caught up.
+        self._last_id = get_connection().execute("SELECT ifnull(max(id), 0) FROM appointments").fetchone()[0]
+        self._load(self._sent_until + self.lead + self.window)
+        appointment_module.add_listener(self._on_change)
+        _schedulers.add(self)
+
+    def close(self):
+        """Stop run() and stop listening for appointment changes."""
+        appointment_module.remove_listener(self._on_change)
+        with self._wakeup:
+            self._stopping = True
+            self._wakeup.notify()
+
+    def __len__(self):
+        return len(self._live)
+
+    def _push(self, appointment):
+        due = starts_at(appointment) - self.lead
+        reminder = Reminder(due, appointment)
+        self._live[appointment.id] = reminder
+        heapq.heappush(self._heap, (due, appointment.id))
+
+    def _load(self, horizon):
+        """Add appointments starting after the current horizon, up to `horizon`."""
+        start = self._horizon
+        for appt in Appointment.between(start.date(), horizon.date()):
+            begins = starts_at(appt)
+            if start < begins <= horizon and begins - self.lead > self._sent_until:
+                self._push(appt)
+        self._horizon = horizon
+
+    def _reload(self):
+        self._heap.clear()
+        self._live.clear()
+        horizon, self._horizon = self._horizon, self._sent_until + self.lead
+        self._load(horizon)
+        self._stale = False
+
+    def _catch_up(self):
+        """Schedule appointments other processes added since the last id seen."""
+        for appt in Appointment.added_after(self._last_id):
+            self._last_id = appt.id
+            if appt.id not in self._live:
+                self._consider(appt)
+
+    def _consider(self, appointment):
+        """Schedule `appointment` if it starts inside the window (else forget it)."""
+        begins = starts_at(appointment)
+        if begins <= self._horizon and begins > self._sent_until:
+            self._push(appointment)
+            self._wakeup.notify()
+        else:
+            self._live.pop(appointment.id, None)
+        # Lazy deletion leaves stale entries behind; compact when they dominate.
+        if len(self._heap) > 2 * len(self._live) + 64:
+            self._heap = [(r.due, i) for i, r in self._live.items()]
+            heapq.heapify(self._heap)
+
+    def _on_change(self, event, appointment):
+        # Applied once the write commits, so run_due() on another thread
+        # never sends a reminder for a booking that is then rolled back.
+        after_commit(lambda: self._apply(event, appointment))
+
+    def _apply(self, event, appointment):
+        with self._wakeup:
+            if event == "deleted":
+                self._live.pop(appointment.id, None)
+            else:
+                self._consider(appointment)
+
+    def _peek(self):
+        """The earliest live reminder time, dropping stale heap entries."""
+        heap = self._heap
+        while heap:
+            due, appt_id = heap[0]
+            reminder = self._live.get(appt_id)
+            if reminder is not None and reminder.due == due:
+                return due
+            heapq.heappop(heap)
+        return None
+
+    def run_due(self, now=None):
+        """Send every reminder due at or before `now`; returns how many were sent."""
+        now = now or datetime.now()
+        due_reminders = []
+        with self._wakeup:
+            if self._stale:
+                self._reload()
+            if not in_transaction():  # it would see this thread's uncommitted rows
+                self._catch_up()
+            while (due := self._peek()) is not None and due <= now:
+                _, appt_id = heapq.heappop(self._heap)
+                due_reminders.append(self._live.pop(appt_id))
+            self._sent_until = max(self._sent_until, now)
+            if self._horizon < now + self.lead + self.window / 2:
+                self._load(now + self.lead + self.window)
+        if not due_reminders:
+            return 0
+        # Another process may have cancelled or rebooked them meanwhile.
+        current = {appt.id: appt for appt in Appointment.current(r.appointment.id for r in due_reminders)}
+        sent = 0
+        for reminder in due_reminders:
+            appt = current.get(reminder.appointment.id)
+            if appt is None:
+                continue
+            if starts_at(appt) - self.lead != reminder.due:
+                with self._wakeup:
+                    self._consider(appt)
+                continue
+            self.sink.send(Reminder(reminder.due, appt))
+            sent += 1
+        return sent
+
+    def next_due(self):
+        """When the next reminder is due, or None if none is scheduled."""
+        with self._lock:
+            return self._peek()
+
+    def run(self, max_sleep=60.0):
+        """
+        Send reminders as they fall due until close() is called. Sleeps
+        until the next reminder, waking early when a booking adds an
+        earlier one; never sleeps longer than `max_sleep` seconds so the
+        window keeps moving.
+        """
+        while not self._stopping:
+            self.run_due()
+            with self._wakeup:
+                if self._stopping:
+                    return
+                due = self._peek()
+                delay = max_sleep if due is None else (due - datetime.now()).total_seconds()
+                if delay > 0:
+                    self._wakeup.wait(min(delay, max_sleep))
@@ -0,0 +1,182 @@
+# lib/schedule.py
+# ----------------------------------------
+# Per-vet day/week schedules and double-booking detection.
+# VetSchedule keeps an in-memory interval index per (vet, day): a sparse
+# max-segment tree over start minutes, where each node holds the latest
+# end among the appointments starting under it. A vet-day is loaded once
+# with one (vet_name, date) index lookup; after that a booking check, an
+# insert and a removal each walk one root-to-leaf path (O(log minutes)),
+# so the front desk never rescans the appointments table. The index stays
+# correct when stored appointments overlap (e.g. saved without book()).
+# ----------------------------------------
+
+import weakref
+from datetime import date, timedelta
+
+from lib.database import add_invalidation_hook, on_rollback, transaction
+from lib.dates import normalize_date, parse_time
+from lib.models.appointment import Appointment, add_listener
+
+# Live schedules, so a rollback can drop index entries it may have undone.
+_schedules = weakref.WeakSet()
+
+def _clear_schedules():
+    for schedule in list(_schedules):
+        schedule._days.clear()
+        schedule._slots.clear()
+
+add_invalidation_hook(_clear_schedules)
+
+def _track_slot(event, appointment):
+    """
+    Appointment listener: add saved appointments to every schedule that
+    has their day loaded, and drop deleted ones.
+    """
+    _apply_slot(event == "saved", appointment)
+    # A savepoint rolling back the write takes the slot change back with it.
+    on_rollback(lambda: _apply_slot(event != "saved", appointment))
+
+def _apply_slot(booked, appointment):
+    for schedule in list(_schedules):
+        schedule._discard(appointment.id)
+        if booked:
+            schedule._add(appointment)
+
+add_listener(_track_slot)
+
+# A power of two covering every start minute of a day (0..1439).
+_MINUTES = 2048
+
+class _DayIndex:
+    """The intervals of one vet-day, searchable by overlap."""
+
+    def __init__(self):
+        self._latest = {}  # tree node -> latest end starting under it (absent = none)
+        self._ends = {}    # start minute -> {appointment id: end}
+
+    def add(self, start, end, appointment_id):
+        self._ends.setdefault(start, {})[appointment_id] = end
+        self._update(start)
+
+    def remove(self, start, appointment_id):
+        ends = self._ends.get(start, {})
+        if ends.pop(appointment_id, None) is not None:
+            if not ends:
+                del self._ends[start]
+            self._update(start)
+
+    def _update(self, start):
+        ends = self._ends.get(start)
+        latest = max(ends.values()) if ends else 0
+        node = start + _MINUTES
+        while node:
+            if latest:
+                self._latest[node] = latest
+            else:
+                self._latest.pop(node, None)
+            node //= 2
+            latest = max(self._latest.get(2 * node, 0), self._latest.get(2 * node + 1, 0))
+
+    def overlapping(self, start, end):
+        """Id of an interval overlapping [start, end), or None."""
+        return self._find(1, 0, _MINUTES, start, end)
+
+    def _find(self, node, low, width, start, end):
+        # Prune subtrees starting at/after `end` or all ending by `start`.
+        if low >= end or self._latest.get(node, 0) <= start:
+            return None
+        if width == 1:
+            return next(i for i, e in self._ends[low].items() if e > start)
+        half = width // 2
+        found = self._find(2 * node, low, half, start, end)
+        if found is None:
+            found = self._find(2 * node + 1, low + half, half, start, end)
+        return found
+
+class ScheduleConflict(ValueError):
+    """Raised when a booking overlaps an existing appointment for the same vet."""
+
+    def __init__(self, appointment, existing_id):
+        self.appointment = appointment
+        self.existing_id = existing_id
+        super().__init__(
+            f"{appointment.vet_name} is already booked at {appointment.date} "
+            f"{appointment.time} (appointment {existing_id})"
+        )
+
+class VetSchedule:
+    """
+    Books appointments without double-booking a vet. Appointments with no
+    time are treated as unscheduled and never conflict.
+    """
+
+    def __init__(self):
+        # (vet_name, iso_date) -> _DayIndex
+        self._days = {}
+        # appointment id -> ((vet_name, iso_date), start) for indexed appointments
+        self._slots = {}
+        _schedules.add(self)
+
+    def _day(self, vet_name, day):
+        key = (vet_name, day)
+        index = self._days.get(key)
+        if index is None:
+            index = self._days[key] = _DayIndex()
+            for appt in Appointment.for_vet(vet_name, day, day):
+                self._add(appt)
+        return index
+
+    def _add(self, appointment):
+        key = (appointment.vet_name, appointment.date)
+        start = parse_time(appointment.time)
+        if start is not None and key in self._days:
+            self._days[key].add(start, start + appointment.duration, appointment.id)
+            self._slots[appointment.id] = (key, start)
+
+    def _discard(self, appointment_id):
+        slot = self._slots.pop(appointment_id, None)
+        if slot is not None and slot[0] in self._days:
+            self._days[slot[0]].remove(slot[1], appointment_id)
+
+    def find_conflict(self, appointment):
+        """Return the id of an appointment overlapping `appointment`, or None."""
+        start = parse_time(appointment.time)
+        if start is None:
+            return None
+        index = self._day(appointment.vet_name, normalize_date(appointment.date))
+        return index.overlapping(start, start + appointment.duration)
+
+    def book(self, appointment):
+        """Save `appointment`, raising ScheduleConflict if the vet is busy."""
+        # The write transaction serializes bookings, so the check and the
+        # insert cannot interleave with another thread's booking.
+        with transaction():
+            existing = self.find_conflict(appointment)
+            if existing is None:
+                # The save listener adds it to the index.
+                appointment.save()
+        if existing is not None:
+            raise ScheduleConflict(appointment, existing)
+        return appointment
+
+    def cancel(self, appointment):
+        """Delete `appointment`; its slot is freed by the delete listener."""
+        appointment.delete()
+
+    def day(self, vet_name, day):
+        """The vet's appointments on `day`, in time order."""
+        day = normalize_date(day)
+        return Appointment.for_vet(vet_name, day, day)
+
+    def week(self, vet_name, day):
+        """
+        The vet's appointments for the Monday-to-Sunday week containing
+        `day`, as {iso_date: [appointments]} with every day present.
+        """
+        monday = date.fromisoformat(normalize_date(day))
+        monday -= timedelta(days=monday.weekday())
+        days = [(monday + timedelta(days=n)).isoformat() for n in range(7)]
+        week = {d: [] for d in days}
+        for appt in Appointment.for_vet(vet_name, days[0], days[-1]):
+            week.setdefault(appt.date, []).append(appt)
+        return week
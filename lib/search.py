@@ -0,0 +1,132 @@
+# lib/search.py
+# ----------------------------------------
+# Full-text and prefix search backed by the FTS5 tables created in
+# migration 4 (owners_fts, pets_fts, appointments_fts,
+# medical_records_fts). Triggers keep them in sync with the base tables,
+# so a search is one ranked index lookup instead of a LIKE scan.
+#
+# bm25 ranking reads each term's whole doclist to weigh it, which on a
+# million-row database costs more than the rest of the search. Names
+# (owners, pets) are ranked; notes are listed newest first, which FTS5
+# answers by walking the doclists backwards and stopping at `limit`.
+# ----------------------------------------
+
+import re
+from contextlib import contextmanager
+
+from lib import health
+from lib.database import get_connection, transaction
+from lib.migrations import FTS_TABLES, fts_triggers
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+# Shortest word treated as a prefix; the FTS tables index 2-,
+# 3- and 4-character prefixes; a 1-character prefix would scan the index.
+MIN_PREFIX = 2
+
+# bm25 ranking scores every match, which is slow for a broad prefix on a
+# large table. Queries matching more rows than this skip ranking and
+# return the first matches in id order.
+RANK_LIMIT = 1000
+
+# kind -> (FTS table, SQL for a short label of the matching row, base table,
+#          rank with bm25 (else newest first))
+_SOURCES = {
+    "owner": ("owners_fts", "t.name || ' - ' || t.contact", "owners", True),
+    "pet": ("pets_fts", "t.name || ' (' || ifnull(t.species, '') || ', ' || ifnull(t.breed, '') || ')'", "pets", True),
+    "appointment": (
+        "appointments_fts",
+        "t.date || ' ' || ifnull(t.reason, '') || ': ' || snippet(appointments_fts, -1, '[', ']', '...', 8)",
+        "appointments",
+        False,
+    ),
+    "medical_record": (
+        "medical_records_fts",
+        "t.record_date || ' ' || ifnull(t.treatment, '') || ': ' || snippet(medical_records_fts, -1, '[', ']', '...', 8)",
+        "medical_records",
+        False,
+    ),
+}
+
+def fts_query(text, column=None, prefix=True):
+    """
+    Turn free user text into a safe FTS5 MATCH expression: every word must
+    match, and the last one matches as a prefix (for type-ahead).
+    Returns None when the text has no searchable words.
+    """
+    tokens = _TOKEN.findall(text or "")
+    if not tokens:
+        return None
+    terms = [f'"{token}"' for token in tokens]
+    if prefix and len(tokens[-1]) >= MIN_PREFIX:
+        terms[-1] += "*"
+    query = " ".join(terms)
+    return f"{column} : ({query})" if column else query
+
+def match_rows(fts, table, columns, query, limit, rank=True):
+    """
+    Rows (`columns` selected from `table` aliased as t) matching the FTS
+    `query`, best first. Very broad matches fall back to id order; with
+    rank=False every match is returned newest (highest id) first.
+    """
+    conn = get_connection()
+    if not rank:
+        order = f"ORDER BY {fts}.rowid DESC"
+    else:
+        # Stops at the (RANK_LIMIT + 1)th match instead of counting them all.
+        broad = conn.execute(
+            f"SELECT 1 FROM {fts} WHERE {fts} MATCH ? LIMIT 1 OFFSET ?", (query, RANK_LIMIT)
+        ).fetchone()
+        order = "" if broad else "ORDER BY rank"
+    return conn.execute(
+        f"SELECT {columns} FROM {fts} JOIN {table} t ON t.id = {fts}.rowid "
+        f"WHERE {fts} MATCH ? {order} LIMIT ?",
+        (query, limit)
+    ).fetchall()
+
+def search(text, kinds=None, limit=10):
+    """
+    Search owners, pets, appointment notes and medical notes.
+    Returns (kind, id, label) tuples: best matches first for owners and
+    pets, newest first for notes.
+    """
+    query = fts_query(text)
+    if query is None:
+        return []
+    results = []
+    for kind in kinds or _SOURCES:
+        fts, label, table, rank = _SOURCES[kind]
+        rows = match_rows(fts, table, f"t.id, {label}", query, limit, rank)
+        results.extend((kind, row_id, text) for row_id, text in rows)
+    return results
+
+def rebuild_indexes():
+    """
+    (Re)create the FTS sync triggers and reindex every row from scratch,
+    and likewise for the health summary (see lib/health.py).
+    """
+    with transaction() as conn:
+        health.rebuild(conn)
+        for table, columns in FTS_TABLES.items():
+            for statement in fts_triggers(table, columns):
+                conn.execute(statement)
+            conn.execute(f"INSERT INTO {table}_fts ({table}_fts) VALUES ('rebuild')")
+
+@contextmanager
+def deferred_indexing():
+    """
+    For bulk loads: drop the FTS sync triggers (and the per-row health
+    summary ones), and rebuild once when the block exits. Per-row trigger
+    maintenance is several times slower than one rebuild. If the process
+    is killed inside the block, search is stale until rebuild_indexes()
+    runs (python main.py reindex).
+    """
+    with transaction() as conn:
+        health.drop_bulk_triggers(conn)
+        for table in FTS_TABLES:
+            for suffix in ("ai", "ad", "au"):
+                conn.execute(f"DROP TRIGGER IF EXISTS {table}_fts_{suffix}")
+    try:
+        yield
+    finally:
+        rebuild_indexes()
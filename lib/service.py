@@ -0,0 +1,166 @@
+# lib/service.py
+# ----------------------------------------
+# asyncio TCP service so several clinic terminals can share one process.
+# Protocol: one JSON object per line each way. A request is
+#   {"id": 1, "op": "get_owner", "params": {"id": 5}}
+# and its response {"id": 1, "result": ...} or {"id": 1, "error": "..."}.
+# Requests on one connection may be pipelined; responses carry the id.
+#
+# sqlite calls are blocking, so they run on thread pools: reads on a
+# bounded pool (each thread has its own connection, and WAL lets them
+# read in parallel), writes on a single writer thread. Identical reads in
+# flight at the same time share one query, unless a write batch committed
+# since that query started (the key carries a write generation, bumped
+# after each batch), so no reader is handed pre-write data. Writes that
+# queue up while a batch is committing are run together as the next
+# batch, in one transaction with one commit (see operations.run_batch).
+# ----------------------------------------
+
+import asyncio
+import json
+import os
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from lib import operations
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_WORKERS = min(8, (os.cpu_count() or 1) + 4)
+
+# Most writes committed in one transaction.
+MAX_BATCH = 256
+
+# Longest request line accepted.
+LINE_LIMIT = 1 << 20
+
+class Service:
+    """Dispatches operations to the thread pools, coalescing and batching."""
+
+    def __init__(self, workers=DEFAULT_WORKERS, max_batch=MAX_BATCH):
+        self.max_batch = max_batch
+        self.stats = Counter()
+        self._readers = ThreadPoolExecutor(workers, thread_name_prefix="petcare-read")
+        self._writer = ThreadPoolExecutor(1, thread_name_prefix="petcare-write")
+        self._inflight = {}
+        # Bumped after every write batch; part of the read coalescing key.
+        self._generation = 0
+        self._writes = None
+        self._write_task = None
+
+    async def call(self, name, params=None):
+        """Run operation `name`; raises OperationError or the operation's error."""
+        params = params or {}
+        if name == "stats":
+            return dict(self.stats)
+        op = operations.lookup(name, params)
+        self.stats["requests"] += 1
+        if op.writes:
+            return await self._write(name, params)
+        return await self._read(name, params)
+
+    async def _read(self, name, params):
+        key = (name, json.dumps(params, sort_keys=True), self._generation)
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.get_running_loop().run_in_executor(self._readers, operations.run, name, params)
+            self._inflight[key] = future
+            future.add_done_callback(lambda _: self._inflight.pop(key, None))
+            self.stats["queries"] += 1
+        else:
+            self.stats["coalesced"] += 1
+        # shield: one waiter going away must not cancel the others' query.
+        return await asyncio.shield(future)
+
+    async def _write(self, name, params):
+        if self._write_task is None:
+            self._writes = asyncio.Queue()
+            self._write_task = asyncio.create_task(self._write_loop())
+        future = asyncio.get_running_loop().create_future()
+        self._writes.put_nowait((name, params, future))
+        return await future
+
+    async def _write_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._writes.get()]
+            while len(batch) < self.max_batch and not self._writes.empty():
+                batch.append(self._writes.get_nowait())
+            calls = [(name, params) for name, params, _ in batch]
+            try:
+                results = await loop.run_in_executor(self._writer, operations.run_batch, calls)
+            except Exception as exc:
+                # The commit itself failed: nothing in the batch was written.
+                results = [(False, exc)] * len(batch)
+            # Before any writer hears back: reads from now on see the batch.
+            self._generation += 1
+            self.stats["batches"] += 1
+            self.stats["batched_writes"] += len(batch)
+            for (_, _, future), (ok, value) in zip(batch, results):
+                if future.done():
+                    continue
+                if ok:
+                    future.set_result(value)
+                else:
+                    future.set_exception(value)
+
+    async def handle(self, reader, writer):
+        """Serve one client connection until it closes."""
+        send_lock = asyncio.Lock()
+        tasks = set()
+
+        async def respond(request_id, name, params):
+            try:
+                if name is None:
+                    raise operations.OperationError("Malformed request line")
+                response = {"id": request_id, "result": await self.call(name, params)}
+            except Exception as exc:
+                self.stats["errors"] += 1
+                response = {"id": request_id, "error": f"{type(exc).__name__}: {exc}"}
+            async with send_lock:
+                writer.write(json.dumps(response, default=str).encode() + b"\n")
+                await writer.drain()
+
+        try:
+            while line := await reader.readline():
+                try:
+                    request = json.loads(line)
+                    task = asyncio.create_task(respond(request.get("id"), request["op"], request.get("params")))
+                except (ValueError, KeyError, AttributeError, TypeError):
+                    task = asyncio.create_task(respond(None, None, None))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+        except (ConnectionError, asyncio.LimitOverrunError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        """Start listening; returns the asyncio Server."""
+        return await asyncio.start_server(self.handle, host, port, limit=LINE_LIMIT)
+
+    def close(self):
+        if self._write_task is not None:
+            self._write_task.cancel()
+        self._readers.shutdown(wait=True)
+        self._writer.shutdown(wait=True)
+
+def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, workers=DEFAULT_WORKERS):
+    """Run the service until interrupted. Port 0 picks a free port."""
+    async def main():
+        service = Service(workers)
+        server = await service.start(host, port)
+        bound = server.sockets[0].getsockname()
+        print(f"Listening on {bound[0]}:{bound[1]}", flush=True)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            service.close()
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
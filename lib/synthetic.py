@@ -0,0 +1,104 @@
+# lib/synthetic.py
+# ----------------------------------------
+# Deterministic synthetic clinic data for demos and load testing.
+# generate_records() yields owner/pet/appointment/medical_record dicts in
+# the same shape lib/transfer.py imports and exports, so the same seed
+# always produces the same data and any size streams in constant memory.
+# ----------------------------------------
+
+import random
+from datetime import date, timedelta
+
+FIRST_NAMES = (
+    "Alice", "Brian", "Cathy", "David", "Esther", "Felix", "Grace", "Hassan", "Irene", "James",
+    "Kamau", "Lucy", "Moses", "Njeri", "Omar", "Purity", "Quentin", "Rose", "Samuel", "Tabitha",
+)
+LAST_NAMES = (
+    "Johnson", "Kim", "Wanjiku", "Otieno", "Mwangi", "Achieng", "Smith", "Kariuki", "Njoroge", "Odhiambo",
+    "Chebet", "Mutua", "Garcia", "Khan", "Wambui", "Kiptoo", "Brown", "Nyambura", "Ali", "Kibet",
+)
+PET_NAMES = (
+    "Bella", "Milo", "Rocky", "Coco", "Simba", "Luna", "Max", "Daisy", "Oscar", "Nala",
+    "Buddy", "Zara", "Tiger", "Pepper", "Shadow", "Ginger", "Bruno", "Kiki", "Leo", "Mocha",
+)
+BREEDS = {
+    "Dog": ("Beagle", "German Shepherd", "Poodle", "Labrador", "Mixed"),
+    "Cat": ("Siamese", "Maine Coon", "Persian", "Mixed"),
+    "Parrot": ("African Grey", "Macaw"),
+    "Rabbit": ("Lop", "Rex"),
+}
+SPECIES = tuple(BREEDS)
+VETS = ("Dr. Muli", "Dr. Amina", "Dr. Otieno", "Dr. Wairimu", "Dr. Patel", "Dr. Kamau")
+REASONS = ("Checkup", "Vaccination", "Dental Cleaning", "Skin Irritation", "Follow-up", "Surgery Consult")
+TREATMENTS = (
+    "Rabies Vaccine", "Distemper Vaccine", "Deworming", "Flea Treatment",
+    "Ear Infection Treatment", "Dental Scaling", "Antibiotics Course",
+)
+NOTE_WORDS = (
+    "healthy", "minor", "tartar", "recovery", "cleared", "monitor", "appetite", "weight",
+    "dose", "booster", "swelling", "follow", "stable", "improving", "allergy", "review",
+)
+
+def rows_per_owner(pets_per_owner, appointments_per_pet, records_per_pet):
+    """Rows produced per owner: the owner, plus each pet with its history."""
+    return 1 + pets_per_owner * (1 + appointments_per_pet + records_per_pet)
+
+def owners_for_rows(rows, pets_per_owner=2, appointments_per_pet=3, records_per_pet=2):
+    """How many owners generate_records() needs to produce about `rows` rows."""
+    return max(1, round(rows / rows_per_owner(pets_per_owner, appointments_per_pet, records_per_pet)))
+
+def generate_records(owners, pets_per_owner=2, appointments_per_pet=3, records_per_pet=2,
+                     seed=42, start=date(2020, 1, 1), days=2190):
+    """
+    Yield record dicts for `owners` owners. Source ids run from 1 per type,
+    so the output imports cleanly into an empty or non-empty database.
+    """
+    rng = random.Random(seed)
+    choice = rng.choice
+    randrange = rng.randrange
+    pet_id = 0
+    appointment_id = 0
+    record_id = 0
+    for owner_id in range(1, owners + 1):
+        yield {
+            "type": "owner",
+            "id": owner_id,
+            "name": f"{choice(FIRST_NAMES)} {choice(LAST_NAMES)}",
+            "contact": f"07{randrange(10**8):08d}",
+        }
+        for _ in range(pets_per_owner):
+            pet_id += 1
+            species = choice(SPECIES)
+            yield {
+                "type": "pet",
+                "id": pet_id,
+                "name": choice(PET_NAMES),
+                "age": randrange(1, 16),
+                "species": species,
+                "breed": choice(BREEDS[species]),
+                "owner_id": owner_id,
+            }
+            for _ in range(appointments_per_pet):
+                appointment_id += 1
+                slot = randrange(18)  # 08:00 .. 16:30 in 30-minute steps
+                yield {
+                    "type": "appointment",
+                    "id": appointment_id,
+                    "pet_id": pet_id,
+                    "date": (start + timedelta(days=randrange(days))).isoformat(),
+                    "reason": choice(REASONS),
+                    "vet_name": choice(VETS),
+                    "notes": " ".join(rng.sample(NOTE_WORDS, 3)),
+                    "time": f"{8 + slot // 2:02d}:{30 * (slot % 2):02d}",
+                    "duration": 30,
+                }
+            for _ in range(records_per_pet):
+                record_id += 1
+                yield {
+                    "type": "medical_record",
+                    "id": record_id,
+                    "pet_id": pet_id,
+                    "record_date": (start + timedelta(days=randrange(days))).isoformat(),
+                    "treatment": choice(TREATMENTS),
+                    "notes": " ".join(rng.sample(NOTE_WORDS, 2)),
+                }
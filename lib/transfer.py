@@ -0,0 +1,367 @@
+# lib/transfer.py
+# ----------------------------------------
+# Streaming bulk import/export of clinic data as CSV or JSONL.
+# Records flow through generators (read -> validate -> buffer) and are
+# written in chunks of `chunk_size`, one transaction per chunk, so memory
+# stays flat however large the file is. Foreign keys in the input refer to
+# the source "id" of owners/pets in the same stream; an in-memory id map
+# translates them to the ids the database assigns. With link_existing=True
+# a foreign key not seen in the stream may instead name an existing row.
+# ----------------------------------------
+
+import csv
+import json
+import os
+import sys
+from bisect import bisect_right
+
+from lib.database import transaction
+from lib.dates import normalize_date, normalize_time
+from lib.models.owner import Owner
+from lib.models.pet import Pet
+from lib.models.appointment import Appointment
+from lib.models.medical_record import MedicalRecord
+from lib.search import deferred_indexing
+
+# Record type -> (model, (foreign key column, parent type) or None)
+KINDS = {
+    "owner": (Owner, None),
+    "pet": (Pet, ("owner_id", "owner")),
+    "appointment": (Appointment, ("pet_id", "pet")),
+    "medical_record": (MedicalRecord, ("pet_id", "pet")),
+}
+
+# Parents before children; also the order chunks are written in.
+ORDER = ("owner", "pet", "appointment", "medical_record")
+
+# File names used for a CSV directory import/export.
+CSV_FILES = {kind: KINDS[kind][0].TABLE + ".csv" for kind in ORDER}
+
+REQUIRED = {
+    "owner": ("name", "contact"),
+    "pet": ("name", "owner_id"),
+    "appointment": ("pet_id", "date"),
+    "medical_record": ("pet_id", "record_date"),
+}
+INTEGER_FIELDS = {"age", "owner_id", "pet_id", "duration"}
+DATE_FIELDS = {"date", "record_date"}
+TIME_FIELDS = {"time"}
+
+# Default values for columns a record may leave out.
+DEFAULTS = {"duration": 30}
+
+# How many error messages an ImportReport keeps (all are counted).
+MAX_ERROR_MESSAGES = 20
+
+DEFAULT_CHUNK_SIZE = 5000
+
+class RecordError(ValueError):
+    """A record that could not be read or failed validation."""
+
+# ---------- readers ----------
+
+def read_jsonl(lines, source="<jsonl>"):
+    """
+    Yield (location, record) for each non-blank JSON line. Each record
+    needs a "type" (owner, pet, appointment or medical_record). Lines
+    that are not valid JSON are yielded as RecordError instances.
+    """
+    for number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line:
+            continue
+        location = f"{source}:{number}"
+        try:
+            yield location, json.loads(line)
+        except json.JSONDecodeError as exc:
+            yield location, RecordError(f"{location}: invalid JSON ({exc.msg})")
+
+def read_csv(lines, kind, source="<csv>"):
+    """Yield (location, record) for each CSV row; every row is of type `kind`."""
+    for number, row in enumerate(csv.DictReader(lines), 2):
+        row["type"] = kind
+        yield f"{source}:{number}", row
+
+def read_path(path, fmt=None, kind=None):
+    """
+    Stream records from a .jsonl file, a .csv file (of one `kind`), or a
+    directory of CSV files named as in CSV_FILES. "-" reads JSONL from stdin.
+    """
+    if path == "-":
+        yield from read_jsonl(sys.stdin, "<stdin>")
+        return
+    if os.path.isdir(path):
+        for table_kind in ORDER:
+            file_path = os.path.join(path, CSV_FILES[table_kind])
+            if os.path.exists(file_path):
+                yield from read_path(file_path, "csv", table_kind)
+        return
+    fmt = fmt or ("csv" if path.endswith(".csv") else "jsonl")
+    with open(path, newline="", encoding="utf-8") as handle:
+        if fmt == "csv":
+            if kind is None:
+                kind = next((k for k, name in CSV_FILES.items() if os.path.basename(path) == name), None)
+            if kind not in KINDS:
+                raise RecordError(f"{path}: pass the record type for this CSV file")
+            yield from read_csv(handle, kind, path)
+        else:
+            yield from read_jsonl(handle, path)
+
+# ---------- validation ----------
+
+def validate(location, record):
+    """
+    Check and convert one record. Returns (kind, source id, values) where
+    values follow the model's COLUMNS order. Raises RecordError.
+    """
+    if not isinstance(record, dict):
+        raise RecordError(f"{location}: expected an object, got {type(record).__name__}")
+    kind = record.get("type")
+    if kind not in KINDS:
+        raise RecordError(f"{location}: unknown record type {kind!r}")
+    model = KINDS[kind][0]
+    values = []
+    for column in model.COLUMNS:
+        value = record.get(column)
+        if value == "":
+            value = None
+        if value is None:
+            if column in REQUIRED[kind]:
+                raise RecordError(f"{location}: {kind} is missing {column!r}")
+            value = DEFAULTS.get(column)
+        elif column in INTEGER_FIELDS:
+            try:
+                value = int(value)
+            except (TypeError, ValueError):
+                raise RecordError(f"{location}: {column} must be an integer, got {value!r}") from None
+        elif column in DATE_FIELDS or column in TIME_FIELDS:
+            try:
+                value = normalize_date(value) if column in DATE_FIELDS else normalize_time(value)
+            except ValueError as exc:
+                raise RecordError(f"{location}: {exc}") from None
+        values.append(value)
+    source_id = record.get("id")
+    if source_id in ("", None):
+        source_id = None
+    else:
+        try:
+            source_id = int(source_id)
+        except (TypeError, ValueError):
+            raise RecordError(f"{location}: id must be an integer, got {source_id!r}") from None
+    return kind, source_id, values
+
+# ---------- import ----------
+
+class IdMap:
+    """
+    Source id -> database id. Runs where both ids go up by one (the usual
+    case: exports and generated data are numbered sequentially) are kept
+    as single ranges, so the map stays tiny even for millions of rows.
+    Anything else falls back to a dict.
+    """
+
+    def __init__(self):
+        self._starts = []   # first source id of each run, ascending
+        self._runs = []     # (first database id, length) of each run
+        self._other = {}
+
+    def __setitem__(self, source_id, db_id):
+        if self._starts:
+            start = self._starts[-1]
+            first, length = self._runs[-1]
+            if source_id == start + length and db_id == first + length:
+                self._runs[-1] = (first, length + 1)
+                return
+            if source_id < start + length:
+                self._other[source_id] = db_id
+                return
+        self._starts.append(source_id)
+        self._runs.append((db_id, 1))
+
+    def get(self, source_id):
+        db_id = self._other.get(source_id)
+        if db_id is not None:
+            return db_id
+        i = bisect_right(self._starts, source_id) - 1
+        if i >= 0:
+            first, length = self._runs[i]
+            offset = source_id - self._starts[i]
+            if offset < length:
+                return first + offset
+        return None
+
+class ImportReport:
+    """Counts of imported rows per type plus the errors that were skipped."""
+
+    def __init__(self):
+        self.imported = {kind: 0 for kind in ORDER}
+        self.error_count = 0
+        self.errors = []
+
+    def error(self, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_ERROR_MESSAGES:
+            self.errors.append(str(message))
+
+    def __str__(self):
+        counts = ", ".join(f"{n} {kind}s" for kind, n in self.imported.items() if n)
+        return f"Imported {counts or 'nothing'}; {self.error_count} record(s) skipped"
+
+class Importer:
+    """
+    Buffers validated records and writes them in chunks. Invalid records
+    are skipped and reported rather than aborting the import.
+    """
+
+    def __init__(self, chunk_size=DEFAULT_CHUNK_SIZE, link_existing=False):
+        self.chunk_size = chunk_size
+        self.link_existing = link_existing
+        self.report = ImportReport()
+        # source id -> database id, for the types other rows refer to
+        self.id_map = {"owner": IdMap(), "pet": IdMap()}
+        self._pending = {kind: [] for kind in ORDER}
+        self._pending_count = 0
+
+    def add(self, location, record):
+        """Validate one record and buffer it, flushing when the chunk is full."""
+        if isinstance(record, RecordError):
+            self.report.error(record)
+            return
+        try:
+            kind, source_id, values = validate(location, record)
+        except RecordError as exc:
+            self.report.error(exc)
+            return
+        self._pending[kind].append((location, source_id, values))
+        self._pending_count += 1
+        if self._pending_count >= self.chunk_size:
+            self.flush()
+
+    def run(self, records):
+        """Import every (location, record) pair and return the ImportReport."""
+        for location, record in records:
+            self.add(location, record)
+        self.flush()
+        return self.report
+
+    def flush(self):
+        """Write everything buffered in one transaction, parents first."""
+        if not self._pending_count:
+            return
+        with transaction() as conn:
+            for kind in ORDER:
+                rows = self._pending[kind]
+                if rows:
+                    self._insert(conn, kind, rows)
+                    self._pending[kind] = []
+        self._pending_count = 0
+
+    def _insert(self, conn, kind, rows):
+        model, foreign_key = KINDS[kind]
+        if foreign_key:
+            column, parent = foreign_key
+            index = model.COLUMNS.index(column)
+            resolved = []
+            for location, source_id, values in rows:
+                parent_id = self._resolve(conn, parent, values[index])
+                if parent_id is None:
+                    self.report.error(f"{location}: {kind} refers to unknown {parent} {values[index]}")
+                    continue
+                values[index] = parent_id
+                resolved.append((location, source_id, values))
+            rows = resolved
+            if not rows:
+                return
+        conn.executemany(
+            "INSERT INTO {} ({}) VALUES ({})".format(
+                model.TABLE, ", ".join(model.COLUMNS), ", ".join("?" * len(model.COLUMNS))
+            ),
+            [values for _, _, values in rows],
+        )
+        self.report.imported[kind] += len(rows)
+        id_map = self.id_map.get(kind)
+        if id_map is not None:
+            # Same reasoning as Model.save_many(): ids are consecutive.
+            first_id = conn.execute("SELECT last_insert_rowid()").fetchone()[0] - len(rows) + 1
+            for offset, (_, source_id, _) in enumerate(rows):
+                if source_id is not None:
+                    id_map[source_id] = first_id + offset
+
+    def _resolve(self, conn, parent, source_id):
+        """
+        Database id for a parent referenced by source id. With
+        link_existing, ids not seen in this import name existing rows.
+        """
+        id_map = self.id_map[parent]
+        parent_id = id_map.get(source_id)
+        if parent_id is None and source_id is not None and self.link_existing:
+            table = KINDS[parent][0].TABLE
+            if conn.execute(f"SELECT 1 FROM {table} WHERE id=?", (source_id,)).fetchone():
+                parent_id = id_map[source_id] = source_id
+        return parent_id
+
+def _run(records, chunk_size, defer_indexing, link_existing):
+    importer = Importer(chunk_size, link_existing)
+    if not defer_indexing:
+        return importer.run(records)
+    with deferred_indexing():
+        return importer.run(records)
+
+def import_records(records, chunk_size=DEFAULT_CHUNK_SIZE, defer_indexing=False, link_existing=False):
+    """
+    Import an iterable of record dicts (no source locations needed).
+    defer_indexing=True rebuilds the search index once at the end instead
+    of maintaining it row by row; worth it for large loads.
+    """
+    return _run(
+        ((f"record {n}", record) for n, record in enumerate(records, 1)),
+        chunk_size, defer_indexing, link_existing,
+    )
+
+def import_path(path, fmt=None, kind=None, chunk_size=DEFAULT_CHUNK_SIZE,
+                defer_indexing=False, link_existing=False):
+    """Import a file or CSV directory (see read_path)."""
+    return _run(read_path(path, fmt, kind), chunk_size, defer_indexing, link_existing)
+
+# ---------- export ----------
+
+def _row_values(model, obj):
+    return [obj.id] + [getattr(obj, column) for column in model.COLUMNS]
+
+def export_records(kinds=ORDER):
+    """Stream every row of the given types as record dicts, parents first."""
+    for kind in kinds:
+        model = KINDS[kind][0]
+        columns = ("id",) + model.COLUMNS
+        for obj in model.iter_all():
+            record = {"type": kind}
+            record.update(zip(columns, _row_values(model, obj)))
+            yield record
+
+def export_path(path, fmt=None, kinds=ORDER):
+    """
+    Write a JSONL file (or "-" for stdout), or a directory of CSV files.
+    Returns the number of records written.
+    """
+    fmt = fmt or ("jsonl" if path == "-" or path.endswith(".jsonl") else "csv")
+    count = 0
+    if fmt == "jsonl":
+        handle = sys.stdout if path == "-" else open(path, "w", encoding="utf-8")
+        try:
+            for record in export_records(kinds):
+                handle.write(json.dumps(record) + "\n")
+                count += 1
+        finally:
+            if handle is not sys.stdout:
+                handle.close()
+        return count
+    os.makedirs(path, exist_ok=True)
+    for kind in kinds:
+        model = KINDS[kind][0]
+        with open(os.path.join(path, CSV_FILES[kind]), "w", newline="", encoding="utf-8") as handle:
+            writer = csv.writer(handle)
+            writer.writerow(("id",) + model.COLUMNS)
+            for obj in model.iter_all():
+                writer.writerow(_row_values(model, obj))
+                count += 1
+    return count
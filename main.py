@@ -1,12 +1,201 @@
 # main.py
 # ----------------------------------------
 # Entry point for running the PetCare CLI.
+#   python main.py                      interactive menu
+#   python main.py import PATH          bulk import CSV/JSONL
+#   python main.py export PATH          bulk export CSV/JSONL
+#   python main.py generate --rows N    synthetic data for load testing
+#   python main.py batch [PATH]        run commands from a file or stdin
+#   python main.py reminders           send appointment reminders as they fall due
+#   python main.py serve [--port N]     JSON-lines service (lib/service.py)
+#   python main.py sweep [--dry-run]    delete orphaned rows
+#   python main.py archive              move old history to the archive database
+#   python main.py vacuum               return free pages to the filesystem
+#   python main.py analytics REPORT     clinic statistics from a columnar snapshot
+#   python main.py reindex              rebuild search index + health summary
 # ----------------------------------------
 
-from lib.database import create_tables
-from lib.cli import main_menu
+import argparse
+import sys
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="petcare", description="PetCare — Pet Health & Appointment Tracker")
+    commands = parser.add_subparsers(dest="command")
+
+    imp = commands.add_parser("import", help="Import owners, pets, appointments and records")
+    imp.add_argument("path", help="a .jsonl file, a .csv file, a directory of CSV files, or - for stdin")
+    imp.add_argument("--format", choices=("csv", "jsonl"))
+    imp.add_argument("--kind", choices=("owner", "pet", "appointment", "medical_record"),
+                     help="record type of a single CSV file")
+    imp.add_argument("--chunk-size", type=int, default=5000, help="records per transaction")
+    imp.add_argument("--defer-index", action="store_true",
+                     help="rebuild search and health summary once at the end (faster for large files)")
+    imp.add_argument("--link-existing", action="store_true",
+                     help="let owner_id/pet_id values not in the file refer to existing rows")
+
+    exp = commands.add_parser("export", help="Export all data")
+    exp.add_argument("path", help="a .jsonl file, - for stdout, or a directory for CSV files")
+    exp.add_argument("--format", choices=("csv", "jsonl"))
+
+    gen = commands.add_parser("generate", help="Load deterministic synthetic data")
+    gen.add_argument("--rows", type=int, default=10000, help="approximate number of rows")
+    gen.add_argument("--seed", type=int, default=42)
+    gen.add_argument("--chunk-size", type=int, default=20000, help="records per transaction")
+    gen.add_argument("--out", help="write JSONL here instead of loading the database")
+
+    bat = commands.add_parser("batch", help="Run a script or JSONL stream of commands in one process")
+    bat.add_argument("path", nargs="?", default="-", help="command file, or - for stdin (the default)")
+    bat.add_argument("--batch-size", type=int, default=1000, help="commands per commit")
+    bat.add_argument("--quiet", action="store_true", help="print only errors")
+
+    rem = commands.add_parser("reminders", help="Send appointment reminders as they fall due")
+    rem.add_argument("--lead-hours", type=float, default=24, help="how long before an appointment to remind")
+    rem.add_argument("--window-days", type=float, default=7, help="how far ahead to keep appointments in memory")
+    rem.add_argument("--file", help="append reminders to this JSONL file instead of printing them")
+
+    srv = commands.add_parser("serve", help="Serve operations to other terminals over TCP")
+    srv.add_argument("--host", default="127.0.0.1")
+    srv.add_argument("--port", type=int, default=8765, help="0 picks a free port")
+    srv.add_argument("--workers", type=int, help="threads running read queries")
+
+    swp = commands.add_parser("sweep", help="Delete pets, appointments and records whose parent is gone")
+    swp.add_argument("--dry-run", action="store_true", help="only report what would be deleted")
+
+    arc = commands.add_parser("archive", help="Move old appointments and medical records to the archive database")
+    when = arc.add_mutually_exclusive_group()
+    when.add_argument("--before", help="archive rows dated before this date")
+    when.add_argument("--older-than-days", type=int, default=730, help="archive rows older than this (default 730)")
+    arc.add_argument("--chunk-size", type=int, default=5000, help="rows per transaction")
+
+    vac = commands.add_parser("vacuum", help="Return free pages in the database file to the filesystem")
+    vac.add_argument("--enable", action="store_true",
+                     help="switch an existing database to incremental vacuum (one full VACUUM)")
+    vac.add_argument("--max-pages", type=int, help="release at most this many pages")
+
+    ana = commands.add_parser("analytics", help="Clinic statistics from a columnar snapshot")
+    ana.add_argument("report", choices=("visits", "ages", "treatments", "snapshot"),
+                     help="visits per vet per month, ages by species, treatment counts, or just (re)build")
+    ana.add_argument("--snapshot", help="snapshot file (default: next to the database)")
+    ana.add_argument("--refresh", action="store_true", help="rebuild the snapshot from the database first")
+    ana.add_argument("--since", help="only appointments/records on or after this date")
+    ana.add_argument("--until", help="only appointments/records on or before this date")
+
+    commands.add_parser("reindex", help="Rebuild the full-text search index and health summary")
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    # Imported after parsing so --help and usage errors skip sqlite entirely.
+    from lib.database import create_tables
+
+    if args.command is None:
+        from lib.cli import main_menu
+        create_tables()
+        main_menu()
+        return
 
-if __name__ == "__main__":
     create_tables()
-    main_menu()
+    if args.command == "import":
+        from lib.transfer import import_path
+        report = import_path(
+            args.path, args.format, args.kind, args.chunk_size, args.defer_index, args.link_existing
+        )
+        print(report)
+        for message in report.errors:
+            print(f"  {message}")
+
+    elif args.command == "export":
+        from lib.transfer import export_path
+        print(f"Exported {export_path(args.path, args.format)} records")
+
+    elif args.command == "generate":
+        import json
+        from lib.synthetic import generate_records, owners_for_rows
+        from lib.transfer import import_records
+        records = generate_records(owners_for_rows(args.rows), seed=args.seed)
+        if args.out:
+            with open(args.out, "w", encoding="utf-8") as handle:
+                for record in records:
+                    handle.write(json.dumps(record) + "\n")
+            print(f"Wrote synthetic records to {args.out}")
+        else:
+            print(import_records(records, args.chunk_size, defer_indexing=True))
+
+    elif args.command == "batch":
+        from lib.batch import run_stream
+        if args.path == "-":
+            count, errors, elapsed = run_stream(sys.stdin, batch_size=args.batch_size, quiet=args.quiet)
+        else:
+            with open(args.path, encoding="utf-8") as handle:
+                count, errors, elapsed = run_stream(handle, batch_size=args.batch_size, quiet=args.quiet)
+        print(f"{count} commands, {errors} errors in {elapsed:.2f}s", file=sys.stderr)
+        if errors:
+            sys.exit(1)
+
+    elif args.command == "reminders":
+        from datetime import timedelta
+        from lib.reminders import FileSink, ReminderScheduler, StdoutSink
+        sink = FileSink(args.file) if args.file else StdoutSink()
+        scheduler = ReminderScheduler(sink, timedelta(hours=args.lead_hours), timedelta(days=args.window_days))
+        print(f"Watching {len(scheduler)} upcoming appointment(s); Ctrl-C to stop", file=sys.stderr)
+        try:
+            scheduler.run()
+        except KeyboardInterrupt:
+            scheduler.close()
+
+    elif args.command == "serve":
+        from lib.service import DEFAULT_WORKERS, serve
+        serve(args.host, args.port, args.workers or DEFAULT_WORKERS)
 
+    elif args.command == "sweep":
+        from lib.maintenance import sweep_orphans
+        counts = sweep_orphans(args.dry_run)
+        verb = "Would delete" if args.dry_run else "Deleted"
+        for table, count in counts.items():
+            print(f"{verb} {count} orphaned row(s) from {table}")
+
+    elif args.command == "archive":
+        from lib.archive import archive_before, cutoff_for_age
+        cutoff = args.before or cutoff_for_age(args.older_than_days)
+        moved = archive_before(cutoff, args.chunk_size)
+        for table, count in moved.items():
+            print(f"Archived {count} row(s) from {table} dated before {cutoff}")
+
+    elif args.command == "vacuum":
+        from lib.archive import enable_incremental_vacuum, reclaim, vacuum_stats
+        if args.enable and enable_incremental_vacuum():
+            print("Incremental vacuum enabled")
+        if vacuum_stats()["auto_vacuum"] != "incremental":
+            print("Incremental vacuum is off for this database; run with --enable first")
+            sys.exit(1)
+        print(f"Released {reclaim(args.max_pages)} free page(s)")
+
+    elif args.command == "analytics":
+        import os
+        from lib.analytics import Snapshot, build_snapshot, snapshot_path
+        path = args.snapshot or snapshot_path()
+        if args.refresh or args.report == "snapshot" or not os.path.exists(path):
+            build_snapshot(path)
+        with Snapshot(path) as snapshot:
+            print(f"Snapshot {path} taken {snapshot.created}")
+            if args.report == "visits":
+                counts = snapshot.visits_per_vet_month(args.since, args.until)
+                for (vet, month), count in sorted(counts.items(), key=lambda item: (item[0][1] or "", str(item[0][0]))):
+                    print(f"{month or '-':<8} {vet or '-':<24} {count:>8}")
+            elif args.report == "ages":
+                for (species,), stats in sorted(snapshot.age_distribution().items(), key=lambda item: str(item[0])):
+                    mean = "-" if stats.mean is None else f"{stats.mean:.1f}"
+                    print(f"{species or '-':<16} {stats.count:>8} pets  mean {mean:>5}  "
+                          f"range {stats.min}-{stats.max}")
+            elif args.report == "treatments":
+                counts = snapshot.treatment_frequency(since=args.since, until=args.until)
+                for (treatment,), count in counts.most_common():
+                    print(f"{treatment or '-':<24} {count:>8}")
+
+    elif args.command == "reindex":
+        from lib.search import rebuild_indexes
+        rebuild_indexes()
+        print("Search index rebuilt")
+
+if __name__ == "__main__":
+    main()
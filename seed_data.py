@@ -1,43 +1,46 @@
 # seed_data.py
 # ----------------------------------------
 # Populates the database with sample data for testing.
+# The records go through the bulk import pipeline (lib/transfer.py) in one
+# transaction. For large synthetic datasets use: python main.py generate
 # ----------------------------------------
 
 from lib.database import create_tables
-from lib.models.owner import Owner
-from lib.models.pet import Pet
-from lib.models.appointment import Appointment
-from lib.models.medical_record import MedicalRecord
+from lib.transfer import import_records
 
-def seed():
-    create_tables()
-
-    # Create sample owners
-    alice = Owner("Alice Johnson", "0710000001").save()
-    brian = Owner("Brian Kim", "0722000002").save()
-    cathy = Owner("Cathy Wanjiku", "0733000003").save()
+SAMPLE_RECORDS = [
+    # Owners
+    {"type": "owner", "id": 1, "name": "Alice Johnson", "contact": "0710000001"},
+    {"type": "owner", "id": 2, "name": "Brian Kim", "contact": "0722000002"},
+    {"type": "owner", "id": 3, "name": "Cathy Wanjiku", "contact": "0733000003"},
 
     # Pets for Alice
-    p1 = Pet("Bella", 3, "Dog", "Beagle", alice.id).save()
-    p2 = Pet("Milo", 1, "Cat", "Siamese", alice.id).save()
+    {"type": "pet", "id": 1, "name": "Bella", "age": 3, "species": "Dog", "breed": "Beagle", "owner_id": 1},
+    {"type": "pet", "id": 2, "name": "Milo", "age": 1, "species": "Cat", "breed": "Siamese", "owner_id": 1},
 
     # Pets for Brian
-    p3 = Pet("Rocky", 5, "Dog", "German Shepherd", brian.id).save()
-    p4 = Pet("Coco", 2, "Parrot", "African Grey", brian.id).save()
+    {"type": "pet", "id": 3, "name": "Rocky", "age": 5, "species": "Dog", "breed": "German Shepherd", "owner_id": 2},
+    {"type": "pet", "id": 4, "name": "Coco", "age": 2, "species": "Parrot", "breed": "African Grey", "owner_id": 2},
 
     # Pets for Cathy
-    p5 = Pet("Simba", 4, "Cat", "Maine Coon", cathy.id).save()
-    p6 = Pet("Luna", 2, "Dog", "Poodle", cathy.id).save()
+    {"type": "pet", "id": 5, "name": "Simba", "age": 4, "species": "Cat", "breed": "Maine Coon", "owner_id": 3},
+    {"type": "pet", "id": 6, "name": "Luna", "age": 2, "species": "Dog", "breed": "Poodle", "owner_id": 3},
 
     # Appointments and records
-    Appointment(p1.id, "2025-10-20", "Checkup", "Dr. Muli", "Healthy").save()
-    Appointment(p3.id, "2025-10-25", "Vaccination", "Dr. Amina", "Next in 1 year").save()
-    Appointment(p5.id, "2025-11-05", "Dental Cleaning", "Dr. Otieno", "Minor tartar").save()
+    {"type": "appointment", "pet_id": 1, "date": "2025-10-20", "reason": "Checkup", "vet_name": "Dr. Muli", "notes": "Healthy"},
+    {"type": "appointment", "pet_id": 3, "date": "2025-10-25", "reason": "Vaccination", "vet_name": "Dr. Amina", "notes": "Next in 1 year"},
+    {"type": "appointment", "pet_id": 5, "date": "2025-11-05", "reason": "Dental Cleaning", "vet_name": "Dr. Otieno", "notes": "Minor tartar"},
 
-    MedicalRecord(p1.id, "2025-01-10", "Rabies Vaccine", "No issues").save()
-    MedicalRecord(p3.id, "2025-03-12", "Deworming", "Good recovery").save()
-    MedicalRecord(p6.id, "2025-04-22", "Ear Infection Treatment", "Cleared").save()
+    {"type": "medical_record", "pet_id": 1, "record_date": "2025-01-10", "treatment": "Rabies Vaccine", "notes": "No issues"},
+    {"type": "medical_record", "pet_id": 3, "record_date": "2025-03-12", "treatment": "Deworming", "notes": "Good recovery"},
+    {"type": "medical_record", "pet_id": 6, "record_date": "2025-04-22", "treatment": "Ear Infection Treatment", "notes": "Cleared"},
+]
 
+def seed():
+    create_tables()
+    report = import_records(SAMPLE_RECORDS)
+    if report.error_count:
+        raise SystemExit(f"Seeding failed: {report.errors}")
     print("✅ Database seeded successfully!")
 
 if __name__ == "__main__":
@@ -1,6 +1,8 @@
 import os
 import pytest
 
+from lib.database import create_tables, get_connection
+
 @pytest.fixture(autouse=True)
 def use_test_db(monkeypatch, tmp_path):
     """
@@ -10,4 +12,19 @@ def use_test_db(monkeypatch, tmp_path):
     test_db = str(tmp_path / "test_database.db")
     monkeypatch.setenv("PETCARE_DB", test_db)
     yield
-    # tmp_path cleanup handled by pytest
\ No newline at end of file
+    # tmp_path cleanup handled by pytest
+
+@pytest.fixture
+def schema(use_test_db):
+    """
+    Bring the test database up to the current schema. Test modules that
+    need the tables opt in with pytestmark = pytest.mark.usefixtures("schema").
+    """
+    create_tables()
+
+@pytest.fixture
+def count():
+    """count(table): the number of rows in `table` of the test database."""
+    def count(table):
+        return get_connection().execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+    return count
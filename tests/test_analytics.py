@@ -0,0 +1,97 @@
+"""
+Tests for the columnar analytics snapshot, with and without NumPy.
+"""
+import pytest
+
+from lib import analytics, archive
+from lib.database import get_connection
+from lib.models.owner import Owner
+from lib.models.pet import Pet
+from lib.models.appointment import Appointment
+from lib.models.medical_record import MedicalRecord
+
+pytestmark = pytest.mark.usefixtures("schema")
+
+@pytest.fixture(params=["numpy", "python"])
+def backend(request, monkeypatch):
+    if request.param == "numpy" and analytics.numpy is None:
+        pytest.skip("NumPy is not installed")
+    if request.param == "python":
+        monkeypatch.setattr(analytics, "numpy", None)
+
+@pytest.fixture
+def clinic():
+    owner = Owner("Alice", "0700").save()
+    dog = Pet("Bella", 3, "Dog", "Labrador", owner.id).save()
+    old_dog = Pet("Rex", 11, "Dog", "Boxer", owner.id).save()
+    cat = Pet("Tom", None, "Cat", None, owner.id).save()
+    for pet, day, vet in ((dog, "2024-01-05", "Dr. Muli"), (dog, "2024-01-20", "Dr. Muli"),
+                          (cat, "2024-01-07", "Dr. Kamau"), (old_dog, "2024-02-01", "Dr. Muli")):
+        Appointment(pet.id, day, "Checkup", vet).save()
+    for pet, day, treatment in ((dog, "2019-05-01", "Rabies Vaccine"), (dog, "2024-05-01", "Rabies Vaccine"),
+                                (cat, "2024-03-01", "Deworming"), (old_dog, "2024-03-02", "Deworming")):
+        MedicalRecord(pet.id, day, treatment, None).save()
+    return dog, old_dog, cat
+
+@pytest.fixture
+def snapshot(clinic, backend, tmp_path):
+    with analytics.Snapshot(analytics.build_snapshot(str(tmp_path / "clinic.snap"))) as snapshot:
+        yield snapshot
+
+def test_visits_per_vet_month(snapshot):
+    assert snapshot.visits_per_vet_month() == {
+        ("Dr. Muli", "2024-01"): 2, ("Dr. Kamau", "2024-01"): 1, ("Dr. Muli", "2024-02"): 1,
+    }
+    assert snapshot.visits_per_vet_month(since="2024-01-06", until="2024-01-31") == {
+        ("Dr. Muli", "2024-01"): 1, ("Dr. Kamau", "2024-01"): 1,
+    }
+
+def test_age_distribution_ignores_null_ages(snapshot):
+    ages = snapshot.age_distribution()
+    assert ages[("Dog",)] == analytics.Stats(2, 7.0, 3, 11)
+    assert ages[("Cat",)] == analytics.Stats(0, None, None, None)
+    assert snapshot.age_distribution(("species", "breed"))[("Cat", None)].count == 0
+
+def test_treatment_frequency_joined_to_pets(snapshot):
+    assert snapshot.treatment_frequency() == {("Rabies Vaccine",): 2, ("Deworming",): 2}
+    assert snapshot.treatment_frequency(("pet.species", "treatment")) == {
+        ("Dog", "Rabies Vaccine"): 2, ("Cat", "Deworming"): 1, ("Dog", "Deworming"): 1,
+    }
+
+def test_columns_are_compact_and_dates_are_days(snapshot):
+    assert snapshot.rows("appointments") == 4
+    assert snapshot.column("appointments", "vet_name").itemsize == 1
+    assert snapshot.column("appointments", "month").itemsize == 2
+    days = snapshot.column("medical_records", "day")
+    assert analytics.day_to_date(days[0]) == "2019-05-01"
+    assert days[1] - days[0] == analytics.to_day("2024-05-01") - analytics.to_day("2019-05-01")
+
+def test_snapshot_includes_archived_rows(clinic, backend, tmp_path):
+    archive.archive_before("2020-01-01")
+    path = str(tmp_path / "clinic.snap")
+    with analytics.Snapshot(analytics.build_snapshot(path)) as snapshot:
+        assert snapshot.treatment_frequency()[("Rabies Vaccine",)] == 2
+    with analytics.Snapshot(analytics.build_snapshot(path, include_archive=False)) as snapshot:
+        assert snapshot.treatment_frequency()[("Rabies Vaccine",)] == 1
+
+def test_results_match_sql(snapshot):
+    rows = get_connection().execute(
+        "SELECT vet_name, strftime('%Y-%m', date), COUNT(*) FROM appointments GROUP BY 1, 2"
+    ).fetchall()
+    assert snapshot.visits_per_vet_month() == {(vet, month): count for vet, month, count in rows}
+
+def test_empty_database_and_bad_file(backend, tmp_path):
+    with analytics.Snapshot(analytics.build_snapshot(str(tmp_path / "empty.snap"))) as snapshot:
+        assert snapshot.rows("pets") == 0
+        assert snapshot.visits_per_vet_month() == {}
+    bogus = tmp_path / "bogus.snap"
+    bogus.write_bytes(b"not a snapshot at all")
+    with pytest.raises(ValueError):
+        analytics.Snapshot(str(bogus))
+
+def test_far_future_dates_do_not_break_the_snapshot(clinic, backend, tmp_path):
+    dog = clinic[0]
+    Appointment(dog.id, "6025-01-05", "Checkup", "Dr. Muli").save()
+    with analytics.Snapshot(analytics.build_snapshot(str(tmp_path / "clinic.snap"))) as snapshot:
+        assert snapshot.visits_per_vet_month()[("Dr. Muli", "6025-01")] == 1
+        assert snapshot.column("appointments", "month").itemsize == 4
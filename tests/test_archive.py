@@ -0,0 +1,120 @@
+"""
+Tests for moving old appointments and medical records to the archive database.
+"""
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from lib import archive, health
+from lib.database import create_archive, get_connection, get_pool, transaction
+from lib.maintenance import sweep_orphans
+from lib.models.owner import Owner
+from lib.models.pet import Pet
+from lib.models.appointment import Appointment
+from lib.models.medical_record import MedicalRecord
+
+pytestmark = pytest.mark.usefixtures("schema")
+
+@pytest.fixture
+def pet():
+    owner = Owner("Alice", "0700").save()
+    pet = Pet("Bella", 3, "Dog", "Labrador", owner.id).save()
+    for year in (2019, 2020, 2021, 2025):
+        Appointment(pet.id, f"{year}-03-01", "Checkup", "Dr. Muli").save()
+        MedicalRecord(pet.id, f"{year}-03-01", "Deworming", None).save()
+    MedicalRecord(pet.id, "2018-06-01", "Rabies Vaccine", None).save()
+    return pet
+
+def test_archive_moves_old_rows_in_chunks(pet, count):
+    moved = archive.archive_before("2021-01-01", chunk_size=1)
+    assert moved == {"appointments": 2, "medical_records": 3}
+    assert count("appointments") == 2 and count("archive.appointments") == 2
+    assert [a.date for a in Appointment.find_by_pet(pet.id)] == ["2021-03-01", "2025-03-01"]
+    # Running again finds nothing left to move.
+    assert archive.archive_before("2021-01-01") == {"appointments": 0, "medical_records": 0}
+
+def test_include_archive_unions_both_stores_in_id_order(pet):
+    everything = [r.record_date for r in MedicalRecord.find_by_pet(pet.id)]
+    archive.archive_before("2021-01-01")
+    assert [r.record_date for r in MedicalRecord.find_by_pet(pet.id, include_archive=True)] == everything
+    assert len(Appointment.find_by_pet(pet.id, include_archive=True)) == 4
+
+def test_half_finished_move_is_not_duplicated(pet, count):
+    # As if a crash came between the copy and the delete.
+    create_archive()
+    with transaction() as conn:
+        conn.execute("INSERT INTO archive.appointments SELECT * FROM appointments WHERE date < '2020-01-01'")
+    assert len(Appointment.find_by_pet(pet.id, include_archive=True)) == 4
+    archive.archive_before("2020-01-01")
+    assert count("appointments") == 3 and count("archive.appointments") == 1
+
+def test_archived_records_still_count_for_due_dates(pet):
+    archive.archive_before("2021-01-01")
+    latest = dict(get_connection().execute("SELECT treatment, last_date FROM pet_treatments"))
+    assert latest == {"Deworming": "2025-03-01", "Rabies Vaccine": "2018-06-01"}
+    with transaction() as conn:
+        health.rebuild(conn)
+    assert dict(get_connection().execute("SELECT treatment, last_date FROM pet_treatments")) == latest
+
+def test_changing_hot_records_keeps_archived_history(pet):
+    MedicalRecord(pet.id, "2025-06-01", "Rabies Vaccine", None).save()
+    archive.archive_before("2021-01-01")
+    latest = MedicalRecord.find_by_pet(pet.id)[-1]
+    latest.delete()
+    rabies = [r for r in health.due_report(as_of="2025-07-01") if r[4] == "Rabies Vaccine"]
+    assert [(r[5], r[7]) for r in rabies] == [("2018-06-01", 1)]
+    MedicalRecord(pet.id, "2024-01-01", "Deworming", None).save()
+    with transaction() as conn:
+        conn.execute("UPDATE medical_records SET treatment='Deworming' WHERE treatment='Deworming'")
+        conn.execute("DELETE FROM medical_records WHERE treatment='Deworming'")
+    last = dict(get_connection().execute("SELECT treatment, last_date FROM pet_treatments"))
+    assert last == {"Rabies Vaccine": "2018-06-01", "Deworming": "2020-03-01"}
+
+def test_future_cutoff_is_rejected(pet):
+    with pytest.raises(ValueError):
+        archive.archive_before("2999-01-01")
+
+def test_pet_delete_and_sweep_reach_the_archive(pet, count):
+    archive.archive_before("2021-01-01")
+    pet.delete()
+    assert count("archive.appointments") == 0 and count("archive.medical_records") == 0
+
+    other = Pet("Max", 2, "Cat", "Siamese", None).save()
+    MedicalRecord(other.id, "2019-01-01", "Deworming", None).save()
+    archive.archive_before("2021-01-01")
+    get_connection().execute("PRAGMA foreign_keys=OFF")
+    with transaction() as conn:
+        conn.execute("DELETE FROM pets WHERE id=?", (other.id,))
+    get_connection().execute("PRAGMA foreign_keys=ON")
+    assert sweep_orphans()["archive.medical_records"] == 1
+
+def test_incremental_vacuum_releases_free_pages():
+    assert archive.vacuum_stats()["auto_vacuum"] == "incremental"
+    owner = Owner("Bob", "0711").save()
+    pet = Pet("Rex", 5, "Dog", "Boxer", owner.id).save()
+    records = MedicalRecord.save_many(MedicalRecord(pet.id, "2015-01-01", "Deworming", "x" * 500) for _ in range(2000))
+    MedicalRecord.delete_many([r.id for r in records])
+    free = archive.vacuum_stats()["freelist_count"]
+    assert free > 0
+    assert archive.maybe_reclaim(max_pages=10) == 10
+    assert archive.reclaim() == free - 10
+    assert archive.vacuum_stats()["freelist_count"] == 0
+    assert archive.maybe_reclaim() == 0
+
+def test_no_archive_file_until_rows_are_archived(pet):
+    pool = get_pool()
+    assert not os.path.exists(pool.archive_path)
+    assert len(Appointment.find_by_pet(pet.id, include_archive=True)) == 4
+    archive.archive_before("2020-01-01")
+    assert os.path.exists(pool.archive_path)
+
+def test_connections_opened_during_a_write_do_not_wait(pet):
+    archive.archive_before("2020-01-01")
+    with transaction():
+        Owner("Writer", "0700").save()
+        with ThreadPoolExecutor(1) as reader:
+            start = time.perf_counter()
+            assert len(reader.submit(Appointment.find_by_pet, pet.id, True).result()) == 4
+            assert time.perf_counter() - start < 1
@@ -0,0 +1,58 @@
+"""
+Tests for the non-interactive batch mode (lib/batch.py) and lazy startup imports.
+"""
+import io
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from lib.batch import parse_line, run_stream
+from lib.database import get_connection
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+pytestmark = pytest.mark.usefixtures("schema")
+
+def run(script, **kwargs):
+    out = io.StringIO()
+    count, errors, _ = run_stream(io.StringIO(script), out, **kwargs)
+    return count, errors, [json.loads(line) for line in out.getvalue().splitlines()]
+
+def test_parse_script_and_json_lines():
+    command = parse_line('alice = add_owner name="Alice Johnson" contact=0700 age=3')
+    assert (command.name, command.op) == ("alice", "add_owner")
+    assert command.params == {"name": "Alice Johnson", "contact": "0700", "age": 3}
+    command = parse_line('{"op": "get_owner", "params": {"id": 1}, "as": "o"}')
+    assert (command.op, command.params, command.name) == ("get_owner", {"id": 1}, "o")
+    assert parse_line("  # comment") is None and parse_line("") is None
+
+def test_results_can_be_referenced_by_later_commands():
+    count, errors, lines = run(
+        "alice = add_owner name=Alice contact=0700\n"
+        "bella = add_pet name=Bella age=3 species=Dog breed=Lab owner_id=$alice.id\n"
+        '{"op": "list_pets", "params": {"owner_id": "$alice.id"}}\n'
+    )
+    assert (count, errors) == (3, 0)
+    assert lines[2]["result"][0]["name"] == "Bella"
+
+def test_failing_commands_do_not_undo_the_rest_of_the_batch():
+    count, errors, lines = run(
+        "add_owner name=A contact=1\n"
+        "add_pet name=Orphan\n"
+        'unbalanced "quote\n'
+        "add_pet name=X age=1 species=Cat breed=Y owner_id=$missing.id\n"
+        "add_owner name=B contact=2\n",
+        batch_size=2, quiet=True,
+    )
+    assert (count, errors) == (5, 3)
+    assert [line["line"] for line in lines] == [2, 3, 4]
+    assert get_connection().execute("SELECT COUNT(*) FROM owners").fetchone()[0] == 2
+
+def test_database_import_skips_instrumentation():
+    env = {k: v for k, v in os.environ.items() if k != "PETCARE_SQL_STATS"}
+    code = "import sys, lib.database; print('lib.instrumentation' in sys.modules)"
+    output = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env, capture_output=True, text=True)
+    assert output.stdout.strip() == "False"
@@ -0,0 +1,105 @@
+"""
+Tests for the identity map / LRU cache behind find_by_id.
+"""
+import threading
+
+import pytest
+
+from lib.cache import IdentityMap, LRUCache
+from lib.database import transaction
+from lib.models.base import cache_stats
+from lib.models.owner import Owner
+from lib.models.pet import Pet
+
+pytestmark = pytest.mark.usefixtures("schema")
+
+def test_find_by_id_returns_same_object_without_query():
+    owner = Owner("Cached", "0700").save()
+    hits = cache_stats()["hits"]
+    assert Owner.find_by_id(owner.id) is owner
+    assert Owner.find_by_id(owner.id) is owner
+    assert cache_stats()["hits"] == hits + 2
+
+def test_update_and_delete_invalidate():
+    owner = Owner("Before", "0700").save()
+    stale = Owner.get_all()[0]
+    stale.update(name="After")
+    assert Owner.find_by_id(owner.id).name == "After"
+
+    stale.delete()
+    assert Owner.find_by_id(owner.id) is None
+
+def test_rollback_drops_cached_objects():
+    with pytest.raises(RuntimeError):
+        with transaction():
+            owner = Owner("Ghost", "0700").save()
+            raise RuntimeError("boom")
+    assert Owner.find_by_id(owner.id) is None
+
+def test_models_share_cache_without_key_collisions():
+    owner = Owner("Shared", "0700").save()
+    pet = Pet("Rex", 2, "Dog", "Mixed", owner.id).save()
+    assert Owner.find_by_id(owner.id) is owner
+    assert Pet.find_by_id(pet.id) is pet
+
+def test_lru_evicts_least_recently_used():
+    cache = LRUCache(2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.stats()["evictions"] == 1
+
+def test_uncommitted_writes_stay_out_of_other_threads():
+    owner = Owner("Committed", "0700").save()
+    seen = {}
+    writing, checked = threading.Event(), threading.Event()
+
+    def reader():
+        writing.wait()
+        seen["phantom"] = Owner.find_by_id(owner.id + 1)
+        seen["name"] = Owner.find_by_id(owner.id).name
+        checked.set()
+
+    thread = threading.Thread(target=reader)
+    thread.start()
+    with pytest.raises(RuntimeError):
+        with transaction():
+            Owner("Phantom", "0711").save()
+            owner.update(name="Uncommitted")
+            writing.set()
+            checked.wait(5)
+            raise RuntimeError("roll back")
+    thread.join()
+    assert seen == {"phantom": None, "name": "Committed"}
+    assert owner.name == "Committed"
+    assert Owner.find_by_id(owner.id).name == "Committed"
+
+def test_commit_replaces_other_threads_cached_copy():
+    from concurrent.futures import ThreadPoolExecutor
+    owner = Owner("Old", "0700").save()
+    with ThreadPoolExecutor(1) as reader:
+        name = lambda: Owner.find_by_id(owner.id).name
+        assert reader.submit(name).result() == "Old"
+        owner.update(name="New")
+        assert reader.submit(name).result() == "New"
+
+def test_publish_racing_a_reader_put_never_leaves_stale_objects():
+    identity = IdentityMap(10)
+    generation = identity.generation
+    cache = identity._cache()
+    put = cache.put
+    publisher = threading.Thread(target=identity.publish, args=("k", "new"))
+
+    def put_while_publishing(key, value):
+        # The writer publishes between the reader's check and its put.
+        publisher.start()
+        publisher.join(0.2)
+        put(key, value)
+
+    cache.put = put_while_publishing
+    identity.put_if_current("k", "stale", generation)
+    publisher.join()
+    assert identity.get("k") is None
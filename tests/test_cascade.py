@@ -0,0 +1,73 @@
+"""
+Tests for set-based cascading deletes and the orphan sweeper.
+"""
+import pytest
+
+from lib.database import get_connection, transaction
+from lib.maintenance import sweep_orphans
+from lib.models.base import identity_map
+from lib.models.owner import Owner
+from lib.models.pet import Pet
+from lib.models.appointment import Appointment
+from lib.models.medical_record import MedicalRecord
+from lib.schedule import VetSchedule
+
+pytestmark = pytest.mark.usefixtures("schema")
+
+def make_owner(name, pets=2):
+    owner = Owner(name, "0700").save()
+    for pet in Pet.save_many(Pet(f"{name} pet {i}", 1, "Dog", "Mixed", owner.id) for i in range(pets)):
+        Appointment(pet.id, "2030-01-01", "Checkup", "Dr. Muli", time="10:00").save()
+        MedicalRecord(pet.id, "2025-01-01", "Rabies Vaccine", None).save()
+    return owner
+
+def test_owner_delete_cascades_to_everything_below(count):
+    gone = make_owner("Gone")
+    kept = make_owner("Kept")
+    gone.delete()
+    assert count("owners") == 1 and count("pets") == 2
+    assert count("appointments") == 2 and count("medical_records") == 2
+    assert count("pet_treatments") == 2 and count("pet_health") == 2
+    assert [o.id for o in Owner.page()] == [kept.id]
+
+def test_delete_many_updates_identity_map_and_schedules():
+    owners = [make_owner(f"Owner {i}", pets=1) for i in range(3)]
+    pet = Pet.find_by_owner(owners[2].id)[0]
+    assert Pet.find_by_id(pet.id) is Pet.find_by_id(pet.id)
+    probe = Appointment(pet.id, "2030-01-01", "x", "Dr. Muli", time="10:15")
+    schedule = VetSchedule()
+    first_conflict = schedule.find_conflict(probe)
+    assert Owner.delete_many([owners[0].id, owners[2].id]) == 2
+    assert identity_map.get(("pets", pet.id)) is None
+    assert Pet.find_by_id(pet.id) is None
+    remaining = Appointment.between("2030-01-01", "2030-01-01")
+    assert len(remaining) == 1
+    assert schedule.find_conflict(probe) == remaining[0].id != first_conflict
+
+def test_pet_delete_many_keeps_owner(count):
+    owner = make_owner("Alice", pets=3)
+    pets = Pet.find_by_owner(owner.id)
+    assert Pet.delete_many(p.id for p in pets[:2]) == 2
+    assert count("owners") == 1 and count("pets") == 1 and count("appointments") == 1
+
+def test_sweeper_removes_legacy_orphans(count):
+    make_owner("Kept")
+    orphan_owner = make_owner("Orphaned")
+    conn = get_connection()
+    conn.execute("PRAGMA foreign_keys=OFF")
+    try:
+        with transaction() as tx:
+            tx.execute("DELETE FROM owners WHERE id=?", (orphan_owner.id,))
+            tx.execute("INSERT INTO appointments (pet_id, date, reason, vet_name) VALUES (999, '2030-01-01', 'x', 'y')")
+    finally:
+        conn.execute("PRAGMA foreign_keys=ON")
+
+    expected = {
+        "pets": 2, "appointments": 3, "medical_records": 2, "pet_treatments": 0, "pet_health": 1,
+        "archived_treatments": 0,
+    }
+    assert sweep_orphans(dry_run=True) == expected
+    assert count("pets") == 4
+    assert sweep_orphans() == expected
+    assert count("pets") == 2 and count("appointments") == 2 and count("medical_records") == 2
+    assert sweep_orphans() == dict.fromkeys(expected, 0)
@@ -0,0 +1,65 @@
+"""
+Tests for the connection pool, the transaction() unit of work and
+bulk save_many() inserts.
+"""
+import threading
+
+import pytest
+
+from lib.database import get_connection, transaction
+from lib.models.owner import Owner
+from lib.models.pet import Pet
+
+pytestmark = pytest.mark.usefixtures("schema")
+
+def test_save_many_fills_ids():
+    owner = Owner(name="Bulk Owner", contact="0700000010").save()
+    pets = Pet.save_many(Pet(f"Pet {i}", i, "Dog", "Mixed", owner.id) for i in range(5))
+
+    ids = [p.id for p in pets]
+    assert len(set(ids)) == 5
+    for pet in pets:
+        row = get_connection().execute("SELECT name FROM pets WHERE id=?", (pet.id,)).fetchone()
+        assert row[0] == pet.name
+
+def test_transaction_rolls_back_on_error():
+    with pytest.raises(RuntimeError):
+        with transaction():
+            owner = Owner(name="Rolled Back", contact="0700000011").save()
+            raise RuntimeError("boom")
+
+    assert get_connection().execute("SELECT id FROM owners WHERE id=?", (owner.id,)).fetchone() is None
+
+def test_nested_transaction_commits_once():
+    with transaction():
+        outer = Owner(name="Outer", contact="0700000012").save()
+        with transaction():
+            inner = Owner(name="Inner", contact="0700000013").save()
+        assert get_connection().in_transaction
+
+    assert not get_connection().in_transaction
+    assert Owner.find_by_id(outer.id) is not None
+    assert Owner.find_by_id(inner.id) is not None
+
+def test_concurrent_saves_get_their_own_ids():
+    saved = []
+    errors = []
+
+    def worker(n):
+        try:
+            for i in range(25):
+                owner = Owner(name=f"Thread {n}-{i}", contact="0700").save()
+                saved.append((owner.id, owner.name))
+        except Exception as exc:  # pragma: no cover - surfaced below
+            errors.append(exc)
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert not errors
+    assert len({owner_id for owner_id, _ in saved}) == 100
+    for owner_id, name in saved:
+        assert Owner.find_by_id(owner_id).name == name
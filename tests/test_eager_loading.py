@@ -0,0 +1,57 @@
+"""
+Tests for Owner.load_graph() / iter_graph() eager loading.
+"""
+import pytest
+
+from lib.database import disable_instrumentation, enable_instrumentation
+from lib.models.owner import Owner
+from lib.models.pet import Pet
+from lib.models.appointment import Appointment
+from lib.models.medical_record import MedicalRecord
+
+pytestmark = pytest.mark.usefixtures("schema")
+
+def make_clinic(owners=5, pets=3):
+    saved = Owner.save_many(Owner(f"Owner {i}", "0700") for i in range(owners))
+    for owner in saved:
+        for pet in Pet.save_many(Pet(f"Pet {owner.id}-{j}", 2, "Dog", "Mixed", owner.id) for j in range(pets)):
+            Appointment.save_many([
+                Appointment(pet.id, "2026-03-01", "Booster", "Dr. Muli"),
+                Appointment(pet.id, "2025-01-01", "Checkup", "Dr. Muli"),
+            ])
+            MedicalRecord.save_many([MedicalRecord(pet.id, "2024-05-05", "Rabies", None)])
+    return saved
+
+def test_load_graph_wires_relations_in_order():
+    owners = make_clinic()
+    wanted = [owners[3].id, owners[0].id, 9999]
+    loaded = Owner.load_graph(wanted)
+    assert [o.id for o in loaded] == wanted[:2]
+    pets = loaded[0].pets
+    assert len(pets) == 3 and all(p.owner_id == loaded[0].id for p in pets)
+    assert [a.date for a in pets[0].appointments] == ["2025-01-01", "2026-03-01"]
+    assert [r.treatment for r in pets[0].medical_records] == ["Rabies"]
+
+def test_load_graph_uses_one_query_per_level():
+    owners = make_clinic(owners=20)
+    stats = enable_instrumentation()
+    try:
+        Owner.load_graph(o.id for o in owners)
+        assert sum(s["calls"] for s in stats.snapshot()["statements"]) == 4
+    finally:
+        disable_instrumentation()
+
+def test_include_limits_relations():
+    owner = make_clinic(owners=1)[0]
+    loaded = Owner.load_graph([owner.id], include=("pets",))[0]
+    assert len(loaded.pets) == 3
+    with pytest.raises(AttributeError):
+        loaded.pets[0].appointments
+    with pytest.raises(ValueError):
+        Owner.load_graph([owner.id], include=("vets",))
+
+def test_iter_graph_streams_every_owner():
+    owners = make_clinic(owners=7, pets=1)
+    streamed = list(Owner.iter_graph(chunk_size=3))
+    assert [o.id for o in streamed] == [o.id for o in owners]
+    assert all(len(o.pets) == 1 and len(o.pets[0].appointments) == 2 for o in streamed)
@@ -0,0 +1,70 @@
+"""
+Tests for the trigger-maintained treatment due-date summary (lib/health.py).
+"""
+import pytest
+
+from lib import health
+from lib.database import get_connection, transaction
+from lib.models.owner import Owner
+from lib.models.pet import Pet
+from lib.models.appointment import Appointment
+from lib.models.medical_record import MedicalRecord
+from lib.search import deferred_indexing
+
+pytestmark = pytest.mark.usefixtures("schema")
+
+@pytest.fixture
+def pet():
+    owner = Owner("Alice", "0700").save()
+    return Pet("Bella", 3, "Dog", "Lab", owner.id).save()
+
+def summary(pet_id):
+    return get_connection().execute(
+        "SELECT treatment, last_date, due_date FROM pet_treatments WHERE pet_id=? ORDER BY treatment", (pet_id,)
+    ).fetchall()
+
+def test_latest_record_sets_due_date(pet):
+    MedicalRecord(pet.id, "2025-01-10", "Rabies Vaccine", None).save()
+    MedicalRecord(pet.id, "10/03/2025", "rabies vaccine", None).save()
+    MedicalRecord(pet.id, "2024-06-01", "Rabies Vaccine", None).save()
+    MedicalRecord(pet.id, "2025-02-01", "Checkup", None).save()
+    assert summary(pet.id) == [("Checkup", "2025-02-01", None), ("Rabies Vaccine", "2025-03-10", "2026-03-10")]
+
+def test_delete_recomputes_from_remaining_records(pet):
+    MedicalRecord(pet.id, "2025-01-01", "Deworming", None).save()
+    latest = MedicalRecord(pet.id, "2025-04-01", "Deworming", None).save()
+    with transaction() as conn:
+        conn.execute("DELETE FROM medical_records WHERE id=?", (latest.id,))
+    assert summary(pet.id) == [("Deworming", "2025-01-01", "2025-04-01")]
+
+def test_interval_changes_update_due_dates(pet):
+    MedicalRecord(pet.id, "2025-01-01", "Checkup", None).save()
+    health.set_interval("checkup", 180)
+    assert summary(pet.id) == [("Checkup", "2025-01-01", "2025-06-30")]
+    health.remove_interval("Checkup")
+    assert summary(pet.id) == [("Checkup", "2025-01-01", None)]
+
+def test_due_report_range_and_next_appointment(pet):
+    MedicalRecord(pet.id, "2025-01-10", "Rabies Vaccine", None).save()
+    MedicalRecord(pet.id, "2025-09-01", "Deworming", None).save()
+    Appointment(pet.id, "2099-01-05", "Booster", "Dr. Muli").save()
+    rows = health.due_report(as_of="2026-01-01", within_days=30)
+    assert [(r[4], r[6], r[7], r[8]) for r in rows] == [
+        ("Deworming", "2025-11-30", 1, "2099-01-05"),
+        ("Rabies Vaccine", "2026-01-10", 0, "2099-01-05"),
+    ]
+    assert health.due_report(as_of="2025-06-01", within_days=0) == []
+
+def test_past_next_appointment_is_rolled_forward(pet):
+    MedicalRecord(pet.id, "2025-01-10", "Rabies Vaccine", None).save()
+    Appointment(pet.id, "2098-01-01", "Booster", "Dr. Muli").save()
+    Appointment(pet.id, "2099-01-01", "Checkup", "Dr. Muli").save()
+    assert health.due_report(as_of="2098-06-01")[0][8] == "2099-01-01"
+    assert health.refresh_next_appointments(as_of="2098-06-01") == 1
+    assert get_connection().execute("SELECT next_appointment FROM pet_health").fetchone() == ("2099-01-01",)
+
+def test_deferred_indexing_rebuilds_summary(pet):
+    with deferred_indexing():
+        MedicalRecord.save_many(MedicalRecord(pet.id, f"2025-0{m}-01", "Deworming", None) for m in range(1, 6))
+        assert summary(pet.id) == []
+    assert summary(pet.id) == [("Deworming", "2025-05-01", "2025-07-30")]
@@ -0,0 +1,60 @@
+"""
+Tests for query instrumentation: timing, row counts, slow log and N+1 detection.
+"""
+import sqlite3
+
+import pytest
+
+from lib.database import (
+    disable_instrumentation, enable_instrumentation, get_connection, transaction,
+)
+from lib.models.owner import Owner
+from lib.models.pet import Pet
+
+pytestmark = pytest.mark.usefixtures("schema")
+
+@pytest.fixture(autouse=True)
+def instrumentation_off():
+    yield
+    disable_instrumentation()
+
+def _statement(snapshot, prefix):
+    return next(s for s in snapshot["statements"] if s["sql"].startswith(prefix))
+
+def test_disabled_returns_raw_connection():
+    disable_instrumentation()
+    assert isinstance(get_connection(), sqlite3.Connection)
+
+def test_counts_calls_rows_and_time():
+    owner = Owner("Stats Owner", "0700").save()
+    Pet.save_many(Pet(f"Pet {i}", 1, "Dog", "Mixed", owner.id) for i in range(3))
+    stats = enable_instrumentation()
+
+    Pet.find_by_owner(owner.id)
+    Pet.find_by_owner(owner.id)
+    with transaction():
+        Owner("Another", "0701").save()
+
+    snapshot = stats.snapshot()
+    select = _statement(snapshot, "SELECT * FROM pets WHERE owner_id=?")
+    assert select["calls"] == 2
+    assert select["rows"] == 6
+    assert sum(select["histogram"].values()) == 2
+    insert = _statement(snapshot, "INSERT INTO owners")
+    assert insert["calls"] == 1 and insert["rows"] == 1
+
+def test_slow_log_and_n_plus_one():
+    owner = Owner("Loop Owner", "0700").save()
+    stats = enable_instrumentation(slow_ms=0, n_plus_one_threshold=10)
+    for _ in range(12):
+        Pet.find_by_owner(owner.id)
+
+    snapshot = stats.snapshot()
+    assert "SELECT * FROM pets WHERE owner_id=?" in snapshot["n_plus_one"]
+    assert snapshot["slow_queries"][-1]["sql"].startswith("SELECT * FROM pets")
+
+def test_disable_stops_collecting():
+    stats = enable_instrumentation()
+    disable_instrumentation()
+    Owner.get_all()
+    assert stats.snapshot()["statements"] == []
@@ -0,0 +1,26 @@
+"""
+Tests for versioned schema migrations.
+"""
+import sqlite3
+
+from lib.migrations import SCHEMA_VERSION, migrate, schema_version
+
+def test_migrate_fresh_database_then_noop():
+    conn = sqlite3.connect(":memory:", isolation_level=None)
+    assert migrate(conn) == list(range(1, SCHEMA_VERSION + 1))
+    assert schema_version(conn) == SCHEMA_VERSION
+    assert migrate(conn) == []
+
+def test_find_by_owner_uses_index():
+    conn = sqlite3.connect(":memory:", isolation_level=None)
+    migrate(conn)
+    plan = conn.execute("EXPLAIN QUERY PLAN SELECT * FROM pets WHERE owner_id=?", (1,)).fetchall()
+    assert any("idx_pets_owner" in row[-1] for row in plan)
+
+def test_legacy_unversioned_database_upgrades():
+    conn = sqlite3.connect(":memory:", isolation_level=None)
+    conn.execute("CREATE TABLE owners (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL, contact TEXT NOT NULL)")
+    conn.execute("INSERT INTO owners (name, contact) VALUES ('Legacy', '0700')")
+    migrate(conn)
+    assert conn.execute("SELECT name FROM owners").fetchone()[0] == "Legacy"
+    assert schema_version(conn) == SCHEMA_VERSION
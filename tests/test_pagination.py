@@ -0,0 +1,49 @@
+"""
+Tests for keyset-paginated iteration, page() and lazy RowSet results.
+"""
+import pytest
+
+from lib.models.owner import Owner
+from lib.models.pet import Pet
+from lib.models.appointment import Appointment
+
+pytestmark = pytest.mark.usefixtures("schema")
+
+def test_iter_all_streams_every_row_across_chunks():
+    owners = Owner.save_many(Owner(f"Owner {i}", "0700") for i in range(23))
+    streamed = list(Owner.iter_all(chunk_size=5))
+    assert [o.id for o in streamed] == [o.id for o in owners]
+    assert streamed[7].name == "Owner 7"
+
+def test_page_continues_after_last_id():
+    Owner.save_many(Owner(f"Owner {i}", "0700") for i in range(12))
+    first = Owner.page(limit=5)
+    second = Owner.page(after_id=first[-1].id, limit=5)
+    assert len(first) == len(second) == 5
+    assert second[0].id > first[-1].id
+
+def test_iter_by_filters_rows():
+    owner = Owner("Filter Owner", "0700").save()
+    other = Owner("Other Owner", "0700").save()
+    mine = Pet.save_many(Pet(f"Pet {i}", 1, "Cat", "Mixed", owner.id) for i in range(7))
+    Pet.save_many(Pet(f"Other {i}", 1, "Cat", "Mixed", other.id) for i in range(3))
+
+    assert [p.id for p in Pet.iter_by_owner(owner.id, chunk_size=2)] == [p.id for p in mine]
+
+    pet = mine[0]
+    appts = Appointment.save_many(Appointment(pet.id, "2025-10-20", "Checkup", "Dr. Muli", None) for _ in range(4))
+    assert [a.id for a in Appointment.iter_by_pet(pet.id, chunk_size=3)] == [a.id for a in appts]
+
+def test_all_rows_is_lazy_rowset():
+    Owner.save_many(Owner(f"Owner {i}", f"07{i:02d}") for i in range(4))
+    rows = Owner.all_rows()
+    assert len(rows) == 4
+    assert rows.column("contact") == ["0700", "0701", "0702", "0703"]
+    assert rows[2].name == "Owner 2"
+    assert [o.name for o in rows[1:3]] == ["Owner 1", "Owner 2"]
+
+def test_models_have_no_instance_dict():
+    owner = Owner("Slots", "0700").save()
+    assert not hasattr(owner, "__dict__")
+    with pytest.raises(AttributeError):
+        owner.nickname = "x"
@@ -0,0 +1,141 @@
+"""
+Tests for the heap-based appointment reminder scheduler (lib/reminders.py).
+"""
+from datetime import datetime, timedelta
+
+import sqlite3
+
+import pytest
+
+from lib.database import db_path, get_connection, transaction
+from lib.models.owner import Owner
+from lib.models.pet import Pet
+from lib.models.appointment import Appointment, add_listener, remove_listener
+from lib.reminders import FileSink, ReminderScheduler
+
+NOW = datetime(2030, 5, 1, 8, 0)
+
+class ListSink:
+    def __init__(self):
+        self.sent = []
+
+    def send(self, reminder):
+        self.sent.append(reminder)
+
+pytestmark = pytest.mark.usefixtures("schema")
+
+@pytest.fixture
+def pet():
+    owner = Owner("Alice", "0700").save()
+    return Pet("Bella", 3, "Dog", "Lab", owner.id).save()
+
+@pytest.fixture
+def scheduler():
+    sink = ListSink()
+    scheduler = ReminderScheduler(sink, lead=timedelta(hours=24), window=timedelta(days=7), now=NOW)
+    yield scheduler
+    scheduler.close()
+
+def book(pet, day, time, reason="Checkup"):
+    return Appointment(pet.id, day, reason, "Dr. Muli", time=time).save()
+
+def test_loads_window_and_sends_in_time_order(pet):
+    late = book(pet, "2030-05-03", "15:00")
+    early = book(pet, "2030-05-03", "10:00")
+    book(pet, "2030-06-30", "10:00")  # beyond the window
+    book(pet, "2030-05-01", "09:00")  # reminder time already passed
+    sink = ListSink()
+    scheduler = ReminderScheduler(sink, lead=timedelta(hours=24), window=timedelta(days=7), now=NOW)
+    try:
+        assert len(scheduler) == 2
+        assert scheduler.run_due(NOW + timedelta(days=1)) == 0
+        assert scheduler.run_due(datetime(2030, 5, 2, 16, 0)) == 2
+        assert [r.appointment.id for r in sink.sent] == [early.id, late.id]
+        assert sink.sent[0].due == datetime(2030, 5, 2, 10, 0)
+    finally:
+        scheduler.close()
+
+def test_saves_and_deletes_update_the_heap(scheduler, pet):
+    kept = book(pet, "2030-05-04", "11:00")
+    cancelled = book(pet, "2030-05-04", "09:00")
+    cancelled.delete()
+    assert scheduler.next_due() == datetime(2030, 5, 3, 11, 0)
+    assert scheduler.run_due(datetime(2030, 5, 4, 0, 0)) == 1
+    assert [r.appointment.id for r in scheduler.sink.sent] == [kept.id]
+
+def test_failing_listener_does_not_break_saves(scheduler, pet, caplog):
+    def broken(event, appointment):
+        raise RuntimeError("listener down")
+
+    events = []
+
+    def record(event, appointment):
+        events.append(event)
+
+    add_listener(broken)
+    add_listener(record)
+    try:
+        appt = book(pet, "2030-05-04", "11:00")
+    finally:
+        remove_listener(broken)
+        remove_listener(record)
+    assert Appointment.find_by_id(appt.id) is not None
+    assert "listener down" in caplog.text
+    # Listeners before and after the broken one still ran.
+    assert events == ["saved"]
+    assert scheduler.next_due() == datetime(2030, 5, 3, 11, 0)
+
+def test_window_moves_forward(scheduler, pet):
+    book(pet, "2030-06-20", None)
+    with transaction() as conn:  # written behind the model's back, seen on reload of the window
+        conn.execute("INSERT INTO appointments (pet_id, date, reason, vet_name) VALUES (?, '2030-06-21', 'x', 'y')", (pet.id,))
+    assert len(scheduler) == 0
+    assert scheduler.run_due(datetime(2030, 6, 15)) == 0
+    assert len(scheduler) == 2
+    assert scheduler.run_due(datetime(2030, 6, 19, 9, 0)) == 1
+
+def test_rollback_reloads_from_database(scheduler, pet):
+    with pytest.raises(RuntimeError):
+        with transaction():
+            book(pet, "2030-05-05", "10:00")
+            raise RuntimeError("abort")
+    assert scheduler.run_due(datetime(2030, 5, 6)) == 0
+    assert get_connection().execute("SELECT COUNT(*) FROM appointments").fetchone()[0] == 0
+
+def test_bookings_wait_for_commit(scheduler, pet):
+    with transaction():
+        appt = book(pet, "2030-05-05", "10:00")
+        assert scheduler.next_due() is None
+    assert scheduler.next_due() == datetime(2030, 5, 4, 10, 0)
+    with pytest.raises(RuntimeError):
+        with transaction():
+            book(pet, "2030-05-03", "10:00")
+            assert scheduler.run_due(datetime(2030, 5, 3)) == 0
+            raise RuntimeError("abort")
+    assert scheduler.run_due(datetime(2030, 5, 4, 12, 0)) == 1
+    assert [r.appointment.id for r in scheduler.sink.sent] == [appt.id]
+
+def test_catches_up_with_other_processes(scheduler, pet):
+    cancelled = book(pet, "2030-05-03", "09:00")
+    other = sqlite3.connect(db_path(), isolation_level=None)
+    try:
+        added = other.execute(
+            "INSERT INTO appointments (pet_id, date, reason, vet_name, time, duration) "
+            "VALUES (?, '2030-05-03', 'x', 'y', '10:00', 30)", (pet.id,)
+        ).lastrowid
+        other.execute("DELETE FROM appointments WHERE id = ?", (cancelled.id,))
+    finally:
+        other.close()
+    sent = sum(scheduler.run_due(NOW + timedelta(hours=hour)) for hour in range(72))
+    assert sent == 1
+    assert [r.appointment.id for r in scheduler.sink.sent] == [added]
+
+def test_file_sink_appends_json_lines(tmp_path, pet):
+    path = tmp_path / "reminders.jsonl"
+    book(pet, "2030-05-02", "12:00")
+    scheduler = ReminderScheduler(FileSink(str(path)), now=NOW)
+    try:
+        scheduler.run_due(datetime(2030, 5, 2))
+    finally:
+        scheduler.close()
+    assert '"appointment_id": 1' in path.read_text()
@@ -0,0 +1,82 @@
+"""
+Tests for date-range appointment queries and vet double-booking detection.
+"""
+from datetime import date, timedelta
+
+import pytest
+
+from lib.models.owner import Owner
+from lib.models.pet import Pet
+from lib.models.appointment import Appointment
+from lib.schedule import ScheduleConflict, VetSchedule
+
+pytestmark = pytest.mark.usefixtures("schema")
+
+@pytest.fixture
+def pet():
+    owner = Owner("Schedule Owner", "0700").save()
+    return Pet("Spot", 2, "Cat", "Siamese", owner.id).save()
+
+def test_upcoming_past_and_next(pet):
+    today = date.today()
+    soon = Appointment(pet.id, today + timedelta(days=2), "Vaccine", "Dr X").save()
+    later = Appointment(pet.id, today + timedelta(days=9), "Check", "Dr X").save()
+    before = Appointment(pet.id, today - timedelta(days=3), "Check", "Dr Y").save()
+
+    assert [a.id for a in Appointment.upcoming_for_pet(pet.id)] == [soon.id, later.id]
+    assert [a.id for a in Appointment.past_for_pet(pet.id)] == [before.id]
+    assert Appointment.next_appointment_for_pet(pet.id)[0] == soon.id
+    assert [r[0] for r in Appointment.upcoming_for_owner(pet.owner_id)] == [soon.id, later.id]
+
+def test_dates_are_normalized_on_save(pet):
+    appt = Appointment(pet.id, "05/11/2025", "Dental", "Dr Otieno").save()
+    assert appt.date == "2025-11-05"
+    assert Appointment.for_vet("Dr Otieno", "2025-11-01", "2025-11-30")[0].id == appt.id
+
+def test_double_booking_is_rejected(pet):
+    schedule = VetSchedule()
+    schedule.book(Appointment(pet.id, "2025-11-05", "Checkup", "Dr Muli", time="09:00", duration=30))
+    schedule.book(Appointment(pet.id, "2025-11-05", "Checkup", "Dr Muli", time="09:30", duration=30))
+    schedule.book(Appointment(pet.id, "2025-11-05", "Checkup", "Dr Amina", time="09:15"))
+
+    with pytest.raises(ScheduleConflict):
+        schedule.book(Appointment(pet.id, "2025-11-05", "Checkup", "Dr Muli", time="09:15"))
+    with pytest.raises(ScheduleConflict):
+        schedule.book(Appointment(pet.id, "2025-11-05", "Checkup", "Dr Muli", time="08:45", duration=20))
+
+    # A fresh schedule rebuilds the index from the database.
+    assert VetSchedule().find_conflict(Appointment(pet.id, "2025-11-05", "x", "Dr Muli", time="09:40")) is not None
+    assert len(Appointment.for_vet("Dr Muli", "2025-11-05", "2025-11-05")) == 2
+
+def test_cancel_frees_slot_and_week_view(pet):
+    schedule = VetSchedule()
+    appt = schedule.book(Appointment(pet.id, "2025-11-05", "Checkup", "Dr Muli", time="10:00"))
+    schedule.cancel(appt)
+    schedule.book(Appointment(pet.id, "2025-11-05", "Checkup", "Dr Muli", time="10:00"))
+
+    week = schedule.week("Dr Muli", "2025-11-07")
+    assert list(week)[0] == "2025-11-03"
+    assert len(week["2025-11-05"]) == 1
+
+def test_times_are_normalized_and_validated_on_save(pet):
+    appt = Appointment(pet.id, "2025-11-05", "Checkup", "Dr Muli", time="9:5").save()
+    assert appt.time == "09:05"
+    assert Appointment.find_by_id(appt.id).time == "09:05"
+    for bad in ("9am", "24:00", "10:75"):
+        with pytest.raises(ValueError):
+            Appointment(pet.id, "2025-11-05", "Checkup", "Dr Muli", time=bad).save()
+    assert len(Appointment.for_vet("Dr Muli", "2025-11-05", "2025-11-05")) == 1
+
+def test_conflicts_with_overlapping_and_directly_saved_appointments(pet):
+    schedule = VetSchedule()
+    schedule.book(Appointment(pet.id, "2025-11-06", "Surgery", "Dr Muli", time="09:00", duration=180))
+    # Saved without book(): the loaded day still learns about it, even
+    # though it overlaps the surgery.
+    short = Appointment(pet.id, "2025-11-06", "Checkup", "Dr Muli", time="09:30", duration=15).save()
+    assert schedule.find_conflict(Appointment(pet.id, "2025-11-06", "x", "Dr Muli", time="09:35")) is not None
+    # Only the long surgery (not its short neighbour) covers 11:00.
+    with pytest.raises(ScheduleConflict):
+        schedule.book(Appointment(pet.id, "2025-11-06", "Checkup", "Dr Muli", time="11:00"))
+    short.delete()
+    assert schedule.find_conflict(Appointment(pet.id, "2025-11-06", "x", "Dr Muli", time="12:00")) is None
+    assert schedule.find_conflict(Appointment(pet.id, "2025-11-06", "x", "Dr Muli", time="08:45")) is not None
@@ -0,0 +1,56 @@
+"""
+Tests for FTS5-backed search.
+"""
+import pytest
+
+from lib.models.owner import Owner
+from lib.models.pet import Pet
+from lib.models.appointment import Appointment
+from lib.models.medical_record import MedicalRecord
+from lib import search as search_module
+from lib.search import fts_query, search
+
+pytestmark = pytest.mark.usefixtures("schema")
+
+def test_prefix_search_by_name():
+    owner = Owner("Alice Example", "0700000001").save()
+    buddy = Pet("Buddy", 3, "Dog", "Beagle", owner.id).save()
+    junior = Pet("Buddy Jr", 1, "Dog", "Beagle", owner.id).save()
+    Pet("Rex", 2, "Dog", "Buddy-breed", owner.id).save()
+
+    assert {p.id for p in Pet.search_by_name("Bud")} == {buddy.id, junior.id}
+    assert [o.id for o in Owner.find_by_name("ali")] == [owner.id]
+    assert Owner.find_by_name("   ") == []
+
+def test_index_follows_updates_and_deletes():
+    owner = Owner("Brian Kim", "0722").save()
+    owner.update(name="Brenda Kim")
+    assert Owner.find_by_name("Brian") == []
+    assert [o.id for o in Owner.find_by_name("Brenda")] == [owner.id]
+    owner.delete()
+    assert Owner.find_by_name("Brenda") == []
+
+def test_search_covers_notes_and_treatments():
+    owner = Owner("Cathy", "0733").save()
+    pet = Pet("Simba", 4, "Cat", "Maine Coon", owner.id).save()
+    appt = Appointment(pet.id, "2025-11-05", "Dental Cleaning", "Dr Otieno", "Minor tartar").save()
+    record = MedicalRecord(pet.id, "2025-04-22", "Ear Infection Treatment", "Cleared").save()
+
+    assert ("appointment", appt.id) in [(k, i) for k, i, _ in search("tart")]
+    assert ("medical_record", record.id) in [(k, i) for k, i, _ in search("infection")]
+    assert ("pet", pet.id) in [(k, i) for k, i, _ in search("maine")]
+
+def test_notes_newest_first_and_broad_names_unranked(monkeypatch):
+    owner = Owner("Dana", "0744").save()
+    pet = Pet("Coco", 2, "Dog", "Poodle", owner.id).save()
+    older = Appointment(pet.id, "2025-01-10", "Dental", "Dr Otieno", "tartar tartar tartar").save()
+    newer = Appointment(pet.id, "2025-02-10", "Dental", "Dr Otieno", "some tartar").save()
+    assert [i for k, i, _ in search("tartar") if k == "appointment"] == [newer.id, older.id]
+
+    other = Pet("Coco Jr", 1, "Dog", "Poodle", owner.id).save()
+    monkeypatch.setattr(search_module, "RANK_LIMIT", 1)
+    assert [p.id for p in Pet.search_by_name("Coco")] == [pet.id, other.id]
+
+def test_fts_query_quotes_user_text():
+    assert fts_query('o"neil AND') == '"o" "neil" "AND"*'
+    assert fts_query("") is None
@@ -0,0 +1,174 @@
+"""
+Tests for the operations table, savepoint batches and the asyncio service.
+"""
+import asyncio
+import json
+import threading
+import time
+
+import pytest
+
+from lib import operations
+from lib.database import get_connection, savepoint, transaction
+from lib.models.base import identity_map
+from lib.models.owner import Owner
+from lib.models.pet import Pet
+from lib.schedule import ScheduleConflict
+from lib.service import Service
+
+pytestmark = pytest.mark.usefixtures("schema")
+
+@pytest.fixture
+def slow_read():
+    calls = []
+
+    @operations.operation("slow_read")
+    def slow(value):
+        calls.append(threading.get_ident())
+        time.sleep(0.05)
+        return value * 2
+
+    yield calls
+    operations.OPERATIONS.pop("slow_read")
+
+def owner_count():
+    return get_connection().execute("SELECT COUNT(*) FROM owners").fetchone()[0]
+
+def test_lookup_rejects_unknown_ops_and_bad_params():
+    with pytest.raises(operations.OperationError):
+        operations.lookup("drop_tables")
+    with pytest.raises(operations.OperationError):
+        operations.lookup("add_owner", {"name": "Alice"})
+    assert operations.run("add_owner", {"name": "Alice", "contact": "0700"})["name"] == "Alice"
+
+def test_run_batch_isolates_failures_with_savepoints():
+    results = operations.run_batch([
+        ("add_owner", {"name": "A", "contact": "1"}),
+        ("add_owner", {"name": None, "contact": "2"}),  # NOT NULL violation
+        ("add_owner", {"name": "C", "contact": "3"}),
+    ])
+    assert [ok for ok, _ in results] == [True, False, True]
+    assert owner_count() == 2
+
+def test_failed_call_in_a_batch_keeps_caches():
+    owner = Owner("Alice", "0700").save()
+    pet = Pet("Bella", 3, "Dog", "Lab", owner.id).save()
+    booking = {"pet_id": pet.id, "date": "2030-01-02", "reason": "Checkup", "vet_name": "Dr. Muli", "time": "10:00"}
+    operations.run_batch([("book_appointment", booking)])
+    cached = Owner.find_by_id(owner.id)
+    schedule = operations._get_schedule()
+
+    results = operations.run_batch([
+        ("book_appointment", {**booking, "time": "11:00"}),
+        ("book_appointment", booking),  # conflicts with the first booking
+        ("book_appointment", {**booking, "time": "12:00"}),
+        ("add_owner", {"name": None, "contact": "2"}),
+    ])
+    assert [ok for ok, _ in results] == [True, False, True, False]
+    assert identity_map.get(("owners", owner.id)) is cached
+    assert list(schedule._days) == [("Dr. Muli", "2030-01-02")]
+    assert len(schedule._slots) == 3
+    # The index still knows about the bookings the batch kept.
+    with pytest.raises(ScheduleConflict):
+        operations.run("book_appointment", {**booking, "time": "11:10"})
+
+def test_savepoint_rollback_takes_back_its_slots():
+    owner = Owner("Alice", "0700").save()
+    pet = Pet("Bella", 3, "Dog", "Lab", owner.id).save()
+    booking = {"pet_id": pet.id, "date": "2030-01-02", "reason": "Checkup", "vet_name": "Dr. Muli", "time": "10:00"}
+    operations.run("book_appointment", {**booking, "time": "09:00"})
+    schedule = operations._get_schedule()
+    with transaction():
+        with pytest.raises(RuntimeError):
+            with savepoint():
+                operations.run("book_appointment", booking)
+                raise RuntimeError("abort")
+    assert len(schedule._slots) == 1
+    operations.run("book_appointment", booking)
+
+def test_identical_concurrent_reads_share_one_query(slow_read):
+    async def scenario():
+        service = Service(workers=4)
+        try:
+            results = await asyncio.gather(*(service.call("slow_read", {"value": 21}) for _ in range(10)))
+            other = await service.call("slow_read", {"value": 1})
+        finally:
+            service.close()
+        return results, other, service.stats
+
+    results, other, stats = asyncio.run(scenario())
+    assert results == [42] * 10 and other == 2
+    assert len(slow_read) == 2
+    assert stats["coalesced"] == 9
+
+def test_reads_started_before_a_write_are_not_shared_after_it():
+    started = threading.Event()
+    release = threading.Event()
+
+    @operations.operation("count_owners")
+    def count_owners():
+        count = owner_count()
+        started.set()
+        release.wait(5)
+        return count
+
+    async def scenario():
+        service = Service(workers=4)
+        try:
+            before = asyncio.ensure_future(service.call("count_owners"))
+            await asyncio.get_running_loop().run_in_executor(None, started.wait, 5)
+            await service.call("add_owner", {"name": "Alice", "contact": "0700"})
+            after = asyncio.ensure_future(service.call("count_owners"))
+            await asyncio.sleep(0)
+            release.set()
+            return await before, await after
+        finally:
+            service.close()
+
+    try:
+        before, after = asyncio.run(scenario())
+    finally:
+        operations.OPERATIONS.pop("count_owners")
+    assert (before, after) == (0, 1)
+
+def test_concurrent_writes_are_grouped_into_batches():
+    async def scenario():
+        service = Service(workers=2)
+        try:
+            return await asyncio.gather(*(
+                service.call("add_owner", {"name": f"Owner {i}", "contact": "0700"}) for i in range(50)
+            )), service.stats
+        finally:
+            service.close()
+
+    owners, stats = asyncio.run(scenario())
+    assert len({o["id"] for o in owners}) == 50 and owner_count() == 50
+    assert stats["batches"] < 50
+
+def test_tcp_round_trip_with_pipelining():
+    owner = Owner("Alice", "0700").save()
+
+    async def scenario():
+        service = Service(workers=2)
+        server = await service.start(port=0)
+        port = server.sockets[0].getsockname()[1]
+        try:
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(
+                json.dumps({"id": 1, "op": "get_owner", "params": {"id": owner.id}}).encode() + b"\n"
+                + b"not json\n"
+                + json.dumps({"id": 3, "op": "add_pet", "params": {"name": "Bella", "age": 2, "species": "Dog",
+                                                                    "breed": "Lab", "owner_id": owner.id}}).encode() + b"\n"
+            )
+            responses = [json.loads(await reader.readline()) for _ in range(3)]
+            writer.close()
+            return {r["id"]: r for r in responses}
+        finally:
+            server.close()
+            await server.wait_closed()
+            service.close()
+
+    responses = asyncio.run(scenario())
+    assert responses[1]["result"]["name"] == "Alice"
+    assert "Malformed" in responses[None]["error"]
+    assert responses[3]["result"]["owner_id"] == owner.id
@@ -0,0 +1,88 @@
+"""
+Tests for the bulk import/export pipeline and the synthetic data generator.
+"""
+import io
+import json
+
+import pytest
+
+from lib.database import create_tables, get_connection
+from lib.models.owner import Owner
+from lib.models.pet import Pet
+from lib.models.appointment import Appointment
+from lib.search import search
+from lib.synthetic import generate_records
+from lib.transfer import IdMap, Importer, export_path, import_path, import_records, read_jsonl
+
+pytestmark = pytest.mark.usefixtures("schema")
+
+def test_import_maps_foreign_keys_across_chunks():
+    existing = Owner("Existing", "0700").save()  # so source ids != database ids
+    records = list(generate_records(owners=5, seed=7))
+    report = import_records(records, chunk_size=4)
+
+    assert report.error_count == 0
+    assert report.imported == {"owner": 5, "pet": 10, "appointment": 30, "medical_record": 20}
+    owner_names = {r["id"]: r["name"] for r in records if r["type"] == "owner"}
+    expected = sorted((r["name"], owner_names[r["owner_id"]]) for r in records if r["type"] == "pet")
+    actual = sorted((p.name, Owner.find_by_id(p.owner_id).name) for p in Pet.get_all())
+    assert actual == expected
+    assert Pet.find_by_owner(existing.id) == []
+
+def test_invalid_records_are_skipped_and_reported():
+    lines = io.StringIO("\n".join([
+        json.dumps({"type": "owner", "id": 1, "name": "Ok", "contact": "0700"}),
+        "{not json",
+        "[1, 2]",
+        json.dumps({"type": "owner", "id": 2, "name": "No contact"}),
+        json.dumps({"type": "pet", "id": 1, "name": "Rex", "age": "old", "owner_id": 1}),
+        json.dumps({"type": "pet", "id": 2, "name": "Orphan", "owner_id": 99}),
+        json.dumps({"type": "appointment", "pet_id": 1, "date": "31/12/2025", "reason": "Check"}),
+        json.dumps({"type": "pet", "id": 3, "name": "Bella", "owner_id": 1}),
+        json.dumps({"type": "appointment", "pet_id": 3, "date": "2025-12-30", "reason": "Check", "time": "9am"}),
+        json.dumps({"type": "appointment", "pet_id": 3, "date": "31/12/2025", "reason": "Check", "time": "9:30"}),
+    ]))
+    report = Importer(chunk_size=2).run(read_jsonl(lines, "input.jsonl"))
+
+    assert report.imported == {"owner": 1, "pet": 1, "appointment": 1, "medical_record": 0}
+    assert report.error_count == 7
+    assert any("input.jsonl:2" in message for message in report.errors)
+    assert any("input.jsonl:3: expected an object" in message for message in report.errors)
+    appt = Appointment.find_by_pet(Pet.search_by_name("Bella")[0].id)[0]
+    assert (appt.date, appt.time) == ("2025-12-31", "09:30")
+
+@pytest.mark.parametrize("target", ["export.jsonl", "csv_export"])
+def test_export_round_trip(tmp_path, monkeypatch, target):
+    import_records(generate_records(owners=3, seed=1), defer_indexing=True)
+    before = sorted((p.name, p.breed) for p in Pet.get_all())
+    path = str(tmp_path / target)
+    assert export_path(path) == 3 + 6 + 18 + 12
+
+    monkeypatch.setenv("PETCARE_DB", str(tmp_path / "copy.db"))
+    create_tables()
+    report = import_path(path)
+    assert report.error_count == 0
+    assert sorted((p.name, p.breed) for p in Pet.get_all()) == before
+    assert search(Pet.get_all()[0].name)
+    assert get_connection().execute("SELECT count(*) FROM appointments").fetchone()[0] == 18
+
+def test_generator_is_deterministic():
+    assert list(generate_records(owners=2, seed=3)) == list(generate_records(owners=2, seed=3))
+    assert list(generate_records(owners=2, seed=3)) != list(generate_records(owners=2, seed=4))
+
+def test_id_map_ranges_and_fallback():
+    ids = IdMap()
+    for source_id in range(1, 1001):
+        ids[source_id] = source_id + 50
+    ids[5000] = 7
+    ids[3] = 999
+    assert ids.get(1) == 51 and ids.get(1000) == 1050
+    assert ids.get(3) == 999 and ids.get(5000) == 7
+    assert ids.get(2000) is None
+    assert len(ids._runs) == 2
+
+def test_link_existing_rows():
+    owner = Owner("Existing", "0700").save()
+    record = {"type": "pet", "name": "Rex", "owner_id": owner.id}
+    assert import_records([record]).error_count == 1
+    assert import_records([record], link_existing=True).imported["pet"] == 1